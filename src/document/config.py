@@ -328,6 +328,104 @@ class Settings(BaseSettings):
     # the case of resource asset files) or re-generating them (in the
     # case of the final PDF). In hours.
     ASSET_CACHING_PERIOD: int
+    # How long, in minutes, an acquired resource asset is used without
+    # asking upstream whether it changed. Asking is a conditional GET
+    # for downloaded assets and comparing remote HEADs for git repos,
+    # which cost next to nothing if the asset did not change, so this
+    # can be much shorter than ASSET_CACHING_PERIOD.
+    ASSET_REVALIDATION_PERIOD: int = 30
+
+    # Whether the API server keeps translations.json fresh with a
+    # background thread, in which case document requests never wait on
+    # downloading it.
+    TRANSLATIONS_JSON_BACKGROUND_REFRESH: bool = True
+    # How often, in seconds, the background thread revalidates
+    # translations.json with a conditional GET. A conditional GET that
+    # finds the file unchanged is cheap so this can be much shorter
+    # than ASSET_CACHING_PERIOD.
+    TRANSLATIONS_JSON_REFRESH_INTERVAL: int = 900
+
+    # How long, in seconds, browsers and proxies may reuse the catalog
+    # endpoint responses, e.g., /language_codes, before revalidating
+    # them with their ETag.
+    CATALOG_RESPONSE_MAX_AGE: int = 300
+
+    # The maximum number of resource lookup results, found or not
+    # found, to keep in memory per worker. The results are discarded
+    # whenever the content of translations.json changes.
+    RESOURCE_LOOKUP_CACHE_SIZE: int = 2048
+
+    # The maximum number of TW resource assets, i.e., languages, whose
+    # translation words are kept in memory per worker, and, per asset,
+    # the maximum number of link contexts, i.e., sets of requested
+    # translation notes the words' links are converted for, whose HTML
+    # is kept. The words of an asset are discarded as soon as its
+    # version changes.
+    TRANSLATION_WORD_STORE_SIZE: int = 8
+    TRANSLATION_WORD_STORE_LINK_CONTEXTS: int = 4
+
+    # The maximum number of resources of a document request whose
+    # asset files are provisioned, i.e., downloaded, cloned or
+    # unzipped, concurrently.
+    PROVISIONING_MAX_WORKERS: int = 8
+    # The maximum number of concurrent asset provisionings per remote
+    # host across all document requests in a worker.
+    PROVISIONING_MAX_CONNECTIONS_PER_HOST: int = 4
+    # Whether TN, TQ, TW and TA resources read their Markdown asset
+    # files directly from their cached zip asset, see asset_fs, rather
+    # than from files extracted to disk.
+    ASSET_ZIPS_READ_IN_PLACE: bool = True
+
+    # HTTP client settings used by url_utils for all downloads.
+    # Timeouts, in seconds, to establish a connection and between
+    # bytes received.
+    HTTP_CONNECT_TIMEOUT: float = 10
+    HTTP_READ_TIMEOUT: float = 60
+    # How many times to retry a download that failed due to a
+    # connection problem, a timeout, or a 429 or 5xx response, waiting
+    # HTTP_BACKOFF_FACTOR * 2 ** retry seconds before each retry.
+    HTTP_MAX_RETRIES: int = 3
+    HTTP_BACKOFF_FACTOR: float = 0.5
+    # The maximum number of keep-alive connections kept per host.
+    HTTP_POOL_MAXSIZE: int = 16
+    # The size, in bytes, of the chunks downloads are streamed in.
+    HTTP_CHUNK_SIZE: int = 64 * 1024
+
+    # The maximum time, in seconds, a git command run by git_utils may
+    # take, e.g., to clone or fetch a resource's git repo.
+    GIT_COMMAND_TIMEOUT: int = 600
+    # Whether resource git repos are partial clones of which only the
+    # files needed for the books requested so far are checked out.
+    GIT_SPARSE_CHECKOUT: bool = True
+
+    # Quotas on the disk space, in bytes, and on the number of files
+    # and directories, i.e., inodes, that the assets in working_dir
+    # and the documents in output_dir may use together. When either is
+    # exceeded, the least recently used assets and documents are
+    # evicted until usage is below DISK_CACHE_LOW_WATER_MARK of both.
+    DISK_CACHE_MAX_BYTES: int = 20 * 1024 ** 3
+    DISK_CACHE_MAX_INODES: int = 1_000_000
+    DISK_CACHE_LOW_WATER_MARK: float = 0.9
+    # Whether the API server enforces the disk quotas with a background
+    # thread, and how often, in seconds.
+    DISK_CACHE_EVICTION: bool = True
+    DISK_CACHE_EVICTION_INTERVAL: int = 600
+
+    # Whether the content parsed from a resource's asset files, e.g.,
+    # a book's USFM chapters and verses, is cached on disk, in
+    # working_dir, and reused for as long as the asset is unchanged.
+    PARSED_RESOURCE_CACHE_ENABLED: bool = True
+    # Part of the key of cached parsed content, along with the source
+    # code of the modules that do the parsing. Change it to discard
+    # what was cached when something else parsing depends on changes,
+    # e.g., USFM-Tools is upgraded.
+    PARSED_RESOURCE_CACHE_SALT: str = "1"
+    # The maximum memory, in bytes, that the parsed content most
+    # recently used by a worker's requests may take up in the worker,
+    # so that they use it without reading it from disk. Content is
+    # measured by its size pickled, which understates the memory it
+    # takes up. 0 disables keeping parsed content in memory.
+    PARSED_RESOURCE_MEMORY_CACHE_MAX_BYTES: int = 256 * 1024 ** 2
 
     # Get the path to the logo image that will be used on the PDF cover,
     # i.e., first, page.
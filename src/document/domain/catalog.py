@@ -0,0 +1,810 @@
+"""
+This module provides a process wide copy of the translations.json
+catalog and an index over it so that resource lookups neither re-parse
+nor scan the whole catalog with jsonpath on every call.
+
+The catalog is compiled once into a compact snapshot file next to
+translations.json which every worker memory-maps, so that the pages
+are shared between workers through the OS page cache, and only the
+languages a request actually touches are decoded into Python objects.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import struct
+import tempfile
+import threading
+from typing import Any, NamedTuple, Optional, Sequence
+
+import icontract
+
+from document.config import settings
+from document.utils import file_utils, url_utils
+
+# Keys under which the HTTP validators of the last download of
+# translations.json are kept in its sidecar metadata file.
+ETAG_KEY = file_utils.ETAG_KEY
+LAST_MODIFIED_KEY = file_utils.LAST_MODIFIED_KEY
+
+logger = settings.logger(__name__)
+
+
+# Link formats found in translations.json that we look up by.
+USFM_FORMAT = "usfm"
+ZIP_FORMAT = "zip"
+DOWNLOAD_FORMAT = "Download"
+
+
+def _append_uniq(values: list[str], value: Any) -> None:
+    """
+    Append value to values if it is a string not already present.
+    This mirrors the de-duplication that ResourceJsonLookup._lookup
+    does with a set, but keeps document order so that results are
+    deterministic.
+    """
+    if isinstance(value, str) and value not in values:
+        values.append(value)
+
+
+def _dicts(value: Any) -> list[dict]:
+    """
+    Return the dictionaries in value if value is a list, otherwise an
+    empty list. A jsonpath filter expression, e.g., [?code='tn'], only
+    ever matches dictionaries inside of lists.
+    """
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, dict)]
+    return []
+
+
+def _index_links(links: Any, links_by_format: dict[str, list[str]]) -> None:
+    """Add each link's url to links_by_format under the link's format."""
+    for link in _dicts(links):
+        link_format = link.get("format")
+        if isinstance(link_format, str) and "url" in link:
+            _append_uniq(links_by_format.setdefault(link_format, []), link["url"])
+
+
+class LanguageSummary(NamedTuple):
+    """
+    The parts of a language entry in translations.json that the BIEL
+    UI lists for every language at once: its code, its name and, for
+    each of its contents, the contents code (None if it has none) and
+    its subcontents codes.
+    """
+
+    code: Any
+    name: Any
+    contents: list[tuple[Optional[str], list[str]]]
+
+
+def _summarize(lang: dict) -> LanguageSummary:
+    """Return the LanguageSummary of a language entry."""
+    contents: list[tuple[Optional[str], list[str]]] = []
+    for contents_dict in _dicts(lang.get("contents")):
+        contents_code = contents_dict.get("code")
+        contents.append(
+            (
+                contents_code if isinstance(contents_code, str) else None,
+                [
+                    subcontents["code"]
+                    for subcontents in _dicts(contents_dict.get("subcontents"))
+                    if isinstance(subcontents.get("code"), str)
+                ],
+            )
+        )
+    return LanguageSummary(code=lang.get("code"), name=lang.get("name"), contents=contents)
+
+
+def _new_lang_entry() -> dict[str, Any]:
+    return {"names": [], "contents": {}, "subcontents": {}}
+
+
+class CatalogIndex:
+    """
+    A nested dictionary view of translations.json keyed by lang_code,
+    then contents code, then subcontents code and finally link URLs
+    keyed by link format, e.g.:
+
+    {
+      "kbt": {
+        "names": ["Abadi"],
+        "contents": {
+          "reg": {
+            "names": ["Bible"],
+            "links": {"zip": [...]},
+            "subcontents": {"2co": {"Download": [...]}},
+          },
+        },
+        "subcontents": {"2co": {"Download": [...]}},
+      },
+    }
+
+    The top level "subcontents" key of each language merges the
+    subcontents of all of the language's contents so that the
+    contents[*].subcontents[?code=...] style jsonpath lookups can also
+    be answered with dictionary lookups.
+
+    Each method answers the same question as one of the jsonpath
+    expressions found in config.py and returns the same values that
+    ResourceJsonLookup._lookup would, but in document order rather
+    than set order.
+
+    This class indexes already decoded json data, see
+    MappedCatalogIndex for an index that decodes languages on demand
+    from a snapshot file.
+    """
+
+    def __init__(self, json_data: list) -> None:
+        self._json_data = json_data
+        self._langs: dict[str, dict[str, Any]] = {}
+        self._summaries = [_summarize(lang) for lang in _dicts(json_data)]
+        for lang in _dicts(json_data):
+            lang_code = lang.get("code")
+            if not isinstance(lang_code, str):
+                continue
+            self._index_lang(self._langs.setdefault(lang_code, _new_lang_entry()), lang)
+
+    @classmethod
+    def _index_lang(cls, lang_entry: dict[str, Any], lang: dict) -> None:
+        """Add a language dictionary to lang_entry."""
+        _append_uniq(lang_entry["names"], lang.get("name"))
+        for contents in _dicts(lang.get("contents")):
+            cls._index_contents(lang_entry, contents)
+
+    @staticmethod
+    def _index_contents(lang_entry: dict[str, Any], contents: dict) -> None:
+        """Add a contents dictionary to lang_entry."""
+        contents_code = contents.get("code")
+        subcontents_list = _dicts(contents.get("subcontents"))
+        # Subcontents are reachable through contents[*] even when
+        # their parent contents has no code.
+        for subcontents in subcontents_list:
+            subcontents_code = subcontents.get("code")
+            if isinstance(subcontents_code, str):
+                _index_links(
+                    subcontents.get("links"),
+                    lang_entry["subcontents"].setdefault(subcontents_code, {}),
+                )
+        if not isinstance(contents_code, str):
+            return
+        contents_entry = lang_entry["contents"].setdefault(
+            contents_code, {"names": [], "links": {}, "subcontents": {}}
+        )
+        _append_uniq(contents_entry["names"], contents.get("name"))
+        _index_links(contents.get("links"), contents_entry["links"])
+        for subcontents in subcontents_list:
+            subcontents_code = subcontents.get("code")
+            if isinstance(subcontents_code, str):
+                _index_links(
+                    subcontents.get("links"),
+                    contents_entry["subcontents"].setdefault(subcontents_code, {}),
+                )
+
+    def __contains__(self, lang_code: str) -> bool:
+        """Return True if lang_code occurs in translations.json."""
+        return lang_code in self._langs
+
+    def __len__(self) -> int:
+        """Return the number of distinct language codes indexed."""
+        return len(self._langs)
+
+    def json_data(self) -> list:
+        """Return the whole catalog as decoded json data."""
+        return self._json_data
+
+    def summaries(self) -> Sequence[LanguageSummary]:
+        """
+        Return the LanguageSummary of every language entry in
+        document order.
+        """
+        return self._summaries
+
+    def _lang_entry(self, lang_code: str) -> Optional[dict[str, Any]]:
+        """Return the index entry for lang_code if any."""
+        return self._langs.get(lang_code)
+
+    def _contents(self, lang_code: str, contents_code: str) -> Optional[dict[str, Any]]:
+        """Return the contents entry for lang_code and contents_code if any."""
+        lang_entry = self._lang_entry(lang_code)
+        if lang_entry is None:
+            return None
+        contents_entry: Optional[dict[str, Any]] = lang_entry["contents"].get(
+            contents_code
+        )
+        return contents_entry
+
+    @icontract.require(lambda lang_code: lang_code is not None)
+    def lang_names(self, lang_code: str) -> list[str]:
+        """Equivalent of settings.RESOURCE_LANG_NAME_JSONPATH."""
+        lang_entry = self._lang_entry(lang_code)
+        return list(lang_entry["names"]) if lang_entry else []
+
+    @icontract.require(lambda lang_code: lang_code is not None)
+    def lang_name(self, lang_code: str) -> str:
+        """Return the language's name or the empty string if not found."""
+        lang_names = self.lang_names(lang_code)
+        return lang_names[0] if lang_names else ""
+
+    @icontract.require(
+        lambda lang_code, resource_type: lang_code is not None
+        and resource_type is not None
+    )
+    def resource_type_names(self, lang_code: str, resource_type: str) -> list[str]:
+        """Equivalent of settings.RESOURCE_TYPE_NAME_JSONPATH."""
+        contents_entry = self._contents(lang_code, resource_type)
+        return list(contents_entry["names"]) if contents_entry else []
+
+    @icontract.require(
+        lambda lang_code, resource_type: lang_code is not None
+        and resource_type is not None
+    )
+    def resource_type_name(self, lang_code: str, resource_type: str) -> str:
+        """Return the resource type's name or the empty string if not found."""
+        resource_type_names = self.resource_type_names(lang_code, resource_type)
+        return resource_type_names[0] if resource_type_names else ""
+
+    @icontract.require(
+        lambda lang_code, resource_type, link_format: lang_code is not None
+        and resource_type is not None
+        and link_format
+    )
+    def contents_urls(
+        self, lang_code: str, resource_type: str, link_format: str = ZIP_FORMAT
+    ) -> list[str]:
+        """
+        Equivalent of settings.RESOURCE_URL_LEVEL1_JSONPATH when
+        link_format is 'zip'.
+        """
+        contents_entry = self._contents(lang_code, resource_type)
+        if contents_entry is None:
+            return []
+        return list(contents_entry["links"].get(link_format, []))
+
+    @icontract.require(
+        lambda lang_code, resource_type, resource_code, link_format: lang_code
+        is not None
+        and resource_type is not None
+        and resource_code is not None
+        and link_format
+    )
+    def subcontents_urls(
+        self,
+        lang_code: str,
+        resource_type: str,
+        resource_code: str,
+        link_format: str,
+    ) -> list[str]:
+        """
+        Equivalent of settings.INDIVIDUAL_USFM_URL_JSONPATH when
+        link_format is 'usfm' and of
+        settings.RESOURCE_DOWNLOAD_FORMAT_JSONPATH when link_format is
+        'Download'.
+        """
+        contents_entry = self._contents(lang_code, resource_type)
+        if contents_entry is None:
+            return []
+        return list(
+            contents_entry["subcontents"].get(resource_code, {}).get(link_format, [])
+        )
+
+    @icontract.require(
+        lambda lang_code, subcontents_code, link_format: lang_code is not None
+        and subcontents_code is not None
+        and link_format
+    )
+    def any_subcontents_urls(
+        self, lang_code: str, subcontents_code: str, link_format: str = ZIP_FORMAT
+    ) -> list[str]:
+        """
+        Equivalent of settings.RESOURCE_URL_LEVEL2_JSONPATH when
+        link_format is 'zip', i.e., look in the subcontents of all of
+        the language's contents.
+        """
+        lang_entry = self._lang_entry(lang_code)
+        if lang_entry is None:
+            return []
+        return list(
+            lang_entry["subcontents"].get(subcontents_code, {}).get(link_format, [])
+        )
+
+
+# Identifies, and versions the layout of, compiled snapshot files.
+SNAPSHOT_MAGIC = b"DOCCATALOG1\n"
+# The length of the JSON header that follows SNAPSHOT_MAGIC.
+_HEADER_LENGTH = struct.Struct("<Q")
+
+
+def write_snapshot_file(json_data: list, version: str, snapshot_path: str) -> None:
+    """
+    Compile json_data, the decoded translations.json whose content
+    hash is version, into a snapshot file at snapshot_path.
+
+    The file consists of SNAPSHOT_MAGIC, the length of a JSON header,
+    the header and then each language entry of json_data encoded as
+    compact JSON one after the other. The header holds version, the
+    LanguageSummary of every language entry, the offset and length of
+    every language entry in the body, and, by language code, the
+    positions of that code's entries.
+    """
+    body = bytearray()
+    entries: list[tuple[int, int]] = []
+    positions: dict[str, list[int]] = {}
+    summaries = []
+    for lang in _dicts(json_data):
+        encoded = json.dumps(lang, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+        lang_code = lang.get("code")
+        if isinstance(lang_code, str):
+            positions.setdefault(lang_code, []).append(len(entries))
+        entries.append((len(body), len(encoded)))
+        summaries.append(_summarize(lang))
+        body += encoded
+    header = json.dumps(
+        {
+            "version": version,
+            "summaries": summaries,
+            "entries": entries,
+            "positions": positions,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    # Write to a temporary file and rename it into place so that
+    # other workers never map a partially written snapshot.
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(snapshot_path)),
+        prefix=".{}.".format(os.path.basename(snapshot_path)),
+    )
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(SNAPSHOT_MAGIC)
+            fp.write(_HEADER_LENGTH.pack(len(header)))
+            fp.write(header)
+            fp.write(body)
+        os.replace(temp_path, snapshot_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class MappedCatalogIndex(CatalogIndex):
+    """
+    A CatalogIndex over a memory-mapped snapshot file written by
+    write_snapshot_file. Only the header is decoded up front, each
+    language is decoded and indexed the first time it is looked up.
+    """
+
+    def __init__(self, snapshot_path: str) -> None:
+        with open(snapshot_path, "rb") as fp:
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic_length = len(SNAPSHOT_MAGIC)
+            if self._mmap[:magic_length] != SNAPSHOT_MAGIC:
+                raise ValueError("{} is not a catalog snapshot".format(snapshot_path))
+            (header_length,) = _HEADER_LENGTH.unpack_from(self._mmap, magic_length)
+            header_start = magic_length + _HEADER_LENGTH.size
+            header = json.loads(
+                self._mmap[header_start : header_start + header_length]
+            )
+        except BaseException:
+            self._mmap.close()
+            raise
+        self._body_start = header_start + header_length
+        self.version: str = header["version"]
+        self._entries: list[list[int]] = header["entries"]
+        self._positions: dict[str, list[int]] = header["positions"]
+        self._summaries = [
+            LanguageSummary(
+                code=code,
+                name=name,
+                contents=[
+                    (contents_code, subcontents_codes)
+                    for contents_code, subcontents_codes in contents
+                ],
+            )
+            for code, name, contents in header["summaries"]
+        ]
+        self._langs = {}
+
+    def close(self) -> None:
+        """
+        Unmap the snapshot file. Only for an index no snapshot uses,
+        looking languages up that weren't decoded yet fails after.
+        """
+        self._mmap.close()
+
+    def _decode(self, position: int) -> Any:
+        """Decode the language entry at position in the body."""
+        offset, length = self._entries[position]
+        start = self._body_start + offset
+        return json.loads(self._mmap[start : start + length])
+
+    def __contains__(self, lang_code: str) -> bool:
+        """Return True if lang_code occurs in translations.json."""
+        return lang_code in self._positions
+
+    def __len__(self) -> int:
+        """Return the number of distinct language codes indexed."""
+        return len(self._positions)
+
+    @property
+    def decoded_languages(self) -> int:
+        """Return the number of languages decoded so far."""
+        return len(self._langs)
+
+    def json_data(self) -> list:
+        """
+        Return the whole catalog as decoded json data. This decodes
+        every language so it is only meant for debugging and
+        compatibility.
+        """
+        return [self._decode(position) for position in range(len(self._entries))]
+
+    def _lang_entry(self, lang_code: str) -> Optional[dict[str, Any]]:
+        """
+        Return the index entry for lang_code, decoding and indexing
+        the language first if this is the first time it is asked
+        for.
+        """
+        lang_entry = self._langs.get(lang_code)
+        if lang_entry is not None:
+            return lang_entry
+        positions = self._positions.get(lang_code)
+        if positions is None:
+            return None
+        lang_entry = _new_lang_entry()
+        for position in positions:
+            self._index_lang(lang_entry, self._decode(position))
+        # Should two threads race to decode the same language, both
+        # build the same entry and the first one stored wins.
+        return self._langs.setdefault(lang_code, lang_entry)
+
+
+class CatalogSnapshot(NamedTuple):
+    """
+    An immutable, consistent view of one version of translations.json:
+    its index, the sha256 hash of its content (which we use as its
+    version) and the file modification time and size it was parsed
+    from.
+    """
+
+    catalog_index: CatalogIndex
+    version: str
+    stamp: Optional[tuple[int, int]]
+
+
+EMPTY_SNAPSHOT = CatalogSnapshot(catalog_index=CatalogIndex([]), version="", stamp=None)
+
+
+class Catalog:
+    """
+    Process wide, thread safe holder of the parsed translations.json.
+
+    The file is parsed once and the resulting CatalogSnapshot is
+    shared by every caller until file_utils.source_file_needs_update
+    says the file is stale or the file changes on disk. At that point
+    the file is re-acquired and re-parsed, and the new snapshot
+    replaces the old one in a single reference assignment so that
+    readers never see a partially built catalog. Readers do not take
+    the lock.
+
+    The file is re-acquired with a conditional GET so that an
+    unchanged catalog costs a 304 response rather than a full
+    download. When a CatalogRefresher keeps the file fresh in the
+    background, readers stop checking its age altogether and so never
+    wait on the network.
+    """
+
+    def __init__(self, working_dir: str, json_file_url: str) -> None:
+        self._json_file_url = json_file_url
+        self._json_file = pathlib.Path(
+            os.path.join(working_dir, json_file_url.rpartition(os.path.sep)[2])
+        )
+        self._lock = threading.RLock()
+        self._snapshot_file = pathlib.Path("{}.snapshot".format(self._json_file))
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._parse_count = 0
+        self._fetch_count = 0
+        self._not_modified_count = 0
+        self._fetch_error_count = 0
+        self._refreshed_in_background = False
+
+    def __str__(self) -> str:
+        """Return a printable string identifying this instance."""
+        return "Catalog(json_file: {})".format(self._json_file)
+
+    @property
+    def json_file(self) -> pathlib.Path:
+        """Provide public interface for other modules."""
+        return self._json_file
+
+    @property
+    def snapshot_file(self) -> pathlib.Path:
+        """Provide public interface for other modules."""
+        return self._snapshot_file
+
+    @property
+    def parse_count(self) -> int:
+        """Return the number of times translations.json has been parsed."""
+        return self._parse_count
+
+    @property
+    def refreshed_in_background(self) -> bool:
+        """
+        Return True if a CatalogRefresher is keeping translations.json
+        fresh so that readers need not check its age.
+        """
+        return self._refreshed_in_background
+
+    @refreshed_in_background.setter
+    def refreshed_in_background(self, value: bool) -> None:
+        self._refreshed_in_background = value
+
+    def _json_file_stamp(self) -> Optional[tuple[int, int]]:
+        """
+        Return the modification time and size of the
+        translations.json file on disk or None if it doesn't exist.
+        """
+        try:
+            stat_result = os.stat(self._json_file)
+        except OSError:
+            return None
+        return stat_result.st_mtime_ns, stat_result.st_size
+
+    def _is_stale(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        """
+        Return True if there is no snapshot yet, if translations.json
+        needs to be re-acquired, or if it has changed on disk since
+        snapshot was parsed.
+        """
+        return (
+            snapshot is None
+            or (
+                not self._refreshed_in_background
+                and file_utils.source_file_needs_update(self._json_file)
+            )
+            or self._json_file_stamp() != snapshot.stamp
+        )
+
+    def snapshot(self) -> CatalogSnapshot:
+        """
+        Return the current CatalogSnapshot, acquiring and parsing
+        translations.json first if necessary.
+        """
+        snapshot = self._snapshot
+        if self._is_stale(snapshot):
+            snapshot = self._refresh()
+        assert snapshot is not None
+        return snapshot
+
+    def _refresh(self) -> CatalogSnapshot:
+        """
+        Download translations.json if it needs updating and parse it
+        if it changed. Only one thread does this at a time, other
+        threads wait and then reuse its result.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            # Another thread may have refreshed while we waited on the
+            # lock.
+            if snapshot is not None and not self._is_stale(snapshot):
+                return snapshot
+            # When refreshed in the background we only download here
+            # if the file is missing altogether.
+            if not self._json_file.exists() or (
+                not self._refreshed_in_background
+                and file_utils.source_file_needs_update(self._json_file)
+            ):
+                self._download()
+            return self._reload()
+
+    def fetch(self) -> bool:
+        """
+        Revalidate translations.json with the server now, regardless of
+        its age, and swap in a new snapshot if it changed. Return True
+        if a new version was downloaded.
+        """
+        with self._lock:
+            modified = self._download()
+            self._reload()
+            return modified
+
+    def _reload(self) -> CatalogSnapshot:
+        """
+        Parse translations.json if it changed on disk since the current
+        snapshot was made and make the result the current snapshot.
+        Callers must hold the lock.
+        """
+        snapshot = self._snapshot
+        stamp = self._json_file_stamp()
+        if snapshot is None or stamp != snapshot.stamp:
+            snapshot = self._parse(stamp, snapshot)
+            self._snapshot = snapshot
+        return snapshot
+
+    def _download(self) -> bool:
+        """
+        Download translations.json unless the server says it is not
+        modified since we last downloaded it, in which case just mark
+        the local copy as fresh. Return True if a new copy was
+        downloaded. On failure log and keep using the local copy, if
+        any. Callers must hold the lock.
+        """
+        json_file = str(self._json_file.resolve())
+        metadata = file_utils.read_sidecar_metadata(json_file)
+        if not self._json_file.exists():
+            # Validators are meaningless without the file they
+            # describe.
+            metadata = {}
+        logger.debug("Downloading %s...", self._json_file_url)
+        self._fetch_count += 1
+        try:
+            file_utils.make_dir(os.path.dirname(json_file))
+            result = url_utils.conditional_download_file(
+                self._json_file_url,
+                json_file,
+                etag=metadata.get(ETAG_KEY),
+                last_modified=metadata.get(LAST_MODIFIED_KEY),
+            )
+        except Exception:
+            self._fetch_error_count += 1
+            logger.exception("Caught exception: ")
+            return False
+        if result.modified:
+            file_utils.write_sidecar_metadata(
+                json_file,
+                {ETAG_KEY: result.etag, LAST_MODIFIED_KEY: result.last_modified},
+            )
+        else:
+            self._not_modified_count += 1
+            # Reset the file's age so that source_file_needs_update
+            # considers it fresh again.
+            os.utime(json_file)
+        return result.modified
+
+    def _parse(
+        self, stamp: Optional[tuple[int, int]], previous: Optional[CatalogSnapshot]
+    ) -> CatalogSnapshot:
+        """
+        Load translations.json into a new CatalogSnapshot. If that
+        fails keep using the previous snapshot, if any.
+        """
+        if stamp is None:
+            logger.debug("%s does not exist.", self._json_file)
+            return previous or EMPTY_SNAPSHOT
+        logger.debug("Loading json file %s...", self._json_file)
+        try:
+            with open(self._json_file, "rb") as fp:
+                content = fp.read()
+            version = hashlib.sha256(content).hexdigest()
+            # The file may have only been touched, e.g., after a 304
+            # response, in which case there is nothing to re-parse.
+            if previous is not None and previous.version == version:
+                return previous._replace(stamp=stamp)
+            index = self._load_index(content, version)
+        except Exception:
+            logger.exception("Caught exception: ")
+            return previous or EMPTY_SNAPSHOT
+        return CatalogSnapshot(catalog_index=index, version=version, stamp=stamp)
+
+    def _load_index(self, content: bytes, version: str) -> CatalogIndex:
+        """
+        Return an index over content, the content of translations.json
+        whose hash is version. Map the snapshot file if it was already
+        compiled from this version, e.g., by another worker, otherwise
+        parse content and compile the snapshot file first. If the
+        snapshot file cannot be written fall back to indexing the
+        parsed content in memory.
+        """
+        try:
+            mapped_index = MappedCatalogIndex(str(self._snapshot_file))
+        except (OSError, ValueError):
+            pass
+        else:
+            if mapped_index.version == version:
+                return mapped_index
+            # Compiled from another version, unmap it before it is
+            # replaced.
+            mapped_index.close()
+        json_data = json.loads(content)
+        self._parse_count += 1
+        try:
+            write_snapshot_file(json_data, version, str(self._snapshot_file))
+            return MappedCatalogIndex(str(self._snapshot_file))
+        except OSError:
+            logger.exception("Caught exception: ")
+            return CatalogIndex(json_data)
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters suitable for exposing to monitoring."""
+        snapshot = self._snapshot
+        return {
+            "json_file": str(self._json_file),
+            "parse_count": self._parse_count,
+            "fetch_count": self._fetch_count,
+            "not_modified_count": self._not_modified_count,
+            "fetch_error_count": self._fetch_error_count,
+            "refreshed_in_background": self._refreshed_in_background,
+            "version": snapshot.version if snapshot else None,
+            "languages": len(snapshot.catalog_index) if snapshot else 0,
+            "decoded_languages": (
+                snapshot.catalog_index.decoded_languages
+                if snapshot and isinstance(snapshot.catalog_index, MappedCatalogIndex)
+                else None
+            ),
+        }
+
+
+class CatalogRefresher:
+    """
+    Keep a Catalog's translations.json fresh from a daemon thread so
+    that document requests never block on downloading it.
+    """
+
+    @icontract.require(lambda interval: interval > 0)
+    def __init__(self, catalog: Catalog, interval: float) -> None:
+        self._catalog = catalog
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Fetch translations.json once synchronously, so that it is
+        available before the first request is served, and then keep
+        refreshing it every interval seconds in the background.
+        """
+        self._catalog.fetch()
+        self._catalog.refreshed_in_background = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="catalog-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and wait for it to finish."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._catalog.refreshed_in_background = False
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            try:
+                self._catalog.fetch()
+            except Exception:
+                # Never let the refresher die, we'll try again next
+                # interval.
+                logger.exception("Caught exception: ")
+
+
+_catalogs: dict[pathlib.Path, Catalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def shared_catalog(
+    working_dir: Optional[str] = None, json_file_url: Optional[str] = None
+) -> Catalog:
+    """
+    Return the process wide Catalog for json_file_url in working_dir,
+    which default to the locations in settings, creating it the first
+    time it is asked for.
+    """
+    if working_dir is None:
+        working_dir = settings.working_dir()
+    if json_file_url is None:
+        json_file_url = settings.TRANSLATIONS_JSON_LOCATION
+    json_file = pathlib.Path(
+        os.path.join(working_dir, json_file_url.rpartition(os.path.sep)[2])
+    )
+    with _catalogs_lock:
+        if json_file not in _catalogs:
+            _catalogs[json_file] = Catalog(working_dir, json_file_url)
+        return _catalogs[json_file]
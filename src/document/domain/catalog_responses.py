@@ -0,0 +1,171 @@
+"""
+This module provides the catalog endpoint responses, e.g., for
+/language_codes, pre-serialized and pre-gzipped once per catalog
+version rather than rebuilt and re-serialized on every request.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from typing import Any, Callable, NamedTuple, Optional
+
+import icontract
+from pydantic import BaseModel
+
+from document.config import settings
+from document.domain import resource_lookup
+
+logger = settings.logger(__name__)
+
+JSON_MEDIA_TYPE = "application/json"
+# Appended to the ETag of the gzipped representation as the two
+# representations differ byte for byte.
+GZIP_ETAG_SUFFIX = "-gzip"
+
+
+def _jsonable(value: Any) -> Any:
+    """Convert value, e.g., pydantic models or generators, for json.dumps."""
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, (list, tuple)) or hasattr(value, "__next__"):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def _etag_matches(if_none_match: Optional[str], etags: tuple[str, ...]) -> bool:
+    """
+    Return True if the If-None-Match header value if_none_match
+    matches any of etags.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        # If-None-Match uses weak comparison.
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate in etags:
+            return True
+    return False
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Return True if the Accept-Encoding header value allows gzip."""
+    if not accept_encoding:
+        return False
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            quality = params.strip()
+            return quality.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class RenderedResponse(NamedTuple):
+    """What to send back: status code, headers and body."""
+
+    status_code: int
+    headers: dict[str, str]
+    body: bytes
+
+
+class PrecomputedResponse:
+    """
+    A JSON response body serialized and gzipped once, with a strong
+    ETag for each of the two representations.
+    """
+
+    def __init__(self, value: Any) -> None:
+        self.body = json.dumps(
+            _jsonable(value), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        # mtime=0 keeps the gzipped bytes, and so its ETag, the same
+        # across workers.
+        self.gzipped_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = '"{}"'.format(digest)
+        self.gzip_etag = '"{}{}"'.format(digest, GZIP_ETAG_SUFFIX)
+
+    def render(
+        self, if_none_match: Optional[str], accept_encoding: Optional[str]
+    ) -> RenderedResponse:
+        """
+        Return the response to send given the request's
+        If-None-Match and Accept-Encoding header values.
+        """
+        use_gzip = _accepts_gzip(accept_encoding)
+        headers = {
+            "ETag": self.gzip_etag if use_gzip else self.etag,
+            "Cache-Control": "public, max-age={}".format(
+                settings.CATALOG_RESPONSE_MAX_AGE
+            ),
+            "Vary": "Accept-Encoding",
+        }
+        if _etag_matches(if_none_match, (self.etag, self.gzip_etag)):
+            return RenderedResponse(status_code=304, headers=headers, body=b"")
+        headers["Content-Type"] = JSON_MEDIA_TYPE
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return RenderedResponse(
+                status_code=200, headers=headers, body=self.gzipped_body
+            )
+        return RenderedResponse(status_code=200, headers=headers, body=self.body)
+
+
+class CatalogResponses:
+    """
+    Build each catalog endpoint response at most once per catalog
+    version. When the catalog changes the responses are discarded and
+    rebuilt from the new version on demand.
+    """
+
+    def __init__(
+        self,
+        lookup_factory: Callable[
+            [], resource_lookup.BIELHelperResourceJsonLookup
+        ] = resource_lookup.BIELHelperResourceJsonLookup,
+    ) -> None:
+        self._lookup_factory = lookup_factory
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._responses: dict[str, PrecomputedResponse] = {}
+        self._build_count = 0
+
+    @icontract.require(lambda name: name)
+    def response(
+        self,
+        name: str,
+        build: Callable[[resource_lookup.BIELHelperResourceJsonLookup], Any],
+    ) -> PrecomputedResponse:
+        """
+        Return the PrecomputedResponse for name for the current catalog
+        version, calling build with a BIELHelperResourceJsonLookup to
+        obtain its value if it hasn't been built yet for this version.
+        """
+        lookup_svc = self._lookup_factory()
+        version = lookup_svc.catalog_version
+        precomputed_response = (
+            self._responses.get(name) if version == self._version else None
+        )
+        if precomputed_response is not None:
+            return precomputed_response
+        with self._lock:
+            if version != self._version:
+                logger.debug("Catalog version changed to %s", version)
+                self._version = version
+                self._responses = {}
+            precomputed_response = self._responses.get(name)
+            if precomputed_response is None:
+                precomputed_response = PrecomputedResponse(build(lookup_svc))
+                self._responses[name] = precomputed_response
+                self._build_count += 1
+            return precomputed_response
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters suitable for exposing to monitoring."""
+        return {
+            "version": self._version,
+            "responses": sorted(self._responses),
+            "build_count": self._build_count,
+        }
@@ -8,6 +8,7 @@ import logging  # For logdecorator
 import os
 import smtplib
 import subprocess
+import time
 from email import encoders
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
@@ -17,12 +18,14 @@ from typing import Generator, Iterable, Optional, Union
 import icontract
 import pdfkit
 from document.config import settings
-from document.domain import assembly_strategies, bible_books, model
+from document.domain import assembly_strategies, bible_books, model, resource_lookup
+from document.domain.parsed_resource_cache import parsed_resource_cache
 from document.domain.resource import (
     Resource,
+    provision_asset_files,
     resource_factory,
 )
-from document.utils import file_utils
+from document.utils import disk_cache, file_utils
 from logdecorator import log_on_start
 from more_itertools import partition
 from pydantic import EmailStr
@@ -50,6 +53,8 @@ def _update_found_resources_with_content(
     for later reporting.
     """
     unloaded_resources: list[Resource] = []
+    cached = 0
+    saved_seconds = 0.0
     for resource in found_resources:
         # usfm_tools parser can throw a MalformedUsfmError parse error if the
         # USFM for the resource is malformed (from the perspective of the
@@ -57,7 +62,9 @@ def _update_found_resources_with_content(
         # reporting on the cover page of the generated PDF and log the issue,
         # but continue handling other resources in the document request.
         try:
-            resource.update_resource_with_asset_content()
+            outcome = parsed_resource_cache.update_resource_with_asset_content(
+                resource
+            )
         except exceptions.MalformedUsfmError:
             unloaded_resources.append(resource)
             logger.debug(
@@ -67,6 +74,17 @@ def _update_found_resources_with_content(
                 resource,
             )
             logger.exception("Caught exception:")
+        else:
+            if outcome.cached:
+                cached += 1
+                saved_seconds += max(outcome.parse_seconds - outcome.seconds, 0.0)
+    if found_resources:
+        logger.info(
+            "Parsed content of %s of %s resources found in cache, %.3f seconds saved",
+            cached,
+            len(found_resources),
+            saved_seconds,
+        )
     return unloaded_resources
 
 
@@ -353,6 +371,26 @@ def _pdf_output_filename(document_request_key: str) -> str:
     return os.path.join(settings.output_dir(), "{}.pdf".format(document_request_key))
 
 
+@icontract.require(lambda resources: resources)
+def _lookup_resource_locations(
+    resources: list[Resource],
+) -> dict[model.ResourceRequest, model.ResourceLookupDto]:
+    """
+    Resolve the locations of all the resources of a document request
+    against the catalog in one step.
+    """
+    start = time.perf_counter()
+    resource_lookup_dtos = resource_lookup.lookup_many(
+        [resource.resource_request for resource in resources]
+    )
+    logger.info(
+        "Looked up %s resource locations in %.4f seconds",
+        len(resource_lookup_dtos),
+        time.perf_counter() - start,
+    )
+    return resource_lookup_dtos
+
+
 @icontract.require(
     lambda document_request: document_request
     and document_request.resource_requests
@@ -370,43 +408,58 @@ def run(document_request: model.DocumentRequest) -> tuple[str, str]:
     This is the main entry point for this module and the
     backend system as a whole.
     """
-    resources = _resources_from(document_request.resource_requests)
+    # Materialize as resources are used by more than one step below.
+    resources = list(_resources_from(document_request.resource_requests))
     document_request_key = _document_request_key(
         document_request.resource_requests, document_request.assembly_strategy_kind
     )
     output_filename = _pdf_output_filename(document_request_key)
 
-    # Immediately return pre-built PDF if the document previously been
-    # generated and is fresh enough. In that case, front run all requests to
-    # the cloud including the more low level resource asset caching
-    # mechanism for comparatively immediate return of PDF.
-    if file_utils.asset_file_needs_update(output_filename):
-        unfound_resources, found_resources = partition(
-            lambda resource: resource.find_location(), resources
-        )
-        # Need to use items produced by these two generators again so
-        # materialize them into a list.
-        found_resources_list = list(found_resources)
-        unfound_resources_list = list(unfound_resources)
-
-        for resource in found_resources_list:
-            resource.provision_asset_files()
-
-        for resource in unfound_resources:
-            logger.info("%s was not found", resource)
-
-        unloaded_resources = _update_found_resources_with_content(found_resources_list)
-
-        _generate_pdf(
-            output_filename,
-            document_request_key,
-            document_request,
-            found_resources_list,
-            unfound_resources_list,
-            unloaded_resources,
-        )
-    if _should_send_email(document_request.email_address):
-        _send_email_with_pdf_attachment(
-            document_request.email_address, output_filename, document_request_key
-        )
+    # Keep the assets and document this request uses from being
+    # evicted from disk while it is in flight.
+    with disk_cache.in_use(
+        [resource.resource_dir for resource in resources] + [output_filename]
+    ):
+        # Immediately return pre-built PDF if the document previously been
+        # generated and is fresh enough. In that case, front run all requests to
+        # the cloud including the more low level resource asset caching
+        # mechanism for comparatively immediate return of PDF.
+        if file_utils.asset_file_needs_update(output_filename):
+            resource_lookup_dtos = _lookup_resource_locations(resources)
+            unfound_resources, found_resources = partition(
+                lambda resource: resource.set_location(
+                    resource_lookup_dtos[resource.resource_request]
+                ),
+                resources,
+            )
+            # Need to use items produced by these two generators again so
+            # materialize them into a list.
+            found_resources_list = list(found_resources)
+            unfound_resources_list = list(unfound_resources)
+
+            # Resources whose assets could not be provisioned are
+            # reported as not found.
+            for resource in provision_asset_files(found_resources_list):
+                found_resources_list.remove(resource)
+                unfound_resources_list.append(resource)
+
+            for resource in unfound_resources_list:
+                logger.info("%s was not found", resource)
+
+            unloaded_resources = _update_found_resources_with_content(
+                found_resources_list
+            )
+
+            _generate_pdf(
+                output_filename,
+                document_request_key,
+                document_request,
+                found_resources_list,
+                unfound_resources_list,
+                unloaded_resources,
+            )
+        if _should_send_email(document_request.email_address):
+            _send_email_with_pdf_attachment(
+                document_request.email_address, output_filename, document_request_key
+            )
     return document_request_key, output_filename
@@ -49,6 +49,11 @@ class ResourceRequest(BaseModel):
     resource_type: str
     resource_code: str
 
+    class Config:
+        # Make instances immutable and hashable so that they can be
+        # used as dictionary keys, e.g., by resource_lookup.lookup_many.
+        frozen = True
+
 
 # See
 # https://pydantic-docs.helpmanual.io/usage/types/#enums-and-choices
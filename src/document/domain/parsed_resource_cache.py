@@ -0,0 +1,351 @@
+"""
+Cache the content parsed from resources' asset files on disk so that
+document requests for the same language, resource type and book reuse
+it rather than parse the asset files again, e.g., transform USFM or
+convert Markdown to HTML.
+
+Cached content is keyed by the resource request, the version of the
+asset it was parsed from, see Resource.asset_version, what else it
+depends on, see Resource.payload_context, and the version of the code
+that parsed it, see code_version. It is a pickle file in
+working_dir/parsed which disk_cache evicts, on its own, like an asset,
+so that entries no request uses any more, e.g., those parsed by an
+older version of the code, go first.
+Each worker also keeps the content its requests used most recently in
+memory, see ParsedPayloadLRU.
+"""
+
+import contextlib
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+
+import icontract
+
+from document import config
+from document.config import settings
+from document.domain import model, resource
+from document.markdown_extensions import (
+    link_transformer_preprocessor,
+    remove_section_preprocessor,
+)
+from document.utils import (
+    asset_fs,
+    asset_index,
+    disk_cache,
+    html_parsing_utils,
+    tw_utils,
+    usfm_utils,
+)
+
+logger = settings.logger(__name__)
+
+# Name of the directory in working_dir where parsed content is cached,
+# one of disk_cache.ENTRY_DIRS.
+PARSED_DIR = "parsed"
+
+# The modules whose code determines the parsed content.
+PARSING_MODULES = [
+    config,
+    model,
+    resource,
+    link_transformer_preprocessor,
+    remove_section_preprocessor,
+    asset_fs,
+    asset_index,
+    html_parsing_utils,
+    tw_utils,
+    usfm_utils,
+]
+
+
+class ParseOutcome(NamedTuple):
+    """How a resource's content was obtained, see ParsedResourceCache."""
+
+    # Whether it was found in the cache.
+    cached: bool
+    # How long it took, in seconds, to parse or to load from the cache.
+    seconds: float
+    # How long parsing took when it was cached, i.e., a cache hit
+    # saves parse_seconds - seconds. 0 for a miss.
+    parse_seconds: float
+
+
+@lru_cache(maxsize=None)
+def code_version() -> str:
+    """
+    Return a hash of the source code of the modules that parse and of
+    settings.PARSED_RESOURCE_CACHE_SALT.
+    """
+    sha256 = hashlib.sha256(settings.PARSED_RESOURCE_CACHE_SALT.encode("utf-8"))
+    for module in PARSING_MODULES:
+        assert module.__file__
+        with open(module.__file__, "rb") as fin:
+            sha256.update(fin.read())
+    return sha256.hexdigest()
+
+
+def cache_key(resource_: resource.Resource) -> Optional[str]:
+    """
+    Return the key of resource_'s parsed content or None if the
+    version of its asset is unknown and so it can't be cached.
+    """
+    if resource_.asset_version is None:
+        return None
+    return hashlib.sha256(
+        "\n".join(
+            [
+                code_version(),
+                type(resource_).__name__,
+                resource_.lang_code,
+                resource_.resource_type,
+                resource_.resource_code,
+                resource_.asset_version,
+                *resource_.payload_context,
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(
+        settings.working_dir(), PARSED_DIR, key[:2], "{}.pickle".format(key)
+    )
+
+
+class ParsedPayloadLRU:
+    """
+    A least recently used, thread safe cache of parsed content bounded
+    by the size, in bytes, of the content pickled.
+
+    Cached content is shared, see _copy.
+    """
+
+    @icontract.require(lambda max_bytes: max_bytes >= 0)
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # The parse time, content and size of each entry.
+        self._entries: OrderedDict[str, tuple[float, Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> Optional[tuple[float, Any]]:
+        """Return the parse time and content cached for key, if any."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key: str, parse_seconds: float, payload: Any, size: int) -> None:
+        """
+        Cache payload, which takes up size bytes pickled, for key,
+        evicting the least recently used content to make room for it.
+        Content larger than the cache as a whole isn't cached.
+        """
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            if size > self._max_bytes:
+                return
+            self._entries[key] = (parse_seconds, payload, size)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Empty the cache and reset its counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = self._hits = self._misses = self._evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return the footprint and counters suitable for exposing to monitoring."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+
+def _copy(payload: Any) -> Any:
+    """
+    Return a copy of payload for a resource to use, leaving payload
+    as cached. Only the translation words' content and uses are
+    modified after parsing, see TWResource.translation_words_section
+    and TWResource.translation_word_links, the rest is shared.
+    """
+    if isinstance(payload, model.TWLanguagePayload):
+        return model.TWLanguagePayload(
+            name_content_pairs=[
+                name_content_pair.copy()
+                for name_content_pair in payload.name_content_pairs
+            ],
+            uses={
+                localized_word: list(uses)
+                for localized_word, uses in payload.uses.items()
+            },
+        )
+    return payload
+
+
+class ParsedResourceCache:
+    """
+    Initialize resources with their parsed content from memory or
+    disk, or parse it and cache it, and keep count of hits and time
+    saved.
+    """
+
+    @icontract.require(lambda max_memory_bytes: max_memory_bytes >= 0)
+    def __init__(self, max_memory_bytes: int) -> None:
+        self._lock = threading.Lock()
+        self._memory = ParsedPayloadLRU(max_memory_bytes)
+        self._hits = 0
+        self._memory_hits = 0
+        self._misses = 0
+        self._uncacheable = 0
+        self._errors = 0
+        self._saved_seconds = 0.0
+
+    def _load(self, entry_path: str) -> Optional[tuple[float, Any, int]]:
+        """
+        Return the parse time, content and size cached at entry_path or
+        None if there is none or it is unreadable.
+        """
+        try:
+            with open(entry_path, "rb") as fin:
+                parse_seconds, payload = pickle.load(fin)
+                size = os.fstat(fin.fileno()).st_size
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception("Discarding unreadable %s: ", entry_path)
+            with self._lock:
+                self._errors += 1
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(entry_path)
+            return None
+        return parse_seconds, payload, size
+
+    def _store(self, entry_path: str, pickled: bytes) -> None:
+        """
+        Cache pickled at entry_path, atomically so that concurrent
+        readers never see a partial entry.
+        """
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(entry_path), prefix=".tmp."
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as fout:
+                fout.write(pickled)
+            os.replace(temp_path, entry_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temp_path)
+            raise
+
+    def _hit(
+        self, resource_: resource.Resource, start: float, parse_seconds: float
+    ) -> ParseOutcome:
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self._hits += 1
+            self._saved_seconds += max(parse_seconds - seconds, 0.0)
+        logger.debug("Parsed content of %s found in cache", resource_)
+        return ParseOutcome(True, seconds, parse_seconds)
+
+    def update_resource_with_asset_content(
+        self, resource_: resource.Resource
+    ) -> ParseOutcome:
+        """
+        Initialize resource_ with its cached content or, if it isn't
+        cached, call resource_.update_resource_with_asset_content and
+        cache the content. Exceptions parsing raises, e.g.,
+        MalformedUsfmError, propagate and nothing is cached.
+        """
+        start = time.perf_counter()
+        key = cache_key(resource_) if settings.PARSED_RESOURCE_CACHE_ENABLED else None
+        if key is None:
+            resource_.update_resource_with_asset_content()
+            with self._lock:
+                self._uncacheable += 1
+            return ParseOutcome(False, time.perf_counter() - start, 0.0)
+        memory_entry = self._memory.get(key)
+        if memory_entry is not None:
+            parse_seconds, payload = memory_entry
+            resource_.payload = _copy(payload)
+            with self._lock:
+                self._memory_hits += 1
+            return self._hit(resource_, start, parse_seconds)
+        entry_path = _entry_path(key)
+        # Keep the cache from being evicted while using it.
+        with disk_cache.in_use([entry_path]):
+            entry = self._load(entry_path)
+            if entry is not None:
+                parse_seconds, payload, size = entry
+                self._memory.put(key, parse_seconds, payload, size)
+                resource_.payload = _copy(payload)
+                return self._hit(resource_, start, parse_seconds)
+            resource_.update_resource_with_asset_content()
+            parse_seconds = time.perf_counter() - start
+            # Cache a copy as the resource may go on to modify its
+            # content.
+            payload = _copy(resource_.payload)
+            try:
+                pickled = pickle.dumps(
+                    (parse_seconds, payload), protocol=pickle.HIGHEST_PROTOCOL
+                )
+                self._store(entry_path, pickled)
+            except Exception:
+                # The content is parsed, caching it is only an
+                # optimization.
+                logger.exception("Caching parsed content of %s failed: ", resource_)
+                with self._lock:
+                    self._errors += 1
+            else:
+                self._memory.put(key, parse_seconds, payload, len(pickled))
+        with self._lock:
+            self._misses += 1
+        return ParseOutcome(False, time.perf_counter() - start, 0.0)
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit and miss counters suitable for exposing to monitoring."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            stats: dict[str, Any] = {
+                "hits": self._hits,
+                "memory_hits": self._memory_hits,
+                "misses": self._misses,
+                "uncacheable": self._uncacheable,
+                "errors": self._errors,
+                "hit_ratio": self._hits / lookups if lookups else None,
+                "saved_seconds": round(self._saved_seconds, 4),
+            }
+        stats["memory"] = self._memory.stats()
+        return stats
+
+
+# The cache shared by the requests a worker handles.
+parsed_resource_cache = ParsedResourceCache(
+    settings.PARSED_RESOURCE_MEMORY_CACHE_MAX_BYTES
+)
@@ -10,17 +10,16 @@ import logging  # For logdecorator
 import os
 import pathlib
 import re
-import shutil
-import subprocess
-from glob import glob
-from typing import Any, Optional, Protocol
+import threading
+import zipfile
+from concurrent import futures
+from typing import Any, Callable, Optional, Protocol, TypeVar
+from urllib import parse as urllib_parse
 
-import bs4
 import icontract
 import markdown
 from logdecorator import log_on_end, log_on_start
 from pydantic import AnyUrl
-from usfm_tools.transform import UsfmTransform
 
 from document.config import settings
 from document.domain import bible_books, model, resource_lookup
@@ -28,12 +27,23 @@ from document.markdown_extensions import (
     link_transformer_preprocessor,
     remove_section_preprocessor,
 )
-from document.utils import file_utils, html_parsing_utils, tw_utils, url_utils
+from document.utils import (
+    asset_fs,
+    asset_index,
+    file_utils,
+    git_utils,
+    html_parsing_utils,
+    tw_utils,
+    url_utils,
+    usfm_utils,
+)
 
 logger = settings.logger(__name__)
 
 H1, H2, H3, H4 = "h1", "h2", "h3", "h4"
 
+T = TypeVar("T")
+
 
 class Resource:
     """
@@ -83,6 +93,12 @@ class Resource:
 
         # Location/lookup related
         self._resource_lookup_dto: model.ResourceLookupDto
+        # The version of the asset provisioned for this resource, see
+        # _asset_version.
+        self._asset_version: Optional[str] = None
+        # The files of the asset provisioned for this resource, see
+        # asset_index.
+        self._asset_index: Optional[asset_index.AssetIndex] = None
 
         # Content related instance vars
         self._content_files: list[str] = []
@@ -101,6 +117,10 @@ class Resource:
             self.lang_code, self.resource_type, self.resource_code
         )
 
+    # The resource_lookup class that looks up the location of this
+    # kind of resource. Subclasses override.
+    lookup_class: type
+
     @abc.abstractmethod
     def find_location(self) -> bool:
         """
@@ -112,6 +132,18 @@ class Resource:
         """
         raise NotImplementedError
 
+    def set_location(self, resource_lookup_dto: model.ResourceLookupDto) -> bool:
+        """
+        Like find_location, but use resource_lookup_dto, e.g., as found
+        by resource_lookup.lookup_many for a whole document request,
+        rather than looking it up. Return True if its url is not None,
+        False otherwise.
+        """
+        # Take a copy as resource_url's setter updates it and the
+        # instance may be shared with other resources.
+        self._resource_lookup_dto = resource_lookup_dto.copy()
+        return self._resource_lookup_dto.url is not None
+
     @abc.abstractmethod
     def provision_asset_files(self) -> None:
         """
@@ -120,6 +152,39 @@ class Resource:
         """
         raise NotImplementedError
 
+    # Whether this resource reads its asset files directly from its zip
+    # asset, when settings.ASSET_ZIPS_READ_IN_PLACE, see asset_fs.
+    reads_zip_asset_in_place = False
+
+    @property
+    def asset_selection(self) -> str:
+        """
+        Name the part of this resource's zip asset, which is shared
+        with the resources for the language's other books, that this
+        resource needs. See needs_asset_member.
+        """
+        return self.resource_code
+
+    def needs_asset_member(self, member: str) -> bool:
+        """
+        Return True if this resource needs member, the path of a file
+        in its zip asset, to be extracted. By default, the files that
+        are named after this resource's book.
+        """
+        return self.resource_code.lower() in member.lower()
+
+    @property
+    def sparse_checkout_patterns(self) -> list[str]:
+        """
+        Return the sparse-checkout patterns, see git_utils, matching
+        the files of this resource's git asset that it needs. By
+        default, the files at the top of the repo and those whose path
+        contains this resource's book.
+        """
+        return TOP_LEVEL_FILES_PATTERNS + [
+            "*{}*".format(_case_insensitive_pattern(self.resource_code))
+        ]
+
     @abc.abstractmethod
     def update_resource_with_asset_content(self) -> None:
         """
@@ -129,6 +194,36 @@ class Resource:
         """
         raise NotImplementedError
 
+    @property
+    def payload(self) -> Any:
+        """
+        Return the content that update_resource_with_asset_content
+        initializes the resource with.
+
+        Subclasses override.
+        """
+        raise NotImplementedError
+
+    @payload.setter
+    def payload(self, value: Any) -> None:
+        """
+        Initialize the resource with content, e.g., cached, that
+        update_resource_with_asset_content initialized another
+        instance of the same resource with.
+
+        Subclasses override.
+        """
+        raise NotImplementedError
+
+    @property
+    def payload_context(self) -> list[str]:
+        """
+        Return what, besides the resource request and the asset's
+        version, the content update_resource_with_asset_content
+        initializes the resource with depends on.
+        """
+        return []
+
     @property
     def lang_code(self) -> str:
         """Provide public interface for other modules."""
@@ -175,6 +270,11 @@ class Resource:
         """Provide public interface for other modules."""
         return self._resource_lookup_dto.source
 
+    @property
+    def resource_request(self) -> model.ResourceRequest:
+        """Provide public interface for other modules."""
+        return self._resource_request
+
     @property
     def resource_requests(self) -> list[model.ResourceRequest]:
         """Provide public interface for other modules."""
@@ -190,6 +290,33 @@ class Resource:
         """Provide public interface for other modules."""
         self._resource_dir = value
 
+    @property
+    def asset_version(self) -> Optional[str]:
+        """Provide public interface for other modules."""
+        return self._asset_version
+
+    @asset_version.setter
+    def asset_version(self, value: Optional[str]) -> None:
+        """Provide public interface for other modules."""
+        self._asset_version = value
+
+    @property
+    def asset_index(self) -> asset_index.AssetIndex:
+        """
+        Return the index of the files at resource_dir that the
+        provisioner loaded or, if it didn't, e.g., because this
+        resource's asset files were put in place otherwise, index them
+        now.
+        """
+        if self._asset_index is None or self._asset_index.root != self.resource_dir:
+            self._asset_index = asset_index.AssetIndex.build(self.resource_dir)
+        return self._asset_index
+
+    @asset_index.setter
+    def asset_index(self, value: asset_index.AssetIndex) -> None:
+        """Provide public interface for other modules."""
+        self._asset_index = value
+
 
 class USFMResource(Resource):
     """
@@ -197,6 +324,8 @@ class USFMResource(Resource):
     the case of a USFM resource.
     """
 
+    lookup_class = resource_lookup.USFMResourceJsonLookup
+
     def __init__(self, *args, **kwargs) -> None:  # type: ignore
         super().__init__(*args, **kwargs)
         self._chapter_content: dict[model.ChapterNum, model.USFMChapter] = {}
@@ -217,11 +346,11 @@ class USFMResource(Resource):
     )
     def find_location(self) -> bool:
         """See docstring in superclass."""
-        resource_lookup_dto: model.ResourceLookupDto = self._finder.lookup(
-            self.lang_code, self.resource_type, self.resource_code
+        # Lookup results are cached and shared, set_location takes a
+        # copy.
+        return self.set_location(
+            self._finder.lookup(self.lang_code, self.resource_type, self.resource_code)
         )
-        self._resource_lookup_dto = resource_lookup_dto
-        return self._resource_lookup_dto.url is not None
 
     def _update_resource_dir(self) -> None:
         """Update resource_dir."""
@@ -246,23 +375,13 @@ class USFMResource(Resource):
     def update_resource_with_asset_content(self) -> None:
         """See docstring in superclass."""
 
-        usfm_content_files: list[str] = []
-        txt_content_files: list[str] = []
-
         # We don't need a manifest file to find resource assets
-        # on disk. We just use globbing and then filter
+        # on disk. We just use the asset's index and then filter
         # down the list found to only include those
         # files that match the resource code, i.e., book, being requested.
         # This frees us from some of the brittleness of using manifests
         # to find files. Some resources do not provide a manifest
         # anyway.
-        usfm_content_files = glob("{}**/*.usfm".format(self._resource_dir))
-        if not usfm_content_files:
-            # USFM files sometimes have txt suffix instead of usfm
-            txt_content_files = glob("{}**/*.txt".format(self._resource_dir))
-            # Sometimes the txt USFM files live at another location
-            if not txt_content_files:
-                txt_content_files = glob("{}**/**/*.txt".format(self._resource_dir))
 
         # If desired, in the case where a manifest must be consulted
         # to determine if the file is considered usable, i.e.,
@@ -270,25 +389,9 @@ class USFMResource(Resource):
         # the filtered file(s) against the manifest's 'finished' list
         # to see if it can be used. Such logic could live
         # approximately here if desired.
-        if usfm_content_files:
-            # Only use the content files that match the resource_code
-            # in the resource request.
-            self._content_files = list(
-                filter(
-                    lambda usfm_content_file: self._resource_request.resource_code.lower()
-                    in str(usfm_content_file).lower(),
-                    usfm_content_files,
-                )
-            )
-        elif txt_content_files:
-            # Only use the content files that match the resource_code.
-            self._content_files = list(
-                filter(
-                    lambda txt_content_file: self._resource_request.resource_code.lower()
-                    in str(txt_content_file).lower(),
-                    txt_content_files,
-                )
-            )
+        self._content_files = self.asset_index.usfm_files(
+            self._resource_request.resource_code
+        )
 
         logger.debug("self._content_files: %s", self._content_files)
 
@@ -334,33 +437,39 @@ class USFMResource(Resource):
             #     self._content_files = [filename]
             # logger.debug("self._content_files[0]: %s", self._content_files[0])
 
-            # Convert the USFM to HTML and store in file. USFM-Tools books.py can
+            # Convert the USFM to HTML and split it into chapters and verses
+            # as it is rendered, in memory. USFM-Tools books.py can
             # raise MalformedUsfmError when the following code is called. The
             # document_generator module will catch that error but continue with
             # other resource requests in the same document request.
-            UsfmTransform.buildSingleHtmlFromFile(
-                pathlib.Path(self._content_files[0]),
-                self._output_dir,
-                self._resource_filename,
-            )
-            # Read the HTML file into _content.
-            html_file = "{}.html".format(
-                os.path.join(self._output_dir, self._resource_filename)
+            self._html_initializer._initialize_chapters(
+                usfm_utils.usfm_chapters(
+                    self._content_files[0], str(self._book_number)
+                )
             )
-            assert os.path.exists(html_file)
-            self._content = file_utils.read_file(html_file)
-
-            self._html_initializer._initialize_verses_html()
 
     @property
     def chapter_content(self) -> dict[model.ChapterNum, model.USFMChapter]:
         """Provide public interface for other modules."""
         return self._chapter_content
 
+    @property
+    def payload(self) -> dict[model.ChapterNum, model.USFMChapter]:
+        """See docstring in superclass."""
+        return self._chapter_content
+
+    @payload.setter
+    def payload(self, value: dict[model.ChapterNum, model.USFMChapter]) -> None:
+        """See docstring in superclass."""
+        self._chapter_content = value
+
 
 class TResource(Resource):
     """Provide methods common to all subclasses of TResource."""
 
+    lookup_class = resource_lookup.TResourceJsonLookup
+    reads_zip_asset_in_place = True
+
     def __init__(self, *args, **kwargs) -> None:  # type: ignore
         super().__init__(*args, **kwargs)
         self._finder: resource_lookup.TResourceJsonLookup = (
@@ -369,11 +478,11 @@ class TResource(Resource):
 
     def find_location(self) -> bool:
         """See docstring in superclass."""
-        resource_lookup_dto: model.ResourceLookupDto = self._finder.lookup(
-            self.lang_code, self.resource_type, self.resource_code
+        # Lookup results are cached and shared, set_location takes a
+        # copy.
+        return self.set_location(
+            self._finder.lookup(self.lang_code, self.resource_type, self.resource_code)
         )
-        self._resource_lookup_dto = resource_lookup_dto
-        return self._resource_lookup_dto.url is not None
 
     def provision_asset_files(self) -> None:
         """
@@ -382,6 +491,76 @@ class TResource(Resource):
         """
         ResourceProvisioner(self)()
 
+    @property
+    def sparse_checkout_patterns(self) -> list[str]:
+        """
+        Match the directory named after this resource's book, e.g.,
+        01-gen or gen, as well as the front matter and the files at the
+        top of the repo.
+        """
+        return TOP_LEVEL_FILES_PATTERNS + [
+            "/front/",
+            "*{}/".format(_case_insensitive_pattern(self.resource_code)),
+        ]
+
+    def needs_asset_member(self, member: str) -> bool:
+        """
+        Return True for the files of the directory named after this
+        resource's book, e.g., 01-gen or gen, as well as for the front
+        matter and the files at the top of the zip asset.
+        """
+        dirs = member.lower().split("/")[:-1]
+        return (
+            len(dirs) <= 1
+            or dirs[1] == "front"
+            or any(dir_.endswith(self.resource_code.lower()) for dir_ in dirs)
+        )
+
+    @property
+    def payload(self) -> Any:
+        """See docstring in superclass."""
+        return self._book_payload
+
+    @payload.setter
+    def payload(self, value: Any) -> None:
+        """See docstring in superclass."""
+        self._book_payload = value
+
+    @property
+    def payload_context(self) -> list[str]:
+        """
+        Links in the Markdown content are converted depending on the
+        translation words asset and on the link context.
+        """
+        return [tw_utils.tw_asset_version(self.lang_code) or ""] + list(
+            self.link_context
+        )
+
+    @property
+    def link_context(self) -> tuple[str, ...]:
+        """
+        Return which translation words and notes the document request
+        includes, which is what converting links in the Markdown
+        content depends on, see LinkTransformerPreprocessor.
+        """
+        return (
+            str(
+                any(
+                    link_transformer_preprocessor.TW in resource_request.resource_type
+                    for resource_request in self.resource_requests
+                )
+            ),
+            *sorted(
+                "{}-{}-{}".format(
+                    resource_request.lang_code,
+                    resource_request.resource_type,
+                    resource_request.resource_code,
+                )
+                for resource_request in self.resource_requests
+                if link_transformer_preprocessor.TN in resource_request.resource_type
+            ),
+        )
+
     @icontract.require(
         lambda lang_code, resource_requests: lang_code and resource_requests
     )
@@ -401,7 +580,11 @@ class TResource(Resource):
         """
         if not tw_resource_dir:
             tw_resource_dir = tw_utils.tw_resource_dir(lang_code)
-        translation_words_dict = tw_utils.translation_words_dict(tw_resource_dir)
+        translation_words: dict[str, tw_utils.TranslationWord] = {}
+        if tw_resource_dir:
+            translation_words = tw_utils.translation_word_stores.get(
+                tw_resource_dir
+            ).words()
         return markdown.Markdown(
             extensions=[
                 remove_section_preprocessor.RemoveSectionExtension(),
@@ -411,9 +594,9 @@ class TResource(Resource):
                         self.resource_requests,
                         "The list of resource requests contained in the document request.",
                     ],
-                    translation_words_dict=[
-                        translation_words_dict,
-                        "Dictionary mapping translation word asset file name sans suffix to translation word asset file path.",
+                    translation_words=[
+                        translation_words,
+                        "Dictionary mapping translation word asset file name sans suffix to translation word.",
                     ],
                 ),
             ]
@@ -558,6 +741,31 @@ class TWResource(TResource):
         super().__init__(*args, **kwargs)
         self._language_payload: model.TWLanguagePayload
         self._html_initializer = TWHtmlInitializer(self)
+        self._translation_word_matcher: Optional[tw_utils.TranslationWordMatcher] = None
+
+    @property
+    def asset_selection(self) -> str:
+        """
+        Translation words are not organized by book, every book needs
+        the whole dictionary.
+        """
+        return "bible"
+
+    @property
+    def sparse_checkout_patterns(self) -> list[str]:
+        """
+        Match the translation words dictionary and the files at the top
+        of the repo.
+        """
+        return TOP_LEVEL_FILES_PATTERNS + ["/bible/"]
+
+    def needs_asset_member(self, member: str) -> bool:
+        """
+        Return True for the files of the translation words dictionary
+        and those at the top of the zip asset.
+        """
+        dirs = member.split("/")[:-1]
+        return len(dirs) <= 1 or "bible" in dirs
 
     def update_resource_with_asset_content(self) -> None:
         """
@@ -573,6 +781,17 @@ class TWResource(TResource):
         """Provide public interface for other modules."""
         return self._language_payload
 
+    @property
+    def payload(self) -> model.TWLanguagePayload:
+        """See docstring in superclass."""
+        return self._language_payload
+
+    @payload.setter
+    def payload(self, value: model.TWLanguagePayload) -> None:
+        """See docstring in superclass."""
+        self._language_payload = value
+        self._translation_word_matcher = None
+
     def translation_word_links(
         self,
         chapter_num: model.ChapterNum,
@@ -585,13 +804,18 @@ class TWResource(TResource):
         """
         html: list[model.HtmlContent] = []
         uses: list[model.TWUse] = []
+        if self._translation_word_matcher is None:
+            self._translation_word_matcher = tw_utils.translation_word_matcher(
+                tuple(
+                    name_content_pair.localized_word
+                    for name_content_pair in self._language_payload.name_content_pairs
+                )
+            )
+        # The words that occur as whole words in the verse's text.
+        localized_words = self._translation_word_matcher.matches(verse)
         name_content_pair: model.TWNameContentPair
         for name_content_pair in self._language_payload.name_content_pairs:
-            # This checks that the word occurs as an exact sub-string in
-            # the verse.
-            if re.search(
-                r"\b{}\b".format(re.escape(name_content_pair.localized_word)), verse
-            ):
+            if name_content_pair.localized_word in localized_words:
                 use = model.TWUse(
                     lang_code=self.lang_code,
                     book_id=self.resource_code,
@@ -852,24 +1076,67 @@ class ResourceProvisioner:
             )
 
             logger.debug("resource_filepath: %s", resource_filepath)
-            # Check if resource assets need updating otherwise use
-            # what we already have on disk.
-            if file_utils.asset_file_needs_update(resource_filepath):
-                if _is_git(self._resource.resource_source):
-                    self._clone_git_repo(resource_filepath)
-                else:
-                    self._download_asset(resource_filepath)
-
-                if _is_zip(self._resource.resource_source):
+            # Only one thread or process at a time acquires a given
+            # asset. Others wait for it to finish and then find the
+            # asset fresh on disk. Checking freshness only once we
+            # hold the lock also ensures that we never use an asset
+            # that is still being downloaded, cloned or unzipped.
+            with file_utils.file_lock(resource_filepath):
+                # Check if resource assets need updating otherwise use
+                # what we already have on disk.
+                if file_utils.asset_needs_revalidation(resource_filepath):
+                    if _is_git(self._resource.resource_source):
+                        self._clone_git_repo(resource_filepath)
+                    else:
+                        self._refresh_asset(resource_filepath)
+                elif (
+                    _is_git(self._resource.resource_source)
+                    and settings.GIT_SPARSE_CHECKOUT
+                ):
+                    # The git asset is shared by the resources for the
+                    # language's other books, each adds what it needs
+                    # to the sparse checkout, when first needed.
+                    if git_utils.include_in_sparse_checkout(
+                        resource_filepath, self._resource.sparse_checkout_patterns
+                    ):
+                        asset_index.invalidate(resource_filepath)
+                self._resource.asset_version = _asset_version(resource_filepath)
+
+                if (
+                    _is_zip(self._resource.resource_source)
+                    and settings.ASSET_ZIPS_READ_IN_PLACE
+                    and self._resource.reads_zip_asset_in_place
+                ):
+                    self._mount_asset(resource_filepath)
+                    self._load_asset_index(resource_filepath)
+                    return
+                # The zip asset is shared by the resources for the
+                # language's other books, each extracts only what it
+                # needs, when first needed.
+                if _is_zip(
+                    self._resource.resource_source
+                ) and self._resource.asset_selection not in _extracted_selections(
+                    resource_filepath
+                ):
                     self._unzip_asset(resource_filepath)
-            if _is_git(self._resource.resource_source) or _is_zip(
-                self._resource.resource_source
-            ):
-                # When a git repo is cloned or when a zip file is
-                # unzipped, a subdirectory of resource_dir is created
-                # as a result. Update resource_dir to point to that
-                # subdirectory.
-                self._update_resource_dir()
+                if _is_git(self._resource.resource_source) or _is_zip(
+                    self._resource.resource_source
+                ):
+                    # When a git repo is cloned or when a zip file is
+                    # unzipped, a subdirectory of resource_dir is created
+                    # as a result. Update resource_dir to point to that
+                    # subdirectory.
+                    self._update_resource_dir()
+                self._load_asset_index(resource_filepath)
+
+    def _load_asset_index(self, resource_filepath: str) -> None:
+        """
+        Give the resource the index of the asset's files, as now
+        provisioned, so that it needn't glob them, see asset_index.
+        """
+        self._resource.asset_index = asset_index.load(
+            resource_filepath, self._resource.resource_dir
+        )
 
     def _update_resource_dir(self) -> None:
         """
@@ -890,63 +1157,256 @@ class ResourceProvisioner:
                 self._resource.resource_dir,
             )
 
+    @icontract.require(lambda self: self._resource.resource_url)
     def _clone_git_repo(self, resource_filepath: str) -> None:
         """
         Clone the git repo. If the repo was previously cloned but
-        the ASSET_CACHING_PERIOD has expired then delete the repo and
-        clone it again to get updates.
+        the ASSET_REVALIDATION_PERIOD has expired then bring it up to date
+        with the remote, which costs next to nothing if the remote
+        has not changed.
         """
-        if os.path.exists(resource_filepath):
-            logger.debug(
-                "About to delete pre-existing git repo %s in order to recreate it.",
-                resource_filepath,
-            )
-            try:
-                shutil.rmtree(resource_filepath)
-            except OSError:
-                logger.debug(
-                    "Directory %s was not removed due to an error.",
-                    resource_filepath,
-                )
-                logger.exception("Caught exception: ")
-        command = "git clone --depth=1 '{}' '{}'".format(
-            self._resource.resource_url, resource_filepath
+        logger.debug("Refreshing git repo %s ...", resource_filepath)
+        # refresh_repo falls back to cloning the repo again if it is
+        # corrupt and raises, if it still fails.
+        outcome = git_utils.refresh_repo(
+            str(self._resource.resource_url),
+            resource_filepath,
+            self._resource.sparse_checkout_patterns
+            if settings.GIT_SPARSE_CHECKOUT
+            else None,
         )
-        logger.debug("Attempting to clone into %s ...", resource_filepath)
-        try:
-            subprocess.call(command, shell=True)
-        except subprocess.SubprocessError:
-            logger.debug("git command: %s", command)
-            logger.debug("git clone failed!")
-        else:
-            logger.debug("git command: %s", command)
-            logger.debug("git clone succeeded.")
+        logger.info("Git repo %s %s.", resource_filepath, outcome)
+        asset_index.invalidate(resource_filepath)
 
     def _download_asset(self, resource_filepath: str) -> None:
         """Download the asset."""
         logger.debug(
             "Downloading %s into %s", self._resource.resource_url, resource_filepath
         )
-        # FIXME Might want to retry after some acceptable interval if there is a
-        # failure here due to network issues. It has happened very occasionally
-        # during testing that there has been a hiccup with the network at this
-        # point but succeeded on retry of the same test.
+        # download_file retries temporary network failures, resuming
+        # where they cut the download off, and raises, leaving
+        # resource_filepath as it was, if it still fails.
         url_utils.download_file(self._resource.resource_url, resource_filepath)
+        asset_index.invalidate(resource_filepath)
         logger.info("Downloading finished.")
 
+    @icontract.require(lambda self: self._resource.resource_url)
+    def _refresh_asset(self, resource_filepath: str) -> None:
+        """
+        Download the asset or, if we already have it, download it again
+        only if it changed upstream.
+        """
+        logger.debug(
+            "Refreshing %s from %s", resource_filepath, self._resource.resource_url
+        )
+        if url_utils.refresh_file(str(self._resource.resource_url), resource_filepath):
+            asset_index.invalidate(resource_filepath)
+            logger.info("Downloading finished.")
+        else:
+            logger.info("%s is unchanged upstream.", resource_filepath)
+
     @icontract.require(
         lambda resource_filepath: resource_filepath
         and os.path.exists(resource_filepath)
     )
+    def _use_intact_asset(self, resource_filepath: str, use: Callable[[], T]) -> T:
+        """
+        Make sure that the zip asset is intact, i.e., that its size
+        and checksum are those recorded when it was downloaded,
+        downloading it again if it is not, and then call use. If use
+        finds that the zip asset is corrupt nevertheless, download it
+        again and call use once more.
+        """
+        if not file_utils.file_is_intact(resource_filepath):
+            logger.info("%s is not intact, downloading it again.", resource_filepath)
+            self._download_asset(resource_filepath)
+        try:
+            return use()
+        except zipfile.BadZipFile:
+            # The asset was corrupt when the server sent it. Try once
+            # more from scratch.
+            logger.exception(
+                "Corrupt zip file %s, downloading it again.", resource_filepath
+            )
+            os.unlink(resource_filepath)
+            self._download_asset(resource_filepath)
+            return use()
+
+    def _mount_asset(self, resource_filepath: str) -> None:
+        """
+        Mount the zip asset, rather than unzip it, where it would be
+        unzipped and update resource_dir to point to its top
+        directory, as _update_resource_dir does for an unzipped asset.
+        """
+        root = self._resource.resource_dir
+        asset_file_system = asset_fs.mounted(resource_filepath, root)
+        if asset_file_system is None:
+            asset_file_system = self._use_intact_asset(
+                resource_filepath, lambda: asset_fs.mount(resource_filepath, root)
+            )
+        subdirs = [
+            path
+            for path in asset_file_system.glob("{}/*".format(root))
+            if asset_file_system.isdir(path)
+        ]
+        if subdirs:
+            self._resource.resource_dir = subdirs[0]
+            logger.debug("resource_dir updated: %s", self._resource.resource_dir)
+
     def _unzip_asset(self, resource_filepath: str) -> None:
-        """Unzip the asset."""
+        """
+        Unzip what this resource needs from the asset, first making
+        sure that it is intact.
+        """
         logger.debug(
-            "Unzipping %s into %s", resource_filepath, self._resource.resource_dir
+            "Unzipping %s of %s into %s",
+            self._resource.asset_selection,
+            resource_filepath,
+            self._resource.resource_dir,
+        )
+        self._use_intact_asset(
+            resource_filepath,
+            lambda: file_utils.unzip(
+                resource_filepath,
+                self._resource.resource_dir,
+                self._resource.needs_asset_member,
+            ),
         )
-        file_utils.unzip(resource_filepath, self._resource.resource_dir)
+        # Downloading the asset again records new metadata and thereby
+        # forgets what was extracted from the previous version.
+        metadata = file_utils.read_sidecar_metadata(resource_filepath)
+        metadata[EXTRACTED_KEY] = metadata.get(EXTRACTED_KEY, []) + [
+            self._resource.asset_selection
+        ]
+        file_utils.write_sidecar_metadata(resource_filepath, metadata)
+        asset_index.invalidate(resource_filepath)
         logger.info("Unzipping finished.")
 
 
+def _asset_version(resource_filepath: str) -> Optional[str]:
+    """
+    Return the version of the asset at resource_filepath: the commit
+    checked out for a git repo, otherwise the sha256 checksum recorded
+    when it was downloaded. Return None if it is unknown.
+    """
+    if os.path.isdir(resource_filepath):
+        return git_utils.local_head(resource_filepath)
+    version: Optional[str] = file_utils.read_sidecar_metadata(resource_filepath).get(
+        file_utils.SHA256_KEY
+    )
+    return version
+
+
+# Sparse-checkout patterns, see git_utils, matching the files, but not
+# the directories, at the top of a repo.
+TOP_LEVEL_FILES_PATTERNS = ["/*", "!/*/"]
+
+
+def _case_insensitive_pattern(text: str) -> str:
+    """
+    Return a glob pattern matching text regardless of case, e.g.,
+    [gG][eE][nN] for gen, as book names are cased inconsistently
+    across repos.
+    """
+    return "".join(
+        "[{}{}]".format(char.lower(), char.upper()) if char.isalpha() else char
+        for char in text
+    )
+
+
+# Key, in the sidecar metadata of a zip asset, of the selections, see
+# Resource.asset_selection, extracted from it so far.
+EXTRACTED_KEY = "extracted"
+
+
+def _extracted_selections(resource_filepath: str) -> list[str]:
+    """
+    Return the selections, see Resource.asset_selection, that have
+    been extracted from the zip asset at resource_filepath.
+    """
+    extracted: list[str] = file_utils.read_sidecar_metadata(resource_filepath).get(
+        EXTRACTED_KEY, []
+    )
+    return extracted
+
+
+# Semaphores, keyed by host, limiting the number of concurrent
+# provisionings from that host.
+_host_semaphores: dict[str, threading.BoundedSemaphore] = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    """Return the semaphore for the host of url."""
+    host = urllib_parse.urlparse(url).netloc
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(
+                settings.PROVISIONING_MAX_CONNECTIONS_PER_HOST
+            )
+        return _host_semaphores[host]
+
+
+def resources_by_asset(
+    resources: list[Resource],
+) -> dict[tuple[str, str], list[Resource]]:
+    """
+    Group resources by the asset, i.e., resource_dir and resource_url,
+    they share, e.g., the same resource type for different books.
+    """
+    assets: dict[tuple[str, str], list[Resource]] = {}
+    for resource in resources:
+        assets.setdefault(
+            (resource.resource_dir, str(resource.resource_url)), []
+        ).append(resource)
+    return assets
+
+
+def provision_resources_sharing_asset(resources: list[Resource]) -> None:
+    """
+    Provision resources, which all share the same resource_dir and
+    resource_url, i.e., asset. The first resource acquires the asset,
+    the rest then find it fresh on disk and only update their
+    resource_dir.
+    """
+    assert resources[0].resource_url
+    with _host_semaphore(resources[0].resource_url):
+        for resource in resources:
+            resource.provision_asset_files()
+
+
+def provision_asset_files(resources: list[Resource]) -> list[Resource]:
+    """
+    Provision the asset files of resources concurrently, acquiring
+    each distinct asset only once even if several resources, e.g., the
+    same resource type for different books, share it. Return the
+    resources whose provisioning failed.
+    """
+    assets = resources_by_asset(resources)
+    failed_resources: list[Resource] = []
+    if not assets:
+        return failed_resources
+    with futures.ThreadPoolExecutor(
+        max_workers=min(settings.PROVISIONING_MAX_WORKERS, len(assets)),
+        thread_name_prefix="provisioner",
+    ) as executor:
+        futures_to_resources = {
+            executor.submit(
+                provision_resources_sharing_asset, resources_sharing_asset
+            ): resources_sharing_asset
+            for resources_sharing_asset in assets.values()
+        }
+        for future in futures.as_completed(futures_to_resources):
+            try:
+                future.result()
+            except Exception:
+                logger.exception(
+                    "Provisioning %s failed: ", futures_to_resources[future]
+                )
+                failed_resources.extend(futures_to_resources[future])
+    return failed_resources
+
+
 @icontract.require(lambda resource_source: resource_source)
 def _is_zip(resource_source: str) -> bool:
     """Return true if resource_source is equal to 'zip'."""
@@ -985,157 +1445,51 @@ class USFMHtmlInitializer:
         return "USFMHtmlInitializer(resource: {})".format(self._resource)
 
     @icontract.require(lambda self: self._resource._content)
-    @icontract.ensure(lambda self: self._resource._chapter_content)
     def _initialize_verses_html(self) -> None:
         """
         Break apart the USFM HTML content into HTML chapter and verse
         chunks, augment HTML output with additional HTML elements and
         store in an instance variable.
         """
-        parser = bs4.BeautifulSoup(self._resource._content, "html.parser")
-
-        chapter_breaks = parser.find_all(H2, attrs={"class": "c-num"})
-        localized_chapter_heading = chapter_breaks[0].get_text().split()[0]
-        for chapter_break in chapter_breaks:
-            chapter_num = model.ChapterNum(int(chapter_break.get_text().split()[1]))
-            chapter_content = html_parsing_utils.tag_elements_between(
-                parser.find(
-                    H2,
-                    text="{} {}".format(localized_chapter_heading, chapter_num),
-                ),
-                # ).next_sibling,
-                parser.find(
-                    H2,
-                    text="{} {}".format(localized_chapter_heading, chapter_num + 1),
-                ),
-            )
-            chapter_content = [str(tag) for tag in list(chapter_content)]
-            chapter_content_parser = bs4.BeautifulSoup(
-                "".join(chapter_content),
-                "html.parser",
-            )
-            chapter_verse_tags: bs4.elements.ResultSet = (
-                chapter_content_parser.find_all("span", attrs={"class": "v-num"})
+        self._initialize_chapters(
+            html_parsing_utils.split_usfm_html(
+                self._resource._content, str(self._resource._book_number)
             )
-            chapter_footnote_tag: bs4.elements.ResultSet = chapter_content_parser.find(
-                "div", attrs={"class": "footnotes"}
-            )
-            chapter_footnotes = (
-                model.HtmlContent(str(chapter_footnote_tag))
-                if chapter_footnote_tag
-                else model.HtmlContent("")
-            )
-            # Get each verse opening span tag and then the actual verse text for
-            # this chapter and enclose them each in a p element.
-            chapter_verse_list = [
-                "<p>{} {}</p>".format(verse, verse.next_sibling)
-                for verse in chapter_verse_tags
-            ]
-            # Dictionary to hold verse number, verse value pairs.
-            chapter_verses: dict[str, str] = {}
-            for verse_element in chapter_verse_list:
-                (verse_num, verse_content_str,) = self._verse_num_and_verse_content_str(
-                    chapter_num, chapter_content_parser, verse_element
+        )
+
+    @icontract.ensure(lambda self: self._resource._chapter_content)
+    def _initialize_chapters(
+        self, chapters: list[html_parsing_utils.USFMHtmlChapter]
+    ) -> None:
+        """
+        Augment the chapters of the USFM HTML content, as
+        html_parsing_utils.USFMHtmlSplitter splits it, with additional
+        HTML elements and store them in an instance variable.
+        """
+        for chapter in chapters:
+            # At this point we alter each verse span's ID by prepending
+            # the lang_code to ensure unique verse references within
+            # language scope in a multi-language document.
+            chapter_verses = {
+                model.VerseRef(verse_num): model.HtmlContent(
+                    re.sub(
+                        settings.VERSE_ANCHOR_ID_FMT_STR,
+                        settings.VERSE_ANCHOR_ID_SUBSTITUTION_FMT_STR.format(
+                            self._resource.lang_code
+                        ),
+                        verse_content_str,
+                    )
+                )
+                for verse_num, verse_content_str in chapter.chapter_verses.items()
+            }
+            self._resource._chapter_content[model.ChapterNum(chapter.chapter_num)] = (
+                model.USFMChapter(
+                    chapter_content=chapter.chapter_content,
+                    chapter_verses=chapter_verses,
+                    chapter_footnotes=model.HtmlContent(chapter.chapter_footnotes),
                 )
-                chapter_verses[verse_num] = verse_content_str
-            self._resource._chapter_content[chapter_num] = model.USFMChapter(
-                chapter_content=chapter_content,
-                chapter_verses=chapter_verses,
-                chapter_footnotes=chapter_footnotes,
             )
 
-    def _verse_num_and_verse_content_str(
-        self,
-        chapter_num: int,
-        chapter_content_parser: bs4.BeautifulSoup,
-        verse_element: str,
-    ) -> tuple[model.VerseRef, model.HtmlContent]:
-        """
-        Handle some messy initialization and return the
-        chapter_num and verse_content_str.
-        """
-        # Rather than a single verse num, the item in
-        # verse_num may be a verse range, e.g., 1-2.
-        # See test_mr_ulb_mrk_mr_tn_mrk_mr_tq_mrk_mr_tw_mrk_mr_udb_mrk_language_book_order
-        # for test that triggers this situation.
-        # Get the verse num from the verse HTML tag's id value.
-        # split is more performant than re.
-        # See https://stackoverflow.com/questions/7501609/python-re-split-vs-split
-        verse_num = str(verse_element).split("-v-")[1].split('"')[0]
-        # Check for hyphen in the range
-        verse_num_components = verse_num.split("-")
-        if len(verse_num_components) > 1:
-            upper_bound_value = int(verse_num_components[1]) + 1
-            # Get rid of leading zeroes on first verse number
-            # in range.
-            verse_num_int = int(verse_num_components[0])
-            # Get rid of leading zeroes on second verse number
-            # in range.
-            verse_num2_int = int(verse_num_components[1])
-            # Recreate the verse range, now without leading
-            # zeroes.
-            verse_num = "{}-{}".format(str(verse_num_int), str(verse_num2_int))
-            # logger.debug(
-            #     "chapter_num: %s, verse_num is a verse range: %s",
-            #     chapter_num,
-            #     verse_num,
-            # )
-        else:
-            upper_bound_value = int(verse_num) + 1
-            # Get rid of leading zeroes.
-            verse_num = str(int(verse_num))
-
-        # Create the lower and upper search bounds for the
-        # BeautifulSoup HTML parser.
-        lower_id = "{}-ch-{}-v-{}".format(
-            str(self._resource._book_number).zfill(3),
-            str(chapter_num).zfill(3),
-            verse_num.zfill(3),
-        )
-        upper_id = "{}-ch-{}-v-{}".format(
-            str(self._resource._book_number).zfill(3),
-            str(chapter_num).zfill(3),
-            str(upper_bound_value).zfill(3),
-        )
-        # Using the upper and lower parse a verse worth of HTML
-        # content.
-        verse_content_tags = html_parsing_utils.tag_elements_between(
-            chapter_content_parser.find(
-                "span",
-                attrs={"class": "v-num", "id": lower_id},
-            ),
-            # ).next_sibling,
-            chapter_content_parser.find(
-                "span",
-                attrs={"class": "v-num", "id": upper_id},
-            ),
-        )
-        verse_content = [str(tag) for tag in list(verse_content_tags)]
-        # Hacky way to remove some redundant parsing results due to recursion in
-        # BeautifulSoup. Perhaps there is bs4 mway to avoid this. But
-        # this does work and produces the desired result in the end.
-        del verse_content[1:4]
-        verse_content_str = "".join(verse_content)
-        # HACK "Fix" BeautifulSoup parsing issue wherein sometimes a verse
-        # contains its content but also includes a subsequent verse or verses or
-        # a recapitulation of all previous verses. This does fix the problem
-        # though and gives the desired result:
-        verse_content_str = (
-            '<span class="v-num"' + verse_content_str.split('<span class="v-num"')[1]
-        )
-        # At this point we alter verse_content_str span's ID by prepending the
-        # lang_code to ensure unique verse references within language scope in a
-        # multi-language document.
-        pattern = settings.VERSE_ANCHOR_ID_FMT_STR
-        verse_content_str = re.sub(
-            pattern,
-            settings.VERSE_ANCHOR_ID_SUBSTITUTION_FMT_STR.format(
-                self._resource.lang_code
-            ),
-            verse_content_str,
-        )
-        return model.VerseRef(verse_num), model.HtmlContent(verse_content_str)
-
 
 class TNHtmlInitializer:
     """
@@ -1168,53 +1522,23 @@ class TNHtmlInitializer:
             self._resource.resource_type,
             self._resource.resource_requests,
         )
-        # FIXME We can likely now remove the first '**' if we want. It
-        # works as is though, it is just a minor optimization, but I'd
-        # need to fully it test it before making the change.
-        chapter_dirs = sorted(
-            glob(
-                "{}/**/*{}/*[0-9]*".format(
-                    self._resource.resource_dir,
-                    self._resource.resource_code,
-                )
-            )
-        )
-        # Some languages are organized differently on disk (e.g., depending
-        # on if their assets were acquired as a git repo or a zip).
-        # We handle this here.
-        if not chapter_dirs:
-            chapter_dirs = sorted(
-                glob(
-                    "{}/*{}/*[0-9]*".format(
-                        self._resource.resource_dir,
-                        self._resource.resource_code,
-                    )
-                )
-            )
+        book = self._resource.asset_index.book(self._resource.resource_code)
         chapter_verses: dict[int, model.TNChapterPayload] = {}
-        for chapter_dir in chapter_dirs:
-            chapter_num = int(os.path.split(chapter_dir)[-1])
-            intro_paths = glob("{}/*intro.md".format(chapter_dir))
+        for chapter in book.chapters:
+            chapter_num = int(os.path.split(chapter.path)[-1])
             # For some languages, TN assets are stored in .txt files
-            # rather of .md files.
-            if not intro_paths:
-                intro_paths = glob("{}/*intro.txt".format(chapter_dir))
-            intro_path = intro_paths[0] if intro_paths else None
+            # rather of .md files, the index finds either.
+            intro_path = chapter.intro_paths[0] if chapter.intro_paths else None
             intro_md = ""
             intro_html = ""
             if intro_path:
-                intro_md = file_utils.read_file(intro_path)
+                intro_md = asset_fs.read_file(intro_path)
                 intro_html = md.convert(intro_md)
-            verse_paths = sorted(glob("{}/*[0-9]*.md".format(chapter_dir)))
-            # For some languages, TN assets are stored in .txt files
-            # rather of .md files.
-            if not verse_paths:
-                verse_paths = sorted(glob("{}/*[0-9]*.txt".format(chapter_dir)))
             verses_html: dict[int, str] = {}
-            for filepath in verse_paths:
+            for filepath in chapter.verse_paths:
                 verse_num = int(pathlib.Path(filepath).stem)
                 verse_content = ""
-                verse_content = file_utils.read_file(filepath)
+                verse_content = asset_fs.read_file(filepath)
                 verse_content = md.convert(verse_content)
                 verses_html[verse_num] = verse_content
             chapter_payload = model.TNChapterPayload(
@@ -1222,23 +1546,9 @@ class TNHtmlInitializer:
             )
             chapter_verses[chapter_num] = chapter_payload
         # Get the book intro if it exists
-        book_intro_path = glob(
-            "{}/*{}/front/intro.md".format(
-                self._resource.resource_dir,
-                self._resource.resource_code,
-            )
-        )
-        # For some languages, TN assets are stored in .txt files
-        # rather of .md files.
-        if not book_intro_path:
-            book_intro_path = glob(
-                "{}/*{}/front/intro.txt".format(
-                    self._resource.resource_dir, self._resource.resource_code
-                )
-            )
         book_intro_html = ""
-        if book_intro_path:
-            book_intro_html = file_utils.read_file(book_intro_path[0])
+        if book.intro_paths:
+            book_intro_html = asset_fs.read_file(book.intro_paths[0])
             book_intro_html = md.convert(book_intro_html)
         self._resource._book_payload = model.TNBookPayload(
             intro_html=model.HtmlContent(book_intro_html), chapters=chapter_verses
@@ -1273,40 +1583,19 @@ class TQHtmlInitializer:
             self._resource.resource_type,
             self._resource.resource_requests,
         )
-        # FIXME We can likely now remove the first '**' for a tiny
-        # speedup, but I'd need to test thorougly first.
-        chapter_dirs = sorted(
-            glob(
-                "{}/**/*{}/*[0-9]*".format(
-                    self._resource.resource_dir, self._resource.resource_code
-                )
-            )
-        )
-        # Some languages are organized differently on disk (e.g., depending
-        # on if their assets were acquired as a git repo or a zip).
-        # We handle this here.
-        if not chapter_dirs:
-            chapter_dirs = sorted(
-                glob(
-                    "{}/*{}/*[0-9]*".format(
-                        self._resource.resource_dir, self._resource.resource_code
-                    )
-                )
-            )
         chapter_verses: dict[int, model.TQChapterPayload] = {}
-        for chapter_dir in chapter_dirs:
-            chapter_num = int(os.path.split(chapter_dir)[-1])
-            verse_paths = sorted(glob("{}/*[0-9]*.md".format(chapter_dir)))
+        for chapter in self._resource.asset_index.book(
+            self._resource.resource_code
+        ).chapters:
+            chapter_num = int(os.path.split(chapter.path)[-1])
             # For some languages, TQ assets may be stored in .txt files
-            # rather of .md files.
+            # rather of .md files, the index finds either.
             # FIXME This is true of TN assets, but I am not yet sure of TQ assets
             # that use the TXT suffix.
-            if not verse_paths:
-                verse_paths = sorted(glob("{}/*[0-9]*.txt".format(chapter_dir)))
             verses_html: dict[int, str] = {}
-            for filepath in verse_paths:
+            for filepath in chapter.verse_paths:
                 verse_num = int(pathlib.Path(filepath).stem)
-                verse_content = file_utils.read_file(filepath)
+                verse_content = asset_fs.read_file(filepath)
                 # with open(filepath, "r", encoding="utf-8") as fin2:
                 #     verse_content = fin2.read()
                 # NOTE I don't think translation questions have a
@@ -1342,6 +1631,9 @@ class TWHtmlInitializer:
     )
     def _initialize_verses_html(self) -> None:
         """Find translation words for the verses."""
+        # The translation words, and their HTML, are shared by all the
+        # TWResource instances of the language.
+        store = tw_utils.translation_word_stores.get(self._resource.resource_dir)
         # Create the Markdown instance once and have it use our markdown
         # extensions.
         md: markdown.Markdown = self._resource._markdown_instance(
@@ -1350,44 +1642,26 @@ class TWHtmlInitializer:
             self._resource.resource_requests,
             self._resource.resource_dir,
         )
-        # FIXME tw_utils.get_translation_word_filepaths is already called in
-        # self._get_markdown_instance implicitly. Could we rearrange the API so
-        # that this doesn't have to be called again here as a special
-        # case for TWResource? It isn't a big deal, but let's revisit
-        # this as a low priority item.
-
-        # tw_resource_dir = tw_utils.tw_resource_dir(self._resource.lang_code)
-        translation_word_filepaths = tw_utils.translation_word_filepaths(
-            # tw_resource_dir if tw_resource_dir else self._resource.resource_dir
-            self._resource.resource_dir
-        )
-        name_content_pairs: list[model.TWNameContentPair] = []
-        for translation_word_filepath in translation_word_filepaths:
-            translation_word_content = file_utils.read_file(translation_word_filepath)
+
+        def convert(
+            translation_word_content: model.MarkdownContent,
+        ) -> model.HtmlContent:
             # Translation words are bidirectional. By that I mean that when you are
             # at a verse there follows, after translation questions, links to the
             # translation words that occur in that verse. But then when you navigate
             # to the word by clicking such a link, at the end of the resulting
             # translation word note there is a section called 'Uses:' that also has
             # links back to the verses wherein the word occurs.
-            localized_translation_word = tw_utils.localized_translation_word(
-                translation_word_content
-            )
             html_word_content = md.convert(translation_word_content)
             # Make adjustments to the HTML here.
             html_word_content = re.sub(H2, H4, html_word_content)
             html_word_content = re.sub(H1, H3, html_word_content)
-            name_content_pairs.append(
-                model.TWNameContentPair(
-                    localized_word=localized_translation_word, content=html_word_content
-                )
-            )
+            return model.HtmlContent(html_word_content)
 
         self._resource._language_payload = model.TWLanguagePayload(
-            # Sort the name content pairs by localized translation word
-            name_content_pairs=sorted(
-                name_content_pairs,
-                key=lambda name_content_pair: name_content_pair.localized_word,
+            # Sorted by localized translation word
+            name_content_pairs=store.name_content_pairs(
+                self._resource.link_context, convert
             )
         )
 
@@ -1420,34 +1694,20 @@ class TAHtmlInitializer:
             self._resource.resource_type,
             self._resource.resource_requests,
         )
-        chapter_dirs = sorted(
-            glob(
-                "{}/**/*{}/*[0-9]*".format(
-                    self._resource.resource_dir, self._resource.resource_code
-                )
-            )
-        )
-        # Some languages are organized differently on disk (e.g., depending
-        # on if their assets were acquired as a git repo or a zip).
-        # We handle this here.
-        if not chapter_dirs:
-            chapter_dirs = sorted(
-                glob(
-                    "{}/*{}/*[0-9]*".format(
-                        self._resource.resource_dir, self._resource.resource_code
-                    )
-                )
-            )
         chapter_verses: dict[int, model.TAChapterPayload] = {}
-        for chapter_dir in chapter_dirs:
-            chapter_num = int(os.path.split(chapter_dir)[-1])
-            # FIXME For some languages, TQ assets are stored in .txt files
-            # rather of .md files. Handle this.
-            verse_paths = sorted(glob("{}/*[0-9]*.md".format(chapter_dir)))
+        for chapter in self._resource.asset_index.book(
+            self._resource.resource_code
+        ).chapters:
+            chapter_num = int(os.path.split(chapter.path)[-1])
             verses_html: dict[int, str] = {}
-            for filepath in verse_paths:
+            # FIXME For some languages, TA assets may be stored in .txt
+            # files rather than .md files. Only .md files are handled.
+            md_verse_paths = [
+                filepath for filepath in chapter.verse_paths if filepath.endswith(".md")
+            ]
+            for filepath in md_verse_paths:
                 verse_num = int(pathlib.Path(filepath).stem)
-                verse_content = file_utils.read_file(filepath)
+                verse_content = asset_fs.read_file(filepath)
                 # with open(filepath, "r", encoding="utf-8") as fin2:
                 #     verse_content = fin2.read()
                 # NOTE I don't think translation questions have a
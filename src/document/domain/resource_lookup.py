@@ -6,9 +6,9 @@ resource's asset files in the cloud.
 
 import logging  # For logdecorator
 import abc
-import os
-import pathlib
-from typing import Any, Generator, Optional, Protocol
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Generator, Optional, Protocol, Sequence
 from urllib import parse as urllib_parse
 
 import icontract
@@ -16,12 +16,103 @@ import jsonpath_rw_ext as jp
 from logdecorator import log_on_end, log_on_start
 
 from document.config import settings
-from document.domain import model
-from document.utils import file_utils, url_utils
+from document.domain import catalog, model
 
 logger = settings.logger(__name__)
 
 
+class ResourceLookupDtoCache:
+    """
+    A bounded, least recently used, thread safe cache of lookup results,
+    including not found results, i.e., those whose url is None. The
+    cache is tied to one version of the catalog, i.e., the sha256 hash
+    of translations.json, and is emptied as soon as a lookup is made
+    against a different version.
+
+    Cached ResourceLookupDto instances are shared, callers that mutate
+    them must take a copy.
+    """
+
+    @icontract.require(lambda maxsize: maxsize > 0)
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._catalog_version: Optional[str] = None
+        self._entries: OrderedDict[tuple[str, ...], model.ResourceLookupDto] = (
+            OrderedDict()
+        )
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get_or_lookup(
+        self,
+        catalog_version: str,
+        key: tuple[str, ...],
+        lookup: Callable[[], model.ResourceLookupDto],
+    ) -> model.ResourceLookupDto:
+        """
+        Return the cached result for key if it was looked up against
+        catalog_version, otherwise call lookup and cache its result.
+        """
+        with self._lock:
+            if catalog_version != self._catalog_version:
+                if self._entries:
+                    self._invalidations += 1
+                self._entries.clear()
+                self._catalog_version = catalog_version
+            resource_lookup_dto = self._entries.get(key)
+            if resource_lookup_dto is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                if resource_lookup_dto.url is None:
+                    self._negative_hits += 1
+                return resource_lookup_dto
+            self._misses += 1
+        # Look up outside the lock so that lookups of different keys
+        # don't wait on each other.
+        resource_lookup_dto = lookup()
+        with self._lock:
+            if catalog_version == self._catalog_version:
+                self._entries[key] = resource_lookup_dto
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._maxsize:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        return resource_lookup_dto
+
+    def clear(self) -> None:
+        """Empty the cache and reset its counters."""
+        with self._lock:
+            self._entries.clear()
+            self._catalog_version = None
+            self._hits = self._negative_hits = self._misses = 0
+            self._evictions = self._invalidations = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters suitable for exposing to monitoring."""
+        with self._lock:
+            return {
+                "catalog_version": self._catalog_version,
+                "size": len(self._entries),
+                "maxsize": self._maxsize,
+                "hits": self._hits,
+                "negative_hits": self._negative_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+# Process wide cache of USFMResourceJsonLookup and TResourceJsonLookup
+# results.
+resource_lookup_dto_cache = ResourceLookupDtoCache(
+    settings.RESOURCE_LOOKUP_CACHE_SIZE
+)
+
+
 class ResourceJsonLookup:
     """
     A class that let's you retrieve values from it using jsonpath.
@@ -61,6 +152,11 @@ class ResourceJsonLookup:
             settings.working_dir(), settings.TRANSLATIONS_JSON_LOCATION
         )
         self._source_data_fetcher()
+        # Names resolved so far keyed by lang_code or by (lang_code,
+        # resource_type). These only need resolving once per instance
+        # as an instance sticks to one version of the catalog.
+        self._lang_names: dict[str, str] = {}
+        self._resource_type_names: dict[tuple[str, str], str] = {}
 
     # Make OO composition less arduous.
     def __getattr__(self, attribute: str) -> Any:
@@ -93,27 +189,15 @@ class ResourceJsonLookup:
             resource_type,
             resource_code,
         )
-        urls: list[str] = self._lookup(jsonpath_str)
+        urls: list[str] = self.catalog_index.subcontents_urls(
+            lang_code, resource_type, resource_code, catalog.DOWNLOAD_FORMAT
+        )
         if urls:
             # Get the portion of the query string that gives
             # the repo URL
             url = self._parse_repo_url(urls[0])
-        lang_name_jsonpath_str = settings.RESOURCE_LANG_NAME_JSONPATH.format(lang_code)
-        lang_name_lst: list[str] = self._lookup(lang_name_jsonpath_str)
-        if lang_name_lst:
-            lang_name = lang_name_lst[0]
-        else:
-            lang_name = ""
-        resource_type_name_jsonpath_str = settings.RESOURCE_TYPE_NAME_JSONPATH.format(
-            lang_code, resource_type
-        )
-        resource_type_name_lst: list[str] = self._lookup(
-            resource_type_name_jsonpath_str
-        )
-        if resource_type_name_lst:
-            resource_type_name = resource_type_name_lst[0]
-        else:
-            resource_type_name = ""
+        lang_name = self.lang_name(lang_code)
+        resource_type_name = self.resource_type_name(lang_code, resource_type)
         return model.ResourceLookupDto(
             url=url,
             source=model.AssetSourceEnum.GIT,
@@ -141,6 +225,32 @@ class ResourceJsonLookup:
             return result_lst[0]
         return None
 
+    @icontract.require(lambda lang_code: lang_code is not None)
+    def lang_name(self, lang_code: str) -> str:
+        """
+        Return the language's name or the empty string if not
+        found.
+        """
+        if lang_code not in self._lang_names:
+            self._lang_names[lang_code] = self.catalog_index.lang_name(lang_code)
+        return self._lang_names[lang_code]
+
+    @icontract.require(
+        lambda lang_code, resource_type: lang_code is not None
+        and resource_type is not None
+    )
+    def resource_type_name(self, lang_code: str, resource_type: str) -> str:
+        """
+        Return the resource type's name or the empty string if not
+        found.
+        """
+        key = (lang_code, resource_type)
+        if key not in self._resource_type_names:
+            self._resource_type_names[key] = self.catalog_index.resource_type_name(
+                lang_code, resource_type
+            )
+        return self._resource_type_names[key]
+
     @icontract.require(
         lambda self, json_path: self.json_data is not None and json_path is not None
     )
@@ -188,36 +298,39 @@ class SourceDataFetcher:
     def __init__(self, working_dir: str, json_file_url: str) -> None:
         self._working_dir = working_dir
         self._json_file_url = json_file_url
+        # The parsed translations.json is shared process wide rather
+        # than loaded per instance.
+        self._catalog = catalog.shared_catalog(working_dir, json_file_url)
+        self._snapshot: catalog.CatalogSnapshot = catalog.EMPTY_SNAPSHOT
 
-        self._json_file = pathlib.Path(
-            os.path.join(
-                self._working_dir, self._json_file_url.rpartition(os.path.sep)[2]
-            )
-        )
+    @property
+    def json_data(self) -> list[str]:
+        """
+        Provide public method for other modules to access. Note that
+        this decodes the whole catalog, prefer catalog_index.
+        """
+        return self._snapshot.catalog_index.json_data()
 
-        self._json_data: list[str] = []
+    @property
+    def catalog_index(self) -> catalog.CatalogIndex:
+        """Provide public method for other modules to access."""
+        return self._snapshot.catalog_index
 
     @property
-    def json_data(self) -> list[str]:
+    def catalog_version(self) -> str:
         """Provide public method for other modules to access."""
-        return self._json_data
+        return self._snapshot.version
 
-    @icontract.require(
-        lambda self: self._json_file_url is not None and self._json_file is not None
-    )
-    @icontract.ensure(lambda self: self._json_data is not None)
+    @icontract.require(lambda self: self._json_file_url is not None)
+    @icontract.ensure(lambda self: self._snapshot.catalog_index is not None)
     def __call__(self) -> None:
-        """Download json data and parse it into equivalent python objects."""
-        if file_utils.source_file_needs_update(self._json_file):
-            logger.debug("Downloading %s...", self._json_file_url)
-            url_utils.download_file(self._json_file_url, str(self._json_file.resolve()))
-
-        if not self._json_data:
-            logger.debug("Loading json file %s...", self._json_file)
-            try:
-                self._json_data = file_utils.load_json_object(self._json_file)
-            except Exception:
-                logger.exception("Caught exception: ")
+        """
+        Obtain the current version of the parsed json data from the
+        process wide catalog, which downloads and parses it only if
+        necessary. This instance keeps using that version for its
+        lifetime so that its lookups are consistent with each other.
+        """
+        self._snapshot = self._catalog.snapshot()
 
 
 class ResourceLookup(Protocol):
@@ -236,8 +349,12 @@ class ResourceLookup(Protocol):
 class USFMResourceJsonLookup:
     """Handle lookup of USFM resources."""
 
-    def __init__(self) -> None:
-        self._resource_json_lookup = ResourceJsonLookup()
+    location_depends_on_resource_code = True
+
+    def __init__(
+        self, resource_json_lookup: Optional[ResourceJsonLookup] = None
+    ) -> None:
+        self._resource_json_lookup = resource_json_lookup or ResourceJsonLookup()
 
     # Make OO composition less arduous.
     def __getattr__(self, attribute: str) -> Any:
@@ -247,7 +364,7 @@ class USFMResourceJsonLookup:
         """
         return getattr(self._resource_json_lookup, attribute)
 
-    @icontract.require(lambda self: self.json_data is not None)
+    @icontract.require(lambda self: self.catalog_index is not None)
     @icontract.require(
         lambda lang_code, resource_type, resource_code: lang_code is not None
         and resource_type is not None
@@ -261,8 +378,19 @@ class USFMResourceJsonLookup:
         """
         Given a resource, comprised of language code, e.g., 'en', a
         resource type, e.g., 'ulb-wa', and a resource code, e.g., 'gen',
-        return URL for resource.
+        return URL for resource. Results, found or not, are cached
+        until the catalog changes.
         """
+        return resource_lookup_dto_cache.get_or_lookup(
+            self.catalog_version,
+            ("usfm", lang_code, resource_type, resource_code),
+            lambda: self._find_location(lang_code, resource_type, resource_code),
+        )
+
+    def _find_location(
+        self, lang_code: str, resource_type: str, resource_code: str
+    ) -> model.ResourceLookupDto:
+        """Try each of the possible locations of the resource in turn."""
         resource_lookup_dto: model.ResourceLookupDto
 
         # Special case:
@@ -334,25 +462,13 @@ class USFMResourceJsonLookup:
             resource_type,
             resource_code,
         )
-        urls: list[str] = self._lookup(jsonpath_str)
+        urls: list[str] = self.catalog_index.subcontents_urls(
+            lang_code, resource_type, resource_code, catalog.USFM_FORMAT
+        )
         if urls:
             url = urls[0]
-        lang_name_jsonpath_str = settings.RESOURCE_LANG_NAME_JSONPATH.format(lang_code)
-        lang_name_lst: list[str] = self._lookup(lang_name_jsonpath_str)
-        if lang_name_lst:
-            lang_name = lang_name_lst[0]
-        else:
-            lang_name = ""
-        resource_type_name_jsonpath_str = settings.RESOURCE_TYPE_NAME_JSONPATH.format(
-            lang_code, resource_type
-        )
-        resource_type_name_lst: list[str] = self._lookup(
-            resource_type_name_jsonpath_str
-        )
-        if resource_type_name_lst:
-            resource_type_name = resource_type_name_lst[0]
-        else:
-            resource_type_name = ""
+        lang_name = self.lang_name(lang_code)
+        resource_type_name = self.resource_type_name(lang_code, resource_type)
         return model.ResourceLookupDto(
             url=url,
             source=model.AssetSourceEnum.USFM,
@@ -401,25 +517,11 @@ class USFMResourceJsonLookup:
             resource_type,
             resource_code,
         )
-        urls: list[str] = self._lookup(jsonpath_str)
+        urls: list[str] = self.catalog_index.contents_urls(lang_code, resource_type)
         if urls:
             url = urls[0]
-        lang_name_jsonpath_str = settings.RESOURCE_LANG_NAME_JSONPATH.format(lang_code)
-        lang_name_lst: list[str] = self._lookup(lang_name_jsonpath_str)
-        if lang_name_lst:
-            lang_name = lang_name_lst[0]
-        else:
-            lang_name = ""
-        resource_type_name_jsonpath_str = settings.RESOURCE_TYPE_NAME_JSONPATH.format(
-            lang_code, resource_type
-        )
-        resource_type_name_lst: list[str] = self._lookup(
-            resource_type_name_jsonpath_str
-        )
-        if resource_type_name_lst:
-            resource_type_name = resource_type_name_lst[0]
-        else:
-            resource_type_name = ""
+        lang_name = self.lang_name(lang_code)
+        resource_type_name = self.resource_type_name(lang_code, resource_type)
         return model.ResourceLookupDto(
             url=url,
             source=model.AssetSourceEnum.ZIP,
@@ -432,8 +534,14 @@ class USFMResourceJsonLookup:
 class TResourceJsonLookup:
     """Handle lookup of TN, TA, TQ, TW resources."""
 
-    def __init__(self) -> None:
-        self._resource_json_lookup = ResourceJsonLookup()
+    # The location of TN, TA, TQ and TW resources does not depend on
+    # the resource_code, see lookup.
+    location_depends_on_resource_code = False
+
+    def __init__(
+        self, resource_json_lookup: Optional[ResourceJsonLookup] = None
+    ) -> None:
+        self._resource_json_lookup = resource_json_lookup or ResourceJsonLookup()
 
     # @property
     # def resource_json_lookup(self) -> ResourceJsonLookup:
@@ -447,7 +555,7 @@ class TResourceJsonLookup:
         """
         return getattr(self._resource_json_lookup, attribute)
 
-    @icontract.require(lambda self: self.json_data is not None)
+    @icontract.require(lambda self: self.catalog_index is not None)
     @icontract.require(
         lambda lang_code, resource_type, resource_code: lang_code is not None
         and resource_type is not None
@@ -460,8 +568,19 @@ class TResourceJsonLookup:
         """
         Given a resource, comprised of language code, e.g., 'wum', a
         resource type, e.g., 'tn', and a resource code, e.g., 'gen',
-        return model.ResourceLookupDto instance for resource.
+        return model.ResourceLookupDto instance for resource. Results,
+        found or not, are cached until the catalog changes.
         """
+        return resource_lookup_dto_cache.get_or_lookup(
+            self.catalog_version,
+            ("t", lang_code, resource_type, resource_code),
+            lambda: self._find_location(lang_code, resource_type),
+        )
+
+    def _find_location(
+        self, lang_code: str, resource_type: str
+    ) -> model.ResourceLookupDto:
+        """Try each of the possible locations of the resource in turn."""
         resource_lookup_dto: model.ResourceLookupDto
 
         # For English, translations.json file only
@@ -513,25 +632,11 @@ class TResourceJsonLookup:
             lang_code,
             resource_type,
         )
-        urls: list[str] = self._lookup(jsonpath_str)
+        urls: list[str] = self.catalog_index.contents_urls(lang_code, resource_type)
         if urls:
             url = urls[0]
-        lang_name_jsonpath_str = settings.RESOURCE_LANG_NAME_JSONPATH.format(lang_code)
-        lang_name_lst: list[str] = self._lookup(lang_name_jsonpath_str)
-        if lang_name_lst:
-            lang_name = lang_name_lst[0]
-        else:
-            lang_name = ""
-        resource_type_name_jsonpath_str = settings.RESOURCE_TYPE_NAME_JSONPATH.format(
-            lang_code, resource_type
-        )
-        resource_type_name_lst: list[str] = self._lookup(
-            resource_type_name_jsonpath_str
-        )
-        if resource_type_name_lst:
-            resource_type_name = resource_type_name_lst[0]
-        else:
-            resource_type_name = ""
+        lang_name = self.lang_name(lang_code)
+        resource_type_name = self.resource_type_name(lang_code, resource_type)
         return model.ResourceLookupDto(
             url=url,
             source=model.AssetSourceEnum.ZIP,
@@ -558,25 +663,13 @@ class TResourceJsonLookup:
             lang_code,
             resource_type,
         )
-        urls: list[str] = self._lookup(jsonpath_str)
-        if urls:
-            url = urls[0]
-        lang_name_jsonpath_str = settings.RESOURCE_LANG_NAME_JSONPATH.format(lang_code)
-        lang_name_lst: list[str] = self._lookup(lang_name_jsonpath_str)
-        if lang_name_lst:
-            lang_name = lang_name_lst[0]
-        else:
-            lang_name = ""
-        resource_type_name_jsonpath_str = settings.RESOURCE_TYPE_NAME_JSONPATH.format(
+        urls: list[str] = self.catalog_index.any_subcontents_urls(
             lang_code, resource_type
         )
-        resource_type_name_lst: list[str] = self._lookup(
-            resource_type_name_jsonpath_str
-        )
-        if resource_type_name_lst:
-            resource_type_name = resource_type_name_lst[0]
-        else:
-            resource_type_name = ""
+        if urls:
+            url = urls[0]
+        lang_name = self.lang_name(lang_code)
+        resource_type_name = self.resource_type_name(lang_code, resource_type)
         return model.ResourceLookupDto(
             url=url,
             source=model.AssetSourceEnum.ZIP,
@@ -607,25 +700,11 @@ class TResourceJsonLookup:
             lang_code,
             resource_type,
         )
-        urls: list[str] = self._lookup(jsonpath_str)
+        urls: list[str] = self.catalog_index.contents_urls(lang_code, resource_type)
         if urls:
             url = urls[0]
-        lang_name_jsonpath_str = settings.RESOURCE_LANG_NAME_JSONPATH.format(lang_code)
-        lang_name_lst: list[str] = self._lookup(lang_name_jsonpath_str)
-        if lang_name_lst:
-            lang_name = lang_name_lst[0]
-        else:
-            lang_name = ""
-        resource_type_name_jsonpath_str = settings.RESOURCE_TYPE_NAME_JSONPATH.format(
-            lang_code, resource_type
-        )
-        resource_type_name_lst: list[str] = self._lookup(
-            resource_type_name_jsonpath_str
-        )
-        if resource_type_name_lst:
-            resource_type_name = resource_type_name_lst[0]
-        else:
-            resource_type_name = ""
+        lang_name = self.lang_name(lang_code)
+        resource_type_name = self.resource_type_name(lang_code, resource_type)
         return model.ResourceLookupDto(
             url=url,
             source=model.AssetSourceEnum.ZIP,
@@ -654,25 +733,13 @@ class TResourceJsonLookup:
             lang_code,
             resource_type,
         )
-        urls: list[str] = self._lookup(jsonpath_str)
-        if urls:
-            url = urls[0]
-        lang_name_jsonpath_str = settings.RESOURCE_LANG_NAME_JSONPATH.format(lang_code)
-        lang_name_results: list[str] = self._lookup(lang_name_jsonpath_str)
-        if lang_name_results:
-            lang_name = lang_name_results[0]
-        else:
-            lang_name = ""
-        resource_type_name_jsonpath_str = settings.RESOURCE_TYPE_NAME_JSONPATH.format(
+        urls: list[str] = self.catalog_index.any_subcontents_urls(
             lang_code, resource_type
         )
-        resource_type_name_results: list[str] = self._lookup(
-            resource_type_name_jsonpath_str
-        )
-        if resource_type_name_results:
-            resource_type_name = resource_type_name_results[0]
-        else:
-            resource_type_name = ""
+        if urls:
+            url = urls[0]
+        lang_name = self.lang_name(lang_code)
+        resource_type_name = self.resource_type_name(lang_code, resource_type)
         return model.ResourceLookupDto(
             url=url,
             source=model.AssetSourceEnum.ZIP,
@@ -700,7 +767,7 @@ class BIELHelperResourceJsonLookup:
         """
         return getattr(self._resource_json_lookup, attribute)
 
-    @icontract.require(lambda self: self.json_data is not None)
+    @icontract.require(lambda self: self.catalog_index is not None)
     @icontract.ensure(lambda result: result)
     def lang_codes(self) -> Generator[str, None, None]:
         """
@@ -708,10 +775,10 @@ class BIELHelperResourceJsonLookup:
         of all language codes available through API. Presumably this
         could be called to populate a drop-down menu.
         """
-        for lang in self.json_data:
-            yield lang["code"]
+        for lang in self.catalog_index.summaries():
+            yield lang.code
 
-    @icontract.require(lambda self: self.json_data is not None)
+    @icontract.require(lambda self: self.catalog_index is not None)
     @icontract.ensure(lambda result: result)
     def lang_codes_and_names(self) -> Generator[tuple[str, str], None, None]:
         """
@@ -720,9 +787,10 @@ class BIELHelperResourceJsonLookup:
         Presumably this could be called to populate a drop-down menu.
         """
         # Using jsonpath in a loop here was prohibitively slow so we
-        # use the dictionary in this case.
-        for d in self.json_data:
-            yield (d["code"], d["name"])
+        # use the catalog's summaries, which avoids decoding every
+        # language, in this case.
+        for lang in self.catalog_index.summaries():
+            yield (lang.code, lang.name)
 
     @icontract.ensure(lambda result: result)
     def resource_types(self) -> list[str]:
@@ -730,7 +798,18 @@ class BIELHelperResourceJsonLookup:
         Convenience method that can be called, e.g., from the UI, to
         get the set of all resource types.
         """
-        return self._lookup(settings.RESOURCE_TYPES_JSONPATH)
+        # Equivalent of settings.RESOURCE_TYPES_JSONPATH. Sorted, rather
+        # than in set order, which varies from process to process, so
+        # that every worker serves the same response, see
+        # catalog_responses.
+        return sorted(
+            {
+                resource_type
+                for lang in self.catalog_index.summaries()
+                for resource_type, _ in lang.contents
+                if resource_type is not None
+            }
+        )
 
     @icontract.ensure(lambda result: result)
     def resource_codes(self) -> list[str]:
@@ -738,11 +817,20 @@ class BIELHelperResourceJsonLookup:
         Convenience method that can be called, e.g., from the UI, to
         get the set of all resource codes.
         """
-        return self._lookup(settings.RESOURCE_CODES_JSONPATH)
+        # Equivalent of settings.RESOURCE_CODES_JSONPATH. Sorted, see
+        # resource_types.
+        return sorted(
+            {
+                resource_code
+                for lang in self.catalog_index.summaries()
+                for _, resource_codes in lang.contents
+                for resource_code in resource_codes
+            }
+        )
 
     # FIXME Simplify this method. Perhaps use generators and break
     # things up.
-    @icontract.require(lambda self: self.json_data is not None)
+    @icontract.require(lambda self: self.catalog_index is not None)
     @icontract.ensure(lambda result: result)
     def lang_codes_names_and_resource_types(self) -> list[model.CodeNameTypeTriplet]:
         """
@@ -760,19 +848,17 @@ class BIELHelperResourceJsonLookup:
         """
         lang_codes_names_and_resource_types: list[model.CodeNameTypeTriplet] = []
         # Using jsonpath in a loop here was prohibitively slow so we
-        # use the dictionary in this case.
-        for lang in self.json_data:
-            resource_types: list[str] = []
-            for resource_type_dict in lang["contents"]:
-                try:
-                    resource_type = resource_type_dict["code"]
-                    resource_types.append(resource_type)
-                except Exception:
-                    resource_type = None
+        # use the catalog's summaries in this case.
+        for lang in self.catalog_index.summaries():
+            resource_types: list[str] = [
+                resource_type
+                for resource_type, _ in lang.contents
+                if resource_type is not None
+            ]
             lang_codes_names_and_resource_types.append(
                 model.CodeNameTypeTriplet(
-                    lang_code=lang["code"],
-                    lang_name=lang["name"],
+                    lang_code=lang.code,
+                    lang_name=lang.name,
                     resource_types=resource_types,
                 )
             )
@@ -780,7 +866,7 @@ class BIELHelperResourceJsonLookup:
 
     # FIXME Simplify this method. Perhaps use generators and break
     # things up.
-    @icontract.require(lambda self: self.json_data is not None)
+    @icontract.require(lambda self: self.catalog_index is not None)
     @icontract.ensure(lambda result: result)
     def lang_codes_names_resource_types_and_resource_codes(
         self,
@@ -811,42 +897,21 @@ class BIELHelperResourceJsonLookup:
             tuple[str, str, list[tuple[str, list[str]]]]
         ] = []
         # Using jsonpath in a loop here was prohibitively slow so we
-        # use the dictionary in this case.
-        for lang in self.json_data:
-            resource_types: list[tuple[str, list[str]]] = []
-            for resource_type_dict in lang["contents"]:
-                # Usage of dpath at this point:
-                # (Pdb) import dpath.util
-                # (Pdb) dpath.util.search(resource_type_dict, "subcontents/0/code")
-                # {'subcontents': [{'code': '2co'}]}
-                # (Pdb) dpath.util.search(resource_type_dict, "subcontents")
-                # {'subcontents': [{'name': '2 Corinthians', 'category': 'bible-nt', 'code': '2co', 'sort': 48, 'links': [{'url': 'http://read.bibletranslationtools.org/u/Southern./kbt_2co_text_reg/92731d1550/', 'format': 'Read on Web'}, {'url': '../download-scripture?repo_url=https%3A%2F%2Fcontent.bibletranslationtools.org%2Fsouthern.%2Fkbt_2co_text_reg&book_name=2%20Corinthians', 'format': 'Download'}]}]}
-                # (Pdb) dpath.util.search(resource_type_dict, "subcontents")["subcontents"]
-                # [{'name': '2 Corinthians', 'category': 'bible-nt', 'code': '2co', 'sort': 48, 'links': [{'url': 'http://read.bibletranslationtools.org/u/Southern./kbt_2co_text_reg/92731d1550/', 'format': 'Read on Web'}, {'url': '../download-scripture?repo_url=https%3A%2F%2Fcontent.bibletranslationtools.org%2Fsouthern.%2Fkbt_2co_text_reg&book_name=2%20Corinthians', 'format': 'Download'}]}]
-                # (Pdb) interact
-                # >>> for x in dpath.util.search(resource_type_dict, "subcontents")["subcontents"]:
-                # ...   print(x["code"])
-                # ...
-                # 2co
-                try:
-                    resource_type = resource_type_dict["code"]
-                except Exception:
-                    resource_type = None
-                resource_codes_list = resource_type_dict["subcontents"]
-                resource_codes: list[str] = []
-                for resource_code_dict in resource_codes_list:
-                    resource_code = resource_code_dict["code"]
-                    resource_codes.append(resource_code)
-                if resource_type is not None:
-                    resource_types.append((resource_type, resource_codes))
+        # use the catalog's summaries in this case.
+        for lang in self.catalog_index.summaries():
+            resource_types: list[tuple[str, list[str]]] = [
+                (resource_type, list(resource_codes))
+                for resource_type, resource_codes in lang.contents
+                if resource_type is not None
+            ]
             lang_codes_names_resource_types_and_resource_codes.append(
-                (lang["code"], lang["name"], resource_types)
+                (lang.code, lang.name, resource_types)
             )
         return lang_codes_names_resource_types_and_resource_codes
 
     # NOTE Only used for debugging and testing. Not part of long-term
     # API.
-    @icontract.require(lambda self: self.json_data is not None)
+    @icontract.require(lambda self: self.catalog_index is not None)
     @icontract.ensure(lambda result: result)
     def lang_codes_names_and_contents_codes(self) -> list[tuple[str, str, str]]:
         """
@@ -894,13 +959,59 @@ class BIELHelperResourceJsonLookup:
         """
         lang_codes_names_and_contents_codes: list[tuple[str, str, str]] = []
         # Using jsonpath in a loop here was prohibitively slow so we
-        # use the dictionary in this case.
-        for d in self.json_data:
-            try:
-                contents_code = d["contents"][0]["code"]
-            except Exception:
-                contents_code = "nil"
+        # use the catalog's summaries in this case.
+        for lang in self.catalog_index.summaries():
+            contents_code = "nil"
+            if lang.contents and lang.contents[0][0] is not None:
+                contents_code = lang.contents[0][0]
             lang_codes_names_and_contents_codes.append(
-                (d["code"], d["name"], contents_code)
+                (lang.code, lang.name, contents_code)
             )
         return lang_codes_names_and_contents_codes
+
+
+@icontract.require(lambda resource_requests: resource_requests is not None)
+@icontract.ensure(
+    lambda resource_requests, result: all(
+        resource_request in result for resource_request in resource_requests
+    )
+)
+def lookup_many(
+    resource_requests: Sequence[model.ResourceRequest],
+) -> dict[model.ResourceRequest, model.ResourceLookupDto]:
+    """
+    Look up the locations of all of resource_requests, e.g., those of a
+    DocumentRequest, in one pass against a single version of the
+    catalog.
+
+    Requests are grouped by language and resource type so that the
+    language name and resource type name are resolved once per group,
+    and, for resource types whose location does not depend on the
+    resource code, e.g., TN, the location is resolved once per group
+    too, in which case the requests of the group share one
+    ResourceLookupDto instance.
+    """
+    resource_json_lookup = ResourceJsonLookup()
+    finders: dict[type, ResourceLookup] = {}
+    resource_lookup_dtos: dict[model.ResourceRequest, model.ResourceLookupDto] = {}
+    groups: dict[tuple[str, str], list[model.ResourceRequest]] = {}
+    for resource_request in resource_requests:
+        groups.setdefault(
+            (resource_request.lang_code, resource_request.resource_type), []
+        ).append(resource_request)
+    for (lang_code, resource_type), group in groups.items():
+        lookup_class = settings.resource_type_lookup_map()[resource_type].lookup_class
+        if lookup_class not in finders:
+            finders[lookup_class] = lookup_class(resource_json_lookup)
+        finder = finders[lookup_class]
+        resource_lookup_dto: Optional[model.ResourceLookupDto] = None
+        for resource_request in group:
+            if (
+                resource_lookup_dto is None
+                or lookup_class.location_depends_on_resource_code
+            ):
+                resource_lookup_dto = finder.lookup(
+                    lang_code, resource_type, resource_request.resource_code
+                )
+            resource_lookup_dtos[resource_request] = resource_lookup_dto
+    return resource_lookup_dtos
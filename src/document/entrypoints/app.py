@@ -2,11 +2,19 @@
 
 import os
 import pathlib
-from typing import Generator
+from typing import Any, Callable, Optional
 
 from document.config import settings
-from document.domain import document_generator, model, resource_lookup
-from fastapi import FastAPI
+from document.domain import (
+    catalog,
+    catalog_responses,
+    document_generator,
+    model,
+    parsed_resource_cache,
+    resource_lookup,
+)
+from document.utils import disk_cache, file_utils, tw_utils
+from fastapi import FastAPI, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 
@@ -27,6 +35,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+catalog_refresher = catalog.CatalogRefresher(
+    catalog.shared_catalog(), settings.TRANSLATIONS_JSON_REFRESH_INTERVAL
+)
+
+shared_disk_cache = disk_cache.DiskCache(
+    settings.DISK_CACHE_MAX_BYTES,
+    settings.DISK_CACHE_MAX_INODES,
+    settings.DISK_CACHE_LOW_WATER_MARK,
+)
+disk_cache_evictor = disk_cache.DiskCacheEvictor(
+    shared_disk_cache, settings.DISK_CACHE_EVICTION_INTERVAL
+)
+
+
+@app.on_event("startup")
+def start_catalog_refresher() -> None:
+    """
+    Acquire translations.json before serving and then keep it fresh
+    in the background so that requests don't wait on downloading it.
+    """
+    if settings.TRANSLATIONS_JSON_BACKGROUND_REFRESH:
+        catalog_refresher.start()
+
+
+@app.on_event("shutdown")
+def stop_catalog_refresher() -> None:
+    """Stop refreshing translations.json."""
+    if settings.TRANSLATIONS_JSON_BACKGROUND_REFRESH:
+        catalog_refresher.stop()
+
+
+@app.on_event("startup")
+def start_disk_cache_evictor() -> None:
+    """
+    Keep the assets and documents on disk within their quotas in the
+    background.
+    """
+    if settings.DISK_CACHE_EVICTION:
+        disk_cache_evictor.start()
+
+
+@app.on_event("shutdown")
+def stop_disk_cache_evictor() -> None:
+    """Stop enforcing the disk quotas."""
+    if settings.DISK_CACHE_EVICTION:
+        disk_cache_evictor.stop()
+
 
 @app.post("/documents", response_model=model.FinishedDocumentDetails)
 def document_endpoint(
@@ -70,6 +125,7 @@ def serve_pdf_document(
 ) -> FileResponse:
     """Serve the requested PDF document."""
     path = "{}.pdf".format(os.path.join(settings.output_dir(), document_request_key))
+    disk_cache.record_access(path)
     return FileResponse(
         path=path,
         filename=pathlib.Path(path).name,
@@ -77,47 +133,130 @@ def serve_pdf_document(
     )
 
 
+# The catalog endpoints below are called by the UI on every page load
+# so their responses are built once per catalog version and served
+# pre-serialized, pre-gzipped and with an ETag.
+precomputed_catalog_responses = catalog_responses.CatalogResponses()
+
+
+def catalog_response(
+    name: str,
+    build: Callable[[resource_lookup.BIELHelperResourceJsonLookup], Any],
+    if_none_match: Optional[str],
+    accept_encoding: Optional[str],
+) -> Response:
+    """
+    Return the precomputed response for name, or 304 Not Modified if
+    the client already has it.
+    """
+    rendered = precomputed_catalog_responses.response(name, build).render(
+        if_none_match, accept_encoding
+    )
+    return Response(
+        content=rendered.body,
+        status_code=rendered.status_code,
+        headers=rendered.headers,
+    )
+
+
 # @app.get(f"{settings.API_ROOT}/language_codes_names_and_resource_types")
-@app.get("/language_codes_names_and_resource_types")
-def lang_codes_names_and_resource_types() -> list[model.CodeNameTypeTriplet]:
+@app.get(
+    "/language_codes_names_and_resource_types",
+    response_model=list[model.CodeNameTypeTriplet],
+)
+def lang_codes_names_and_resource_types(
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+) -> Response:
     """
     Return list of tuples of lang_code, lang_name, resource_types for
     all available language codes.
     """
-    lookup_svc = resource_lookup.BIELHelperResourceJsonLookup()
-    return lookup_svc.lang_codes_names_and_resource_types()
+    return catalog_response(
+        "language_codes_names_and_resource_types",
+        lambda lookup_svc: lookup_svc.lang_codes_names_and_resource_types(),
+        if_none_match,
+        accept_encoding,
+    )
 
 
 # @app.get(f"{settings.API_ROOT}/language_codes")
-@app.get("/language_codes")
-def lang_codes() -> Generator[str, None, None]:
+@app.get("/language_codes", response_model=list[str])
+def lang_codes(
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+) -> Response:
     """Return list of all available language codes."""
-    lookup_svc = resource_lookup.BIELHelperResourceJsonLookup()
-    return lookup_svc.lang_codes()
+    return catalog_response(
+        "language_codes",
+        lambda lookup_svc: lookup_svc.lang_codes(),
+        if_none_match,
+        accept_encoding,
+    )
 
 
 # @app.get(f"{settings.API_ROOT}/language_codes_and_names")
-@app.get("/language_codes_and_names")
-def lang_codes_and_names() -> Generator[tuple[str, str], None, None]:
+@app.get("/language_codes_and_names", response_model=list[tuple[str, str]])
+def lang_codes_and_names(
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+) -> Response:
     """Return list of all available language code, name tuples."""
-    lookup_svc = resource_lookup.BIELHelperResourceJsonLookup()
-    return lookup_svc.lang_codes_and_names()
+    return catalog_response(
+        "language_codes_and_names",
+        lambda lookup_svc: lookup_svc.lang_codes_and_names(),
+        if_none_match,
+        accept_encoding,
+    )
 
 
 # @app.get(f"{settings.API_ROOT}/resource_types")
-@app.get("/resource_types")
-def resource_types() -> list[str]:
+@app.get("/resource_types", response_model=list[str])
+def resource_types(
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+) -> Response:
     """Return list of all available resource types."""
-    lookup_svc = resource_lookup.BIELHelperResourceJsonLookup()
-    return lookup_svc.resource_types()
+    return catalog_response(
+        "resource_types",
+        lambda lookup_svc: lookup_svc.resource_types(),
+        if_none_match,
+        accept_encoding,
+    )
 
 
 # @app.get(f"{settings.API_ROOT}/resource_codes")
-@app.get("/resource_codes")
-def resource_codes() -> list[str]:
+@app.get("/resource_codes", response_model=list[str])
+def resource_codes(
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+) -> Response:
     """Return list of all available resource codes."""
-    lookup_svc = resource_lookup.BIELHelperResourceJsonLookup()
-    return lookup_svc.resource_codes()
+    return catalog_response(
+        "resource_codes",
+        lambda lookup_svc: lookup_svc.resource_codes(),
+        if_none_match,
+        accept_encoding,
+    )
+
+
+@app.get("/stats")
+def stats() -> dict[str, Any]:
+    """
+    Return process level counters, e.g., how many times
+    translations.json has been parsed by this worker, for scraping by
+    monitoring.
+    """
+    return {
+        "pid": os.getpid(),
+        "catalog": catalog.shared_catalog().stats(),
+        "catalog_responses": precomputed_catalog_responses.stats(),
+        "resource_lookup_cache": resource_lookup.resource_lookup_dto_cache.stats(),
+        "asset_locks": file_utils.lock_stats(),
+        "disk_cache": shared_disk_cache.stats(),
+        "parsed_resource_cache": parsed_resource_cache.parsed_resource_cache.stats(),
+        "translation_word_stores": tw_utils.translation_word_stores.stats(),
+    }
 
 
 @app.get("/health/status")
@@ -0,0 +1,272 @@
+"""
+Warm a node's caches before it takes traffic.
+
+Look up, provision and parse, ahead of any document request, the
+resources for a list of languages, resource types and books so that
+document requests for them find their catalog lookups, asset files and
+parsed content already cached. Print a JSON report of how long each
+asset took and of what failed. Usage:
+
+    python -m document.entrypoints.warm en/ulb-wa/gen en/tn fr
+
+where en/ulb-wa/gen is one book of a resource type, en/tn all books of
+a resource type and fr all books of all the resource types the catalog
+has for the language.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent import futures
+from typing import Any, Optional, Sequence
+
+import icontract
+
+from document.config import settings
+from document.domain import bible_books, model, resource_lookup
+from document.domain.parsed_resource_cache import parsed_resource_cache
+from document.domain.resource import (
+    Resource,
+    provision_resources_sharing_asset,
+    resource_factory,
+    resources_by_asset,
+)
+from document.utils import disk_cache
+
+logger = settings.logger(__name__)
+
+SEPARATOR = "/"
+
+
+def _resource_types(lang_code: str) -> list[str]:
+    """Return the resource types the catalog has for lang_code."""
+    for (
+        code_name_type_triplet
+    ) in resource_lookup.ResourceJsonLookup.lang_codes_names_and_resource_types():
+        if code_name_type_triplet.lang_code == lang_code:
+            return [
+                resource_type
+                for resource_type in code_name_type_triplet.resource_types
+                if resource_type in settings.resource_type_lookup_map()
+            ]
+    return []
+
+
+@icontract.require(lambda spec: spec)
+def parse_spec(spec: str) -> list[model.ResourceRequest]:
+    """
+    Return the resource requests that spec, one of lang_code,
+    lang_code/resource_type or lang_code/resource_type/resource_code,
+    stands for. Raise ValueError if spec is malformed.
+    """
+    parts = spec.strip(SEPARATOR).split(SEPARATOR)
+    if len(parts) > 3 or not all(parts):
+        raise ValueError("Malformed resource spec: {}".format(spec))
+    lang_code = parts[0]
+    resource_types = parts[1:2] or _resource_types(lang_code)
+    for resource_type in resource_types:
+        if resource_type not in settings.resource_type_lookup_map():
+            raise ValueError("Unknown resource type in {}".format(spec))
+    resource_codes = parts[2:3] or list(bible_books.BOOK_NAMES)
+    for resource_code in resource_codes:
+        if resource_code not in bible_books.BOOK_NAMES:
+            raise ValueError("Unknown book in {}".format(spec))
+    return [
+        model.ResourceRequest(
+            lang_code=lang_code,
+            resource_type=resource_type,
+            resource_code=resource_code,
+        )
+        for resource_type in resource_types
+        for resource_code in resource_codes
+    ]
+
+
+def _key(resource: Resource) -> str:
+    return SEPARATOR.join(
+        [resource.lang_code, resource.resource_type, resource.resource_code]
+    )
+
+
+def _error(exception: BaseException) -> str:
+    return "{}: {}".format(type(exception).__name__, exception)
+
+
+def _provision(resources: list[Resource]) -> dict[str, Any]:
+    """Provision resources, which share one asset, and report on it."""
+    start = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        provision_resources_sharing_asset(resources)
+    except Exception as exception:
+        logger.exception("Provisioning %s failed: ", resources)
+        error = _error(exception)
+    return {
+        "url": str(resources[0].resource_url),
+        "resource_dir": resources[0].resource_dir,
+        "seconds": round(time.perf_counter() - start, 4),
+        "error": error,
+    }
+
+
+def _parse(resource: Resource) -> dict[str, Any]:
+    """
+    Parse resource's asset content, as document requests do, filling
+    the caches of parsed content along the way, and report on it.
+    """
+    start = time.perf_counter()
+    cached = False
+    error: Optional[str] = None
+    try:
+        cached = parsed_resource_cache.update_resource_with_asset_content(
+            resource
+        ).cached
+    except Exception as exception:
+        logger.exception("Parsing %s failed: ", resource)
+        error = _error(exception)
+    return {
+        "resource": _key(resource),
+        "seconds": round(time.perf_counter() - start, 4),
+        "cached": cached,
+        "error": error,
+    }
+
+
+@icontract.require(
+    lambda resource_requests, max_workers: resource_requests and max_workers > 0
+)
+def warm(
+    resource_requests: list[model.ResourceRequest],
+    max_workers: int,
+    parse: bool = True,
+) -> dict[str, Any]:
+    """
+    Look up, provision, using max_workers threads, and, if parse,
+    parse the resources for resource_requests. Return a report of per
+    asset timings and of the resources that were not found or failed.
+    """
+    start = time.perf_counter()
+    # Each resource is warmed as if it were the only one in a document
+    # request. Its parsed content may depend on the document request's
+    # other resources, see Resource.payload_context, and a document
+    # request has nowhere near all of those being warmed.
+    resources = [
+        resource_factory(
+            settings.working_dir(),
+            settings.output_dir(),
+            resource_request,
+            [resource_request],
+        )
+        for resource_request in resource_requests
+    ]
+    resource_lookup_dtos = resource_lookup.lookup_many(resource_requests)
+    lookup_seconds = time.perf_counter() - start
+    found_resources: list[Resource] = []
+    not_found: list[str] = []
+    for resource in resources:
+        if resource.set_location(resource_lookup_dtos[resource.resource_request]):
+            found_resources.append(resource)
+        else:
+            not_found.append(_key(resource))
+    assets = list(resources_by_asset(found_resources).values())
+    resource_dirs = [resource.resource_dir for resource in resources]
+    del resources, found_resources
+    asset_reports: list[dict[str, Any]] = []
+    # Keep the assets from being evicted from disk while warming them.
+    with disk_cache.in_use(resource_dirs):
+        if assets:
+            with futures.ThreadPoolExecutor(
+                max_workers=min(max_workers, len(assets)), thread_name_prefix="warm"
+            ) as executor:
+                asset_reports = list(executor.map(_provision, assets))
+        for resources_sharing_asset, asset_report in zip(assets, asset_reports):
+            asset_report["resources"] = [
+                _parse(resource)
+                if parse and not asset_report["error"]
+                else {
+                    "resource": _key(resource),
+                    "seconds": None,
+                    "cached": False,
+                    "error": None,
+                }
+                for resource in resources_sharing_asset
+            ]
+            # Let go of the parsed content to bound memory use when
+            # warming whole languages.
+            resources_sharing_asset.clear()
+    return {
+        "seconds": round(time.perf_counter() - start, 4),
+        "lookup_seconds": round(lookup_seconds, 4),
+        "not_found": not_found,
+        "assets": asset_reports,
+    }
+
+
+def failed(report: dict[str, Any]) -> bool:
+    """
+    Return True if any asset of report, see warm, failed to provision
+    or parse. Resources the catalog does not have, e.g., the Old
+    Testament books of a language with only a New Testament, are not
+    failures.
+    """
+    return any(
+        asset_report["error"]
+        or any(
+            resource_report["error"] for resource_report in asset_report["resources"]
+        )
+        for asset_report in report["assets"]
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m document.entrypoints.warm",
+        description="Prefetch and parse resource assets ahead of document requests.",
+    )
+    parser.add_argument(
+        "specs",
+        nargs="+",
+        metavar="lang_code[/resource_type[/resource_code]]",
+        help="Resources to warm, omitting resource_code means all books and "
+        "omitting resource_type all the language's resource types.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.PROVISIONING_MAX_WORKERS,
+        help="Number of assets to provision concurrently.",
+    )
+    parser.add_argument(
+        "--no-parse",
+        dest="parse",
+        action="store_false",
+        help="Only look up and provision assets, do not parse their content.",
+    )
+    parser.add_argument(
+        "--output", help="File to write the JSON report to, stdout by default."
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    # Keyed, rather than listed, to drop duplicates in order.
+    resource_requests: dict[model.ResourceRequest, None] = {}
+    for spec in args.specs:
+        try:
+            resource_requests.update(dict.fromkeys(parse_spec(spec)))
+        except ValueError as exception:
+            parser.error(str(exception))
+    if not resource_requests:
+        parser.error("Nothing to warm, no resource types found for the languages")
+    report = warm(list(resource_requests), args.workers, args.parse)
+    if args.output:
+        with open(args.output, "w") as fout:
+            json.dump(report, fout, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 1 if failed(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
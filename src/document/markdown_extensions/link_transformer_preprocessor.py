@@ -9,7 +9,7 @@ from logdecorator import log_on_start
 from document.config import settings
 from document.domain import bible_books, model
 from document.markdown_extensions import link_regexes
-from document.utils import file_utils, tw_utils
+from document.utils import tw_utils
 
 logger = settings.logger(__name__)
 
@@ -30,13 +30,13 @@ class LinkTransformerPreprocessor(markdown.preprocessors.Preprocessor):
         md: markdown.Markdown,
         lang_code: str,
         resource_requests: list[model.ResourceRequest],
-        translation_words_dict: dict[str, str],
+        translation_words: dict[str, tw_utils.TranslationWord],
     ) -> None:
         """Initialize."""
         self._md: markdown.Markdown = md
         self._lang_code: str = lang_code
         self._resource_requests: list[model.ResourceRequest] = resource_requests
-        self._translation_words_dict: dict[str, str] = translation_words_dict
+        self._translation_words: dict[str, tw_utils.TranslationWord] = translation_words
         super().__init__()
 
     @icontract.require(lambda lines: lines)
@@ -110,17 +110,13 @@ class LinkTransformerPreprocessor(markdown.preprocessors.Preprocessor):
             # word definitions. Hence the need to also check
             # tw_resources_requests.
             if (
-                filename_sans_suffix in self._translation_words_dict
+                filename_sans_suffix in self._translation_words
                 and tw_resources_requests
             ):
                 # Localize the translation word.
-                file_content = file_utils.read_file(
-                    self._translation_words_dict[filename_sans_suffix]
-                )
-                # Get the localized name for the translation word.
-                localized_translation_word = tw_utils.localized_translation_word(
-                    file_content
-                )
+                localized_translation_word = self._translation_words[
+                    filename_sans_suffix
+                ].localized_word
                 # Build the anchor link.
                 url = url.replace(
                     match.group(0),  # The whole match
@@ -156,17 +152,13 @@ class LinkTransformerPreprocessor(markdown.preprocessors.Preprocessor):
             match_text = match.group(0)
             filename_sans_suffix = match.group("word")
             if (
-                filename_sans_suffix in self._translation_words_dict
+                filename_sans_suffix in self._translation_words
                 and tw_resources_requests
             ):
                 # Localize non-English languages.
-                file_content = file_utils.read_file(
-                    self._translation_words_dict[filename_sans_suffix]
-                )
-                # Get the localized name for the translation word
-                localized_translation_word = tw_utils.localized_translation_word(
-                    file_content
-                )
+                localized_translation_word = self._translation_words[
+                    filename_sans_suffix
+                ].localized_word
                 # Build the anchor links
                 source = source.replace(
                     match_text,
@@ -211,17 +203,13 @@ class LinkTransformerPreprocessor(markdown.preprocessors.Preprocessor):
         for match in re.finditer(link_regexes.TW_WIKI_RC_LINK_RE, source):
             filename_sans_suffix = match.group("word")
             if (
-                filename_sans_suffix in self._translation_words_dict
+                filename_sans_suffix in self._translation_words
                 and tw_resources_requests
             ):
                 # Localize non-English languages.
-                file_content = file_utils.read_file(
-                    self._translation_words_dict[filename_sans_suffix]
-                )
-                # Get the localized name for the translation word
-                localized_translation_word = tw_utils.localized_translation_word(
-                    file_content
-                )
+                localized_translation_word = self._translation_words[
+                    filename_sans_suffix
+                ].localized_word
                 # Build the anchor links
                 source = source.replace(
                     match.group(0),  # The whole match
@@ -265,17 +253,13 @@ class LinkTransformerPreprocessor(markdown.preprocessors.Preprocessor):
         for match in re.finditer(link_regexes.TW_WIKI_PREFIXED_RC_LINK_RE, source):
             filename_sans_suffix = match.group("word")
             if (
-                filename_sans_suffix in self._translation_words_dict
+                filename_sans_suffix in self._translation_words
                 and tw_resources_requests
             ):
                 # Need to localize non-English languages.
-                file_content = file_utils.read_file(
-                    self._translation_words_dict[filename_sans_suffix]
-                )
-                # Get the localized name for the translation word
-                localized_translation_word = tw_utils.localized_translation_word(
-                    file_content
-                )
+                localized_translation_word = self._translation_words[
+                    filename_sans_suffix
+                ].localized_word
                 # Build the anchor links
                 source = source.replace(
                     match.group(0),  # The whole match
@@ -625,7 +609,7 @@ class LinkTransformerExtension(markdown.Extension):
             md,
             self.getConfig("lang_code"),
             self.getConfig("resource_requests"),
-            self.getConfig("translation_words_dict"),
+            self.getConfig("translation_words"),
         )
         md.preprocessors.register(
             link_transformer,
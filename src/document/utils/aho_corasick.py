@@ -0,0 +1,78 @@
+"""
+This module provides an Aho-Corasick automaton for finding all the
+occurrences of many patterns in a text in one pass over the text.
+"""
+
+from collections import deque
+from typing import Iterable, Iterator
+
+import icontract
+
+
+class Automaton:
+    """
+    Find every occurrence, including overlapping ones, of a set of
+    strings, the patterns, in a text in time linear in the length of the
+    text plus the number of occurrences.
+    """
+
+    @icontract.require(lambda patterns: all(patterns))
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self._patterns: list[str] = list(patterns)
+        # The trie of the patterns: the transitions out of each node,
+        # the node to fall back to when there is no transition, and the
+        # patterns, by index, that end at each node, including those
+        # that end at the nodes it falls back to.
+        self._transitions: list[dict[str, int]] = [{}]
+        self._fallbacks: list[int] = [0]
+        self._outputs: list[list[int]] = [[]]
+        for pattern_index, pattern in enumerate(self._patterns):
+            node = 0
+            for char in pattern:
+                next_node = self._transitions[node].get(char)
+                if next_node is None:
+                    next_node = len(self._transitions)
+                    self._transitions[node][char] = next_node
+                    self._transitions.append({})
+                    self._fallbacks.append(0)
+                    self._outputs.append([])
+                node = next_node
+            self._outputs[node].append(pattern_index)
+        # Breadth first so that a node's fallback, which is shallower,
+        # is complete before the node's.
+        queue = deque(self._transitions[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._transitions[node].items():
+                fallback = self._fallbacks[node]
+                while fallback and char not in self._transitions[fallback]:
+                    fallback = self._fallbacks[fallback]
+                fallback = self._transitions[fallback].get(char, 0)
+                self._fallbacks[next_node] = fallback
+                self._outputs[next_node] = (
+                    self._outputs[next_node] + self._outputs[fallback]
+                )
+                queue.append(next_node)
+
+    @property
+    def patterns(self) -> list[str]:
+        """Provide public interface for other modules."""
+        return self._patterns
+
+    def finditer(self, text: str) -> Iterator[tuple[int, int]]:
+        """
+        Yield the start index in text and the index of the pattern of
+        each occurrence of a pattern in text, ordered by where the
+        occurrences end.
+        """
+        transitions = self._transitions
+        fallbacks = self._fallbacks
+        outputs = self._outputs
+        patterns = self._patterns
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in transitions[node]:
+                node = fallbacks[node]
+            node = transitions[node].get(char, 0)
+            for pattern_index in outputs[node]:
+                yield end - len(patterns[pattern_index]), pattern_index
@@ -0,0 +1,328 @@
+"""
+Find and read resource asset files whether they were extracted to disk
+or are read in place from their zip asset.
+
+A zip asset is mounted at the directory it would otherwise be
+extracted into. From then on glob, isdir, listdir and read_file serve
+paths under that directory from the zip's central directory and member
+bytes in memory, and all other paths from disk. Callers therefore keep using
+the same paths and glob patterns either way.
+"""
+
+import os
+import re
+import threading
+import zipfile
+from glob import glob as disk_glob
+from typing import Optional
+
+import icontract
+
+from document.config import settings
+from document.utils import file_utils
+
+logger = settings.logger(__name__)
+
+
+def _join(dir_path: str, name: str) -> str:
+    """Join name to dir_path the way glob does."""
+    if not dir_path:
+        return name
+    if dir_path.endswith("/"):
+        return dir_path + name
+    return "{}/{}".format(dir_path, name)
+
+
+def _key(path: str) -> str:
+    """Normalize path for lookups in a ZipAssetFileSystem's index."""
+    path = os.path.normpath(path) if path else ""
+    return "" if path == "." else path
+
+
+def _has_magic(pattern: str) -> bool:
+    return re.search(r"[*?[]", pattern) is not None
+
+
+def _translate(pattern: str) -> re.Pattern[str]:
+    """
+    Translate a single path component glob pattern, i.e., one without
+    a /, to a regular expression.
+    """
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        i += 1
+        if char == "*":
+            regex += ".*"
+        elif char == "?":
+            regex += "."
+        elif char == "[":
+            start = i
+            if pattern[start : start + 1] == "!":
+                start += 1
+            if pattern[start : start + 1] == "]":
+                start += 1
+            end = pattern.find("]", start)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                char_class = pattern[i:end].replace("\\", "\\\\")
+                if char_class.startswith("!"):
+                    char_class = "^" + char_class[1:]
+                regex += "[{}]".format(char_class)
+                i = end + 1
+        else:
+            regex += re.escape(char)
+    return re.compile(r"(?s:{})\Z".format(regex))
+
+
+class ZipAssetFileSystem:
+    """
+    Serve the members of a zip asset as if it had been extracted into
+    root.
+    """
+
+    @icontract.require(lambda zip_path, root: zip_path and root)
+    def __init__(self, zip_path: str, root: str) -> None:
+        self._zip_file = zipfile.ZipFile(zip_path)
+        self._stat = os.stat(zip_path)
+        self.zip_path = zip_path
+        self.root = os.path.normpath(root)
+        # Path of each member, as if extracted, to its name in the zip.
+        self._files: dict[str, str] = {}
+        # Path of each directory to the names of its entries.
+        self._dirs: dict[str, list[str]] = {}
+        self._add_dir(self.root)
+        for name in self._zip_file.namelist():
+            stripped = name.strip("/")
+            if not stripped:
+                continue
+            path = "{}/{}".format(self.root, stripped)
+            if name.endswith("/"):
+                self._add_dir(path)
+            elif path not in self._files:
+                self._files[path] = name
+                dir_path, _, file_name = path.rpartition("/")
+                self._add_dir(dir_path)
+                self._dirs[dir_path].append(file_name)
+        logger.debug(
+            "Mounted %s members of %s at %s", len(self._files), zip_path, self.root
+        )
+
+    def _add_dir(self, dir_path: str) -> None:
+        """
+        Add dir_path, and the chain of its ancestors leading to it, as
+        directories.
+        """
+        if dir_path in self._dirs:
+            return
+        self._dirs[dir_path] = []
+        parent, name = os.path.split(dir_path)
+        if name:
+            self._add_dir(parent)
+            self._dirs[parent].append(name)
+
+    def is_current(self, zip_path: str) -> bool:
+        """
+        Return True if zip_path is still the file that is mounted. Zip
+        assets are replaced, see url_utils.download_file, rather than
+        rewritten, and their modification time is reset whenever they
+        are found unchanged upstream, so only compare which file it is.
+        """
+        try:
+            stat = os.stat(zip_path)
+        except OSError:
+            return False
+        return (stat.st_dev, stat.st_ino, stat.st_size) == (
+            self._stat.st_dev,
+            self._stat.st_ino,
+            self._stat.st_size,
+        )
+
+    def contains(self, path: str) -> bool:
+        """Return True if path is at or under root."""
+        return path == self.root or path.startswith(self.root + "/")
+
+    def isdir(self, path: str) -> bool:
+        return _key(path) in self._dirs
+
+    def glob(self, pattern: str) -> list[str]:
+        """
+        Return the paths matching pattern, with the semantics of
+        glob.glob without recursive, i.e., where ** acts like *.
+        """
+        parts = pattern.split("/")
+        if parts[0] == "":
+            paths = ["/"]
+            parts = parts[1:]
+        else:
+            paths = [""]
+        parts = [part for part in parts if part]
+        for index, part in enumerate(parts):
+            last = index == len(parts) - 1
+            regex = _translate(part) if _has_magic(part) else None
+            matched: list[str] = []
+            for path in paths:
+                entries = self._dirs.get(_key(path))
+                if entries is None:
+                    continue
+                if regex is None:
+                    child = _join(path, part)
+                    key = _key(child)
+                    if key in self._dirs or (last and key in self._files):
+                        matched.append(child)
+                    continue
+                for name in entries:
+                    if not regex.match(name) or (
+                        name.startswith(".") and not part.startswith(".")
+                    ):
+                        continue
+                    child = _join(path, name)
+                    if last or _key(child) in self._dirs:
+                        matched.append(child)
+            paths = matched
+        return paths
+
+    def listdir(self, path: str) -> tuple[list[str], list[str]]:
+        """Return the names of the directories and files in path."""
+        dirs: list[str] = []
+        files: list[str] = []
+        for name in self._dirs.get(_key(path), []):
+            if _key(_join(path, name)) in self._dirs:
+                dirs.append(name)
+            else:
+                files.append(name)
+        return dirs, files
+
+    def read_file(self, path: str, encoding: str = "utf-8") -> str:
+        """Read the member at path."""
+        return self._zip_file.read(self._files[_key(path)]).decode(encoding)
+
+    def close(self) -> None:
+        self._zip_file.close()
+
+
+# Zip assets mounted so far, keyed by their mount point.
+_mounted: dict[str, ZipAssetFileSystem] = {}
+_mounted_lock = threading.Lock()
+
+
+@icontract.require(lambda zip_path, root: zip_path and root)
+def mount(zip_path: str, root: str) -> ZipAssetFileSystem:
+    """
+    Mount the zip asset at zip_path at root, unless it already is, and
+    return it. A zip asset that changed on disk, e.g., because a newer
+    version was downloaded, is mounted anew.
+    """
+    key = os.path.normpath(root)
+    with _mounted_lock:
+        asset_file_system = _mounted.get(key)
+        if asset_file_system is None or not asset_file_system.is_current(zip_path):
+            # Readers of the previous version may still hold it, let
+            # garbage collection close it.
+            asset_file_system = ZipAssetFileSystem(zip_path, root)
+            _mounted[key] = asset_file_system
+        return asset_file_system
+
+
+def mounted(zip_path: str, root: str) -> Optional[ZipAssetFileSystem]:
+    """
+    Return the zip asset mounted at root if it is still the one at
+    zip_path, None otherwise.
+    """
+    asset_file_system = _mounted.get(os.path.normpath(root))
+    if asset_file_system is not None and asset_file_system.is_current(zip_path):
+        return asset_file_system
+    return None
+
+
+def unmount_all() -> None:
+    """Unmount all zip assets."""
+    with _mounted_lock:
+        for asset_file_system in _mounted.values():
+            asset_file_system.close()
+        _mounted.clear()
+
+
+def _is_mounted(asset_file_system: ZipAssetFileSystem) -> bool:
+    """
+    Return True if asset_file_system is still mounted. A zip asset
+    that was evicted from disk, see disk_cache, or replaced by a newer
+    version since it was mounted is unmounted instead.
+    """
+    if asset_file_system.is_current(asset_file_system.zip_path):
+        return True
+    with _mounted_lock:
+        if _mounted.get(asset_file_system.root) is asset_file_system:
+            logger.debug("Unmounting %s, it changed", asset_file_system.zip_path)
+            # Readers may still hold it, let garbage collection close
+            # it.
+            del _mounted[asset_file_system.root]
+    return False
+
+
+def _mount_containing(path: str) -> Optional[ZipAssetFileSystem]:
+    """Return the mounted zip asset that path is under, if any."""
+    path = os.path.normpath(path)
+    for asset_file_system in list(_mounted.values()):
+        if asset_file_system.contains(path):
+            return asset_file_system if _is_mounted(asset_file_system) else None
+    return None
+
+
+def glob(pattern: str) -> list[str]:
+    """
+    Drop-in replacement for glob.glob that also finds the members of
+    mounted zip assets.
+    """
+    asset_file_system = _mount_containing(pattern)
+    if asset_file_system is not None:
+        return asset_file_system.glob(pattern)
+    paths = disk_glob(pattern)
+    for asset_file_system in list(_mounted.values()):
+        mounted_paths = asset_file_system.glob(pattern)
+        if mounted_paths and _is_mounted(asset_file_system):
+            paths.extend(path for path in mounted_paths if path not in paths)
+    return paths
+
+
+def isdir(path: str) -> bool:
+    """
+    Drop-in replacement for os.path.isdir that also knows the
+    directories of mounted zip assets.
+    """
+    asset_file_system = _mount_containing(path)
+    if asset_file_system is not None:
+        return asset_file_system.isdir(path)
+    return os.path.isdir(path)
+
+
+def listdir(path: str) -> tuple[list[str], list[str]]:
+    """
+    Return the names of the directories and files in path, which may
+    be in a mounted zip asset. A path that doesn't exist is empty.
+    """
+    asset_file_system = _mount_containing(path)
+    if asset_file_system is not None:
+        return asset_file_system.listdir(path)
+    dirs: list[str] = []
+    files: list[str] = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                (dirs if entry.is_dir() else files).append(entry.name)
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    return dirs, files
+
+
+def read_file(file_name: str, encoding: str = "utf-8") -> str:
+    """
+    Drop-in replacement for file_utils.read_file that also reads the
+    members of mounted zip assets.
+    """
+    asset_file_system = _mount_containing(file_name)
+    if asset_file_system is not None:
+        return asset_file_system.read_file(file_name, encoding)
+    return file_utils.read_file(file_name, encoding)
@@ -0,0 +1,319 @@
+"""
+Index the files of provisioned assets so that resources find their
+books, chapters, verses, intros and translation words without globbing
+the asset's directory tree over and over.
+
+An asset's index is built in one walk of the tree at the resource_dir
+it is provisioned at, whether on disk or mounted from its zip, see
+asset_fs, and persisted next to the asset. The provisioner discards it
+whenever it changes the asset, see invalidate, and loads it, see load,
+once it is done, both while holding the asset's lock.
+"""
+
+import contextlib
+import fnmatch
+import json
+import os
+import tempfile
+import threading
+from typing import NamedTuple, Optional
+
+import icontract
+
+from document.config import settings
+from document.utils import asset_fs
+
+logger = settings.logger(__name__)
+
+# Suffix of the file an asset's index is persisted in, see index_path.
+INDEX_SUFFIX = ".index.json"
+
+
+class ChapterFiles(NamedTuple):
+    """The files of a chapter of a TN, TQ or TA book."""
+
+    path: str
+    # Sorted, .md files or, if there are none, .txt files.
+    intro_paths: list[str]
+    verse_paths: list[str]
+
+
+class BookFiles(NamedTuple):
+    """The files of a TN, TQ or TA book."""
+
+    # Sorted, .md files or, if there are none, .txt files.
+    intro_paths: list[str]
+    # In the order of their paths.
+    chapters: list[ChapterFiles]
+
+
+def _md_or_txt(names: list[str], pattern: str) -> list[str]:
+    """
+    Return the names matching pattern, a glob pattern sans suffix, with
+    the .md suffix or, if there are none, with the .txt suffix.
+    """
+    return fnmatch.filter(names, pattern + ".md") or fnmatch.filter(
+        names, pattern + ".txt"
+    )
+
+
+class AssetIndex:
+    """
+    The directories and files in the tree at root, hidden ones aside,
+    as glob would find them.
+    """
+
+    def __init__(self, root: str, tree: dict[str, tuple[list[str], list[str]]]):
+        self._root = root
+        # The sorted names of the directories and files in each
+        # directory, keyed by its path relative to root, "" for root.
+        self._tree = tree
+        self._books: dict[str, BookFiles] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    @icontract.require(lambda root: root)
+    def build(cls, root: str) -> "AssetIndex":
+        """Walk the tree at root, on disk or mounted, and index it."""
+        tree: dict[str, tuple[list[str], list[str]]] = {}
+        relative_dirs = [""]
+        while relative_dirs:
+            relative_dir = relative_dirs.pop()
+            dirs, files = asset_fs.listdir(os.path.join(root, relative_dir))
+            dirs = sorted(name for name in dirs if not name.startswith("."))
+            files = sorted(name for name in files if not name.startswith("."))
+            tree[relative_dir] = (dirs, files)
+            relative_dirs.extend(os.path.join(relative_dir, name) for name in dirs)
+        return cls(root, tree)
+
+    @property
+    def root(self) -> str:
+        """Provide public interface for other modules."""
+        return self._root
+
+    @property
+    def tree(self) -> dict[str, tuple[list[str], list[str]]]:
+        """Provide public interface for other modules."""
+        return self._tree
+
+    def _dirs(self, relative_dir: str) -> list[str]:
+        return self._tree.get(relative_dir, ([], []))[0]
+
+    def _files(self, relative_dir: str) -> list[str]:
+        return self._tree.get(relative_dir, ([], []))[1]
+
+    def _path(self, *names: str) -> str:
+        return os.path.join(self._root, *names)
+
+    def usfm_files(self, resource_code: str) -> list[str]:
+        """
+        Return the USFM files, i.e., those with the .usfm suffix at the
+        top of the tree, otherwise those with the .txt suffix there or,
+        failing that, a directory below, whose path names
+        resource_code.
+        """
+        paths = [self._path(name) for name in fnmatch.filter(self._files(""), "*.usfm")]
+        if not paths:
+            paths = [
+                self._path(name) for name in fnmatch.filter(self._files(""), "*.txt")
+            ]
+        if not paths:
+            paths = [
+                self._path(dir_, name)
+                for dir_ in self._dirs("")
+                for name in fnmatch.filter(self._files(dir_), "*.txt")
+            ]
+        return [path for path in paths if resource_code.lower() in path.lower()]
+
+    def _book_dirs(self, resource_code: str) -> list[str]:
+        """
+        Return the directories named after resource_code, e.g., 01-gen,
+        two levels down or, if there are none, one level down.
+        """
+        pattern = "*{}".format(resource_code)
+        book_dirs = [
+            os.path.join(dir_, name)
+            for dir_ in self._dirs("")
+            for name in fnmatch.filter(self._dirs(dir_), pattern)
+        ]
+        return book_dirs or fnmatch.filter(self._dirs(""), pattern)
+
+    def book(self, resource_code: str) -> BookFiles:
+        """Return the files of the TN, TQ or TA book resource_code."""
+        with self._lock:
+            book = self._books.get(resource_code)
+            if book is not None:
+                return book
+        chapters = sorted(
+            (
+                ChapterFiles(
+                    self._path(book_dir, name),
+                    [
+                        self._path(book_dir, name, file_name)
+                        for file_name in _md_or_txt(
+                            self._files(os.path.join(book_dir, name)), "*intro"
+                        )
+                    ],
+                    [
+                        self._path(book_dir, name, file_name)
+                        for file_name in _md_or_txt(
+                            self._files(os.path.join(book_dir, name)), "*[0-9]*"
+                        )
+                    ],
+                )
+                for book_dir in self._book_dirs(resource_code)
+                for name in fnmatch.filter(self._dirs(book_dir), "*[0-9]*")
+            ),
+            key=lambda chapter: chapter.path,
+        )
+        intro_paths = [
+            self._path(book_dir, "front", file_name)
+            for book_dir in fnmatch.filter(self._dirs(""), "*{}".format(resource_code))
+            for file_name in _md_or_txt(
+                self._files(os.path.join(book_dir, "front")), "intro"
+            )
+        ]
+        book = BookFiles(intro_paths, chapters)
+        with self._lock:
+            self._books[resource_code] = book
+        return book
+
+    def translation_word_files(self) -> list[str]:
+        """Return the Markdown files of the translation words."""
+        return [
+            self._path("bible", kind, name)
+            for kind in ["kt", "names", "other"]
+            for name in fnmatch.filter(self._files(os.path.join("bible", kind)), "*.md")
+        ]
+
+
+def index_path(asset_path: str) -> str:
+    """
+    Return the path of the file the index of the asset at asset_path,
+    a zip file or a git repo, is persisted in. It is hidden, so that
+    it isn't indexed itself, and sits beside the asset. The provisioner
+    keeps each asset in its resource's directory in working_dir, e.g.,
+    working_dir/en_tn/en_tn.zip, so the index file is in that
+    directory too and disk_cache evicts it along with the asset. An
+    asset kept directly in working_dir would leave its index file
+    behind.
+    """
+    return os.path.join(
+        os.path.dirname(asset_path),
+        ".{}{}".format(os.path.basename(asset_path), INDEX_SUFFIX),
+    )
+
+
+# The indexes loaded so far, with the identity of the file each was
+# loaded from, keyed by the path of that file.
+_indexes: dict[str, tuple[tuple[int, int, int], AssetIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def _identity(path: str) -> tuple[int, int, int]:
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _loaded(root: str) -> Optional[tuple[str, AssetIndex]]:
+    """
+    Return the index loaded for root, see load, and the path of the
+    file it was loaded from if it is still current, None otherwise.
+    """
+    with _indexes_lock:
+        candidates = [
+            (path, identity, index)
+            for path, (identity, index) in _indexes.items()
+            if index.root == root
+        ]
+    for path, identity, index in candidates:
+        with contextlib.suppress(FileNotFoundError):
+            if _identity(path) == identity:
+                return path, index
+    return None
+
+
+def loaded(root: str) -> Optional[AssetIndex]:
+    """
+    Return the index loaded for root, see load, if it is still current,
+    None otherwise.
+    """
+    path_and_index = _loaded(root)
+    return path_and_index[1] if path_and_index is not None else None
+
+
+def asset_path(root: str) -> Optional[str]:
+    """
+    Return the path of the asset, a zip file or a git repo, whose
+    index is loaded for root, see loaded, None if there is none, the
+    inverse of index_path.
+    """
+    path_and_index = _loaded(root)
+    if path_and_index is None:
+        return None
+    path = path_and_index[0]
+    return os.path.join(
+        os.path.dirname(path), os.path.basename(path)[1 : -len(INDEX_SUFFIX)]
+    )
+
+
+@icontract.require(lambda asset_path: asset_path)
+def invalidate(asset_path: str) -> None:
+    """Discard the index of the asset at asset_path as it changed."""
+    path = index_path(asset_path)
+    with _indexes_lock:
+        _indexes.pop(path, None)
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+
+
+@icontract.require(lambda asset_path, root: asset_path and root)
+def load(asset_path: str, root: str) -> AssetIndex:
+    """
+    Return the index of the asset at asset_path as provisioned at
+    root: the one loaded before if it is still current, otherwise the
+    one persisted, otherwise a new one, which is persisted. The caller
+    must hold the asset's lock, see file_utils.file_lock.
+    """
+    path = index_path(asset_path)
+    try:
+        identity: Optional[tuple[int, int, int]] = _identity(path)
+    except FileNotFoundError:
+        identity = None
+    if identity is not None:
+        with _indexes_lock:
+            loaded = _indexes.get(path)
+        if loaded is not None and loaded[0] == identity and loaded[1].root == root:
+            return loaded[1]
+        try:
+            with open(path, encoding="utf-8") as fin:
+                persisted = json.load(fin)
+            if persisted["root"] == root:
+                index = AssetIndex(
+                    root,
+                    {
+                        relative_dir: (dirs, files)
+                        for relative_dir, (dirs, files) in persisted["tree"].items()
+                    },
+                )
+                with _indexes_lock:
+                    _indexes[path] = (identity, index)
+                return index
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.exception("Discarding unreadable %s: ", path)
+    logger.debug("Indexing %s", root)
+    index = AssetIndex.build(root)
+    file_descriptor, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=".tmp."
+    )
+    try:
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as fout:
+            json.dump({"root": root, "tree": index.tree}, fout)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
+    with _indexes_lock:
+        _indexes[path] = (_identity(path), index)
+    return index
@@ -0,0 +1,387 @@
+"""
+Keep the assets in working_dir and the documents in output_dir within
+disk quotas.
+
+Nothing else ever deletes the assets acquired into working_dir or the
+documents generated into output_dir. DiskCache evicts them, least
+recently used first, whenever together they exceed a quota on bytes or
+on inodes, until they are back below a low water mark of both. An item
+is evicted whole: an asset directory, e.g., working_dir/en_tn, all
+the files of a document, e.g., output_dir/<document_request_key>.html
+and .pdf, or a file in one of the ENTRY_DIRS, e.g., an entry of the
+cache of parsed content in working_dir/parsed.
+
+Document requests hold the items they use with in_use and DiskCache
+never evicts those. in_use also records when an item was last used as
+the modification time of the item's lock file, see
+file_utils.file_lock, rather than relying on access times which noatime
+and relatime mounts do not keep and which scanning directories
+updates.
+"""
+
+import contextlib
+import os
+import shutil
+import threading
+import time
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+import icontract
+
+from document.config import settings
+from document.utils import file_utils
+
+logger = settings.logger(__name__)
+
+# Prefix of the name an item is renamed to while it is being deleted,
+# so that an eviction cut short never leaves a partial item behind.
+EVICTING_PREFIX = ".evicting."
+# Key of the lock that makes sure only one process at a time evicts.
+EVICTION_LOCK_KEY = "disk-cache-eviction"
+# Directories in working_dir each file of which is an item of its own
+# rather than the directory as a whole, e.g., the entries of
+# parsed_resource_cache.PARSED_DIR which every request uses some of
+# and so would never be evicted as one item.
+ENTRY_DIRS = frozenset(["parsed"])
+
+
+class CachedItem(NamedTuple):
+    """
+    An asset directory or a file in one of the ENTRY_DIRS in
+    working_dir or a document in output_dir.
+    """
+
+    path: str
+    # The directory or the document's files to delete to evict it.
+    paths: list[str]
+    # Disk space used in bytes and number of files and directories.
+    size: int
+    inodes: int
+    # When it was last used, in seconds since the epoch.
+    accessed: float
+
+
+def item_path(path: str) -> Optional[str]:
+    """
+    Return the path of the item that path, e.g., a file of an asset or
+    a document, belongs to, or None if path isn't part of any item.
+    """
+    path = os.path.abspath(path)
+    output_dir = os.path.abspath(settings.output_dir())
+    working_dir = os.path.abspath(settings.working_dir())
+    # output_dir may be in working_dir, so check it first.
+    for root in [output_dir, working_dir]:
+        if not path.startswith(root + os.sep):
+            continue
+        names = path[len(root) + 1 :].split(os.sep)
+        name = names[0]
+        if name.startswith("."):
+            return None
+        if root == working_dir and name in ENTRY_DIRS:
+            # Each file is an item.
+            if (
+                len(names) == 1
+                or any(name_.startswith(".") for name_ in names)
+                or os.path.isdir(path)
+            ):
+                return None
+            return path
+        if root == output_dir:
+            # A document's files only differ in their suffix.
+            name = name.split(".")[0]
+        return os.path.join(root, name)
+    return None
+
+
+def _in_use_key(path: str) -> str:
+    return "in-use:{}".format(path)
+
+
+def _accessed(path: str, default: float) -> float:
+    """
+    Return when the item at path was last used or default if that was
+    never recorded.
+    """
+    try:
+        return os.stat(file_utils.lock_file_path(_in_use_key(path))).st_mtime
+    except FileNotFoundError:
+        return default
+
+
+def record_access(path: str) -> None:
+    """Record that the item path belongs to was used just now."""
+    item = item_path(path)
+    if item is None:
+        return
+    lock_path = file_utils.lock_file_path(_in_use_key(item))
+    file_utils.make_dir(os.path.dirname(lock_path))
+    with open(lock_path, "a"):
+        pass
+    os.utime(lock_path)
+
+
+@contextlib.contextmanager
+def in_use(paths: Iterable[str]) -> Iterator[None]:
+    """
+    Keep the items that paths belong to from being evicted for the
+    duration of the with block, and record that they were used. paths
+    need not exist yet, e.g., that of a document about to be generated.
+    """
+    items = sorted({item for item in map(item_path, paths) if item is not None})
+    with contextlib.ExitStack() as stack:
+        for item in items:
+            stack.enter_context(file_utils.file_lock(_in_use_key(item), shared=True))
+            record_access(item)
+        yield
+
+
+def _usage(path: str) -> tuple[int, int, float]:
+    """
+    Return the disk space in bytes, the number of inodes used by path
+    and, if need be, everything under it, and path's modification time.
+    """
+    stat = os.lstat(path)
+    size, inodes = stat.st_blocks * 512, 1
+    dirs = [path] if os.path.isdir(path) and not os.path.islink(path) else []
+    while dirs:
+        with os.scandir(dirs.pop()) as entries:
+            for entry in entries:
+                entry_stat = entry.stat(follow_symlinks=False)
+                size += entry_stat.st_blocks * 512
+                inodes += 1
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+    return size, inodes, stat.st_mtime
+
+
+def _cached_item(path: str, paths: list[str]) -> Optional[CachedItem]:
+    """Return the item at path made up of paths, None if it vanished."""
+    size, inodes, modified = 0, 0, 0.0
+    try:
+        for path_ in paths:
+            path_size, path_inodes, path_modified = _usage(path_)
+            size += path_size
+            inodes += path_inodes
+            modified = max(modified, path_modified)
+    except FileNotFoundError:
+        # Deleted, or replaced, while we were looking, skip it this time.
+        return None
+    return CachedItem(path, paths, size, inodes, _accessed(path, modified))
+
+
+def _entry_dir_files(entry_dir: str) -> list[str]:
+    """Return the paths of the files in entry_dir, one of ENTRY_DIRS."""
+    paths: list[str] = []
+    for dirpath, dirnames, filenames in os.walk(entry_dir):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+        paths.extend(
+            os.path.join(dirpath, name)
+            for name in filenames
+            if not name.startswith(".")
+        )
+    return paths
+
+
+class DiskCache:
+    """
+    Enforce quotas on the disk space and inodes used by the assets in
+    working_dir and the documents in output_dir together.
+    """
+
+    @icontract.require(
+        lambda max_bytes, max_inodes, low_water_mark: max_bytes > 0
+        and max_inodes > 0
+        and 0 < low_water_mark <= 1
+    )
+    def __init__(self, max_bytes: int, max_inodes: int, low_water_mark: float) -> None:
+        self._max_bytes = max_bytes
+        self._max_inodes = max_inodes
+        self._low_water_mark = low_water_mark
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._inodes = 0
+        self._items = 0
+        self._evictions = 0
+        self._evicted_bytes = 0
+        self._skipped_in_use = 0
+        self._last_enforced: Optional[float] = None
+
+    def items(self) -> list[CachedItem]:
+        """
+        Return the assets and the files in ENTRY_DIRS in working_dir and
+        the documents in output_dir.
+        """
+        working_dir = os.path.abspath(settings.working_dir())
+        output_dir = os.path.abspath(settings.output_dir())
+        items: list[Optional[CachedItem]] = []
+        if os.path.isdir(working_dir):
+            with os.scandir(working_dir) as entries:
+                items.extend(
+                    _cached_item(entry.path, [entry.path])
+                    for entry in entries
+                    if entry.is_dir(follow_symlinks=False)
+                    and not entry.name.startswith(".")
+                    and entry.name not in ENTRY_DIRS
+                    and entry.path != output_dir
+                )
+            for name in ENTRY_DIRS:
+                items.extend(
+                    _cached_item(path, [path])
+                    for path in _entry_dir_files(os.path.join(working_dir, name))
+                )
+        if os.path.isdir(output_dir):
+            documents: dict[str, list[str]] = {}
+            with os.scandir(output_dir) as entries:
+                for entry in entries:
+                    if not entry.name.startswith("."):
+                        documents.setdefault(
+                            os.path.join(output_dir, entry.name.split(".")[0]), []
+                        ).append(entry.path)
+            items.extend(_cached_item(path, paths) for path, paths in documents.items())
+        return [item for item in items if item is not None]
+
+    def _remove_leftovers(self) -> None:
+        """Finish deleting items whose eviction was cut short."""
+        for root in [settings.working_dir(), settings.output_dir()]:
+            if not os.path.isdir(root):
+                continue
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if entry.name.startswith(EVICTING_PREFIX):
+                        shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _evict(self, item: CachedItem) -> bool:
+        """
+        Delete item unless it is in use or was used since it was
+        looked at. Return True if it was deleted.
+        """
+        # Before try_file_lock creates the lock file of an item whose
+        # use was never recorded, which would make it look used just now.
+        accessed = _accessed(item.path, item.accessed)
+        with file_utils.try_file_lock(_in_use_key(item.path)) as acquired:
+            if not acquired or accessed != item.accessed:
+                logger.debug("Not evicting %s, it is in use", item.path)
+                with self._lock:
+                    self._skipped_in_use += 1
+                return False
+            logger.info(
+                "Evicting %s, %s bytes, last used %s",
+                item.path,
+                item.size,
+                time.ctime(item.accessed),
+            )
+            for path in item.paths:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    evicting_path = os.path.join(
+                        os.path.dirname(path),
+                        "{}{}".format(EVICTING_PREFIX, os.path.basename(path)),
+                    )
+                    os.replace(path, evicting_path)
+                    shutil.rmtree(evicting_path, ignore_errors=True)
+                else:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(path)
+            # Otherwise file_utils.LOCKS_DIR would keep a lock file for
+            # every item ever cached.
+            file_utils.remove_lock_file(_in_use_key(item.path))
+        return True
+
+    def enforce(self) -> int:
+        """
+        If the quotas are exceeded, evict the least recently used items
+        that are not in use until usage is below the low water mark of
+        both quotas. Return the number of items evicted. Only one
+        process at a time enforces the quotas, others return 0 straight
+        away.
+        """
+        with file_utils.try_file_lock(EVICTION_LOCK_KEY) as acquired:
+            if not acquired:
+                logger.debug("Another process is enforcing the disk quotas")
+                return 0
+            self._remove_leftovers()
+            items = self.items()
+            size = sum(item.size for item in items)
+            inodes = sum(item.inodes for item in items)
+            evicted = evicted_bytes = 0
+            if size > self._max_bytes or inodes > self._max_inodes:
+                for item in sorted(items, key=lambda item: item.accessed):
+                    if (
+                        size <= self._max_bytes * self._low_water_mark
+                        and inodes <= self._max_inodes * self._low_water_mark
+                    ):
+                        break
+                    if self._evict(item):
+                        size -= item.size
+                        inodes -= item.inodes
+                        evicted += 1
+                        evicted_bytes += item.size
+                if size > self._max_bytes or inodes > self._max_inodes:
+                    logger.warning(
+                        "Disk quotas still exceeded, %s bytes and %s inodes are in use",
+                        size,
+                        inodes,
+                    )
+            with self._lock:
+                self._bytes = size
+                self._inodes = inodes
+                self._items = len(items) - evicted
+                self._evictions += evicted
+                self._evicted_bytes += evicted_bytes
+                self._last_enforced = time.time()
+            return evicted
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return usage as of the last time this process enforced the
+        quotas and eviction counters, suitable for exposing to
+        monitoring.
+        """
+        with self._lock:
+            return {
+                "bytes": self._bytes,
+                "inodes": self._inodes,
+                "items": self._items,
+                "max_bytes": self._max_bytes,
+                "max_inodes": self._max_inodes,
+                "evictions": self._evictions,
+                "evicted_bytes": self._evicted_bytes,
+                "skipped_in_use": self._skipped_in_use,
+                "last_enforced": self._last_enforced,
+            }
+
+
+class DiskCacheEvictor:
+    """Enforce a DiskCache's quotas periodically from a daemon thread."""
+
+    @icontract.require(lambda interval: interval > 0)
+    def __init__(self, disk_cache: DiskCache, interval: float) -> None:
+        self._disk_cache = disk_cache
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Enforce the quotas now and then every interval seconds."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="disk-cache-evictor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and wait for it to finish."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self._disk_cache.enforce()
+            except Exception:
+                # Never let the evictor die, we'll try again next
+                # interval.
+                logger.exception("Caught exception: ")
+            if self._stop_event.wait(self._interval):
+                break
@@ -1,13 +1,18 @@
 """This module provides various file utilities."""
 
 import codecs
+import contextlib
+import fcntl
+import hashlib
 import json
 import logging  # For logdecorator
 import os
 import pathlib
+import threading
+import time
 import zipfile
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import IO, Any, Callable, Iterator, Optional, Union
 
 import icontract
 import yaml
@@ -19,15 +24,24 @@ logger = settings.logger(__name__)
 
 
 @icontract.require(lambda source_file, destination_dir: source_file and destination_dir)
-def unzip(source_file: str, destination_dir: str) -> None:
+def unzip(
+    source_file: str,
+    destination_dir: str,
+    member_filter: Optional[Callable[[str], bool]] = None,
+) -> None:
     """
     Unzips <source_file> into <destination_dir>.
 
     :param str|unicode source_file: The name of the file to read
     :param str|unicode destination_dir: The name of the directory to write the unzipped files
+    :param member_filter: If given, only the members whose path it returns True for are unzipped
     """
     with zipfile.ZipFile(source_file) as zf:
-        zf.extractall(destination_dir)
+        members = zf.namelist()
+        if member_filter is not None:
+            members = [member for member in members if member_filter(member)]
+        logger.debug("Unzipping %s members of %s", len(members), source_file)
+        zf.extractall(destination_dir, members)
 
 
 @icontract.require(lambda dir_name: dir_name)
@@ -47,7 +61,8 @@ def make_dir(
     :param error_if_not_writable: Boolean saying whether to raise an exception if the file is not writable.
     """
     if not os.path.exists(dir_name):
-        os.makedirs(dir_name, linux_mode)
+        # Another thread or process may create it concurrently.
+        os.makedirs(dir_name, linux_mode, exist_ok=True)
     elif error_if_not_writable:
         if not os.access(dir_name, os.R_OK | os.W_OK | os.X_OK):
             raise IOError("Directory {0} is not writable.".format(dir_name))
@@ -119,6 +134,87 @@ def write_file(
         out_file.write(text_to_write)
 
 
+# Suffix of the sidecar metadata file of a file.
+SIDECAR_METADATA_SUFFIX = ".meta.json"
+
+
+@icontract.require(lambda file_path: file_path)
+def sidecar_metadata_path(file_path: Union[str, pathlib.Path]) -> str:
+    """
+    Return the path of the JSON file that holds metadata, e.g., HTTP
+    validators, about the file at file_path.
+    """
+    return "{}{}".format(file_path, SIDECAR_METADATA_SUFFIX)
+
+
+@icontract.require(lambda file_path: file_path)
+@icontract.ensure(lambda result: result is not None)
+def read_sidecar_metadata(file_path: Union[str, pathlib.Path]) -> dict[str, Any]:
+    """
+    Return the metadata recorded for file_path or an empty dictionary
+    if there is none or it is unreadable.
+    """
+    metadata_path = sidecar_metadata_path(file_path)
+    if not os.path.exists(metadata_path):
+        return {}
+    try:
+        metadata: dict[str, Any] = json.loads(read_file(metadata_path))
+    except ValueError:
+        logger.exception("Caught exception: ")
+        return {}
+    return metadata
+
+
+@icontract.require(
+    lambda file_path, metadata: file_path and metadata is not None
+)
+def write_sidecar_metadata(
+    file_path: Union[str, pathlib.Path], metadata: dict[str, Any]
+) -> None:
+    """Record metadata for file_path in its sidecar metadata file."""
+    write_file(sidecar_metadata_path(file_path), metadata)
+
+
+# Keys of the size and sha256 checksum of a downloaded asset in its
+# sidecar metadata file.
+SIZE_KEY = "size"
+SHA256_KEY = "sha256"
+# Keys of the HTTP validators, i.e., the version upstream, of a
+# downloaded file in its sidecar metadata file.
+ETAG_KEY = "etag"
+LAST_MODIFIED_KEY = "last_modified"
+
+
+@icontract.require(lambda file_path: file_path)
+def file_sha256(file_path: Union[str, pathlib.Path]) -> str:
+    """Return the hex sha256 checksum of the content of file_path."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+@icontract.require(lambda file_path: file_path)
+@log_on_end(logging.DEBUG, "{file_path} is intact: {result}.", logger=logger)
+def file_is_intact(file_path: Union[str, pathlib.Path]) -> bool:
+    """
+    Return True if file_path exists and its size and sha256 checksum
+    match those recorded in its sidecar metadata file when it was
+    downloaded. Files without recorded size and checksum, e.g.,
+    downloaded before they were recorded, are not considered intact.
+    """
+    if not os.path.exists(file_path):
+        return False
+    metadata = read_sidecar_metadata(file_path)
+    if SIZE_KEY not in metadata or SHA256_KEY not in metadata:
+        return False
+    return (
+        os.path.getsize(file_path) == metadata[SIZE_KEY]
+        and file_sha256(file_path) == metadata[SHA256_KEY]
+    )
+
+
 @icontract.require(lambda file_path: file_path is not None)
 @log_on_end(logging.DEBUG, "{file_path} needs update: {result}.", logger=logger)
 def source_file_needs_update(file_path: Union[str, pathlib.Path]) -> bool:
@@ -136,16 +232,186 @@ def asset_file_needs_update(file_path: Union[str, pathlib.Path]) -> bool:
 
 
 @icontract.require(lambda file_path: file_path is not None)
-def __file_needs_update(file_path: Union[str, pathlib.Path]) -> bool:
+@log_on_end(logging.DEBUG, "{file_path} needs revalidation: {result}.", logger=logger)
+def asset_needs_revalidation(file_path: Union[str, pathlib.Path]) -> bool:
+    """
+    Return True if settings.ASSET_CACHING_ENABLED is False or if
+    file_path, an asset file or git repo, either does not exist or has
+    not been revalidated, i.e., checked against its version upstream,
+    see url_utils.refresh_file and git_utils.refresh_repo, within
+    settings.ASSET_REVALIDATION_PERIOD minutes or, if shorter,
+    settings.ASSET_CACHING_PERIOD hours.
+    """
+    if not settings.ASSET_CACHING_ENABLED:
+        return True
+    return __file_needs_update(
+        file_path,
+        min(settings.ASSET_REVALIDATION_PERIOD, 60 * settings.ASSET_CACHING_PERIOD),
+    )
+
+
+@icontract.require(lambda file_path: file_path is not None)
+def __file_needs_update(
+    file_path: Union[str, pathlib.Path], max_age_minutes: Optional[int] = None
+) -> bool:
     """
     Return True if settings.ASSET_CACHING_ENABLED is False or if
     file_path either does not exist or does exist and has not been
-    updated within settings.ASSET_CACHING_PERIOD hours.
+    updated within max_age_minutes, settings.ASSET_CACHING_PERIOD hours
+    by default.
     """
     if not os.path.exists(file_path):
         return True
+    if max_age_minutes is None:
+        max_age_minutes = 60 * settings.ASSET_CACHING_PERIOD
     file_mod_time: datetime = datetime.fromtimestamp(os.stat(file_path).st_mtime)
     now: datetime = datetime.today()
-    max_delay: timedelta = timedelta(minutes=60 * settings.ASSET_CACHING_PERIOD)
-    # Has it been more than settings.ASSET_CACHING_PERIOD hours since last modification time?
+    max_delay: timedelta = timedelta(minutes=max_age_minutes)
+    # Has it been more than max_age_minutes since last modification time?
     return now - file_mod_time > max_delay
+
+
+# Name of the directory in working_dir where lock files are kept.
+LOCKS_DIR = ".locks"
+
+
+class _LockStats:
+    """Thread safe counters of file_lock acquisitions and waits."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended_acquisitions = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, contended: bool, wait_seconds: float) -> None:
+        with self._lock:
+            self.acquisitions += 1
+            if contended:
+                self.contended_acquisitions += 1
+                self.total_wait_seconds += wait_seconds
+                self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "acquisitions": self.acquisitions,
+                "contended_acquisitions": self.contended_acquisitions,
+                "total_wait_seconds": round(self.total_wait_seconds, 6),
+                "max_wait_seconds": round(self.max_wait_seconds, 6),
+            }
+
+
+_lock_stats = _LockStats()
+
+
+def lock_stats() -> dict[str, Any]:
+    """
+    Return counters of file_lock acquisitions, how many had to wait
+    on another holder of the lock and for how long, suitable for
+    exposing to monitoring.
+    """
+    return _lock_stats.as_dict()
+
+
+def _is_lock_file(lock_file: IO[str], path: str) -> bool:
+    """
+    Return True if lock_file is still the lock file at path, i.e., it
+    wasn't removed, see remove_lock_file, while we waited on it.
+    """
+    try:
+        return os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def lock_file_path(key: str, lock_dir: Optional[str] = None) -> str:
+    """
+    Return the path of the lock file for key, e.g., the path of an
+    asset, in lock_dir which defaults to LOCKS_DIR in working_dir.
+    """
+    if lock_dir is None:
+        lock_dir = os.path.join(settings.working_dir(), LOCKS_DIR)
+    return os.path.join(
+        lock_dir, "{}.lock".format(hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+    )
+
+
+@contextlib.contextmanager
+@icontract.require(lambda key: key)
+def file_lock(
+    key: str, lock_dir: Optional[str] = None, shared: bool = False
+) -> Iterator[None]:
+    """
+    Hold an exclusive lock on key, e.g., the path of an asset, for the
+    duration of the with block. The lock is an flock on a lock file so
+    it excludes other threads and other processes, e.g., other
+    gunicorn workers, alike. Time spent waiting on the lock is recorded
+    in lock_stats.
+
+    If shared, hold a shared lock instead, which only excludes
+    exclusive holders of the lock.
+    """
+    path = lock_file_path(key, lock_dir)
+    operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    contended = False
+    start = time.perf_counter()
+    while True:
+        make_dir(os.path.dirname(path))
+        with open(path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, operation | fcntl.LOCK_NB)
+            except BlockingIOError:
+                contended = True
+                logger.debug("Waiting on lock for %s", key)
+                fcntl.flock(lock_file, operation)
+            if not _is_lock_file(lock_file, path):
+                # Removed while we waited, lock the one there now.
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                continue
+            _lock_stats.record(contended, time.perf_counter() - start)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            return
+
+
+@contextlib.contextmanager
+@icontract.require(lambda key: key)
+def try_file_lock(key: str, lock_dir: Optional[str] = None) -> Iterator[bool]:
+    """
+    Like file_lock, but rather than waiting on other holders of the
+    lock, yield False straight away if there are any, and True if the
+    lock is held for the duration of the with block.
+    """
+    path = lock_file_path(key, lock_dir)
+    while True:
+        make_dir(os.path.dirname(path))
+        with open(path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            if not _is_lock_file(lock_file, path):
+                # Removed since we opened it, try the one there now.
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                continue
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            return
+
+
+@icontract.require(lambda key: key)
+def remove_lock_file(key: str, lock_dir: Optional[str] = None) -> None:
+    """
+    Delete the lock file for key, e.g., once what it guards is gone,
+    while holding the exclusive lock on key. Whoever waits on the lock
+    meanwhile locks a new lock file instead, see file_lock.
+    """
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(lock_file_path(key, lock_dir))
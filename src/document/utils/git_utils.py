@@ -0,0 +1,225 @@
+"""
+Keep shallow clones of resource git repos up to date.
+
+Rather than deleting and cloning a repo again when it expires,
+refresh_repo asks the remote for the commit its HEAD points to and
+only fetches, shallowly, and checks it out if it differs from what we
+have. A full clone is only needed the first time and if the local repo
+turns out to be corrupt.
+
+Given sparse-checkout patterns, repos are partial clones, i.e., file
+contents are only fetched when checked out, of which only the files
+matching the patterns are checked out. The patterns are non-cone mode,
+i.e., .gitignore style, patterns. include_in_sparse_checkout widens
+the checkout to more patterns later on.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Optional
+
+import icontract
+
+from document.config import settings
+
+logger = settings.logger(__name__)
+
+# Outcomes of refresh_repo.
+UNCHANGED = "unchanged"
+UPDATED = "updated"
+CLONED = "cloned"
+STALE = "stale"
+
+
+def _git(*args: str, cwd: Optional[str] = None) -> str:
+    """
+    Run git with args, without a shell, and return its stripped
+    output. Raise subprocess.CalledProcessError if it fails.
+    """
+    logger.debug("git command: git %s", " ".join(args))
+    completed = subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+        text=True,
+        timeout=settings.GIT_COMMAND_TIMEOUT,
+        # Never prompt for credentials, fail instead.
+        env=dict(os.environ, GIT_TERMINAL_PROMPT="0"),
+    )
+    return completed.stdout.strip()
+
+
+@icontract.require(lambda url: url)
+def remote_head(url: str) -> str:
+    """Return the commit that the HEAD of the remote repo at url points to."""
+    output = _git("ls-remote", "--", url, "HEAD")
+    if not output:
+        raise subprocess.CalledProcessError(
+            1, ["git", "ls-remote", url, "HEAD"], "No HEAD at {}".format(url)
+        )
+    return output.split()[0]
+
+
+@icontract.require(lambda repo_dir: repo_dir)
+def local_head(repo_dir: str) -> Optional[str]:
+    """
+    Return the commit checked out in the repo at repo_dir, or None if
+    there is no usable repo there.
+    """
+    if not os.path.isdir(os.path.join(repo_dir, ".git")):
+        return None
+    try:
+        return _git("rev-parse", "--verify", "HEAD", cwd=repo_dir)
+    except subprocess.SubprocessError:
+        logger.exception("Caught exception: ")
+        return None
+
+
+@icontract.require(lambda url, repo_dir: url and repo_dir)
+def clone(url: str, repo_dir: str, sparse_patterns: Optional[list[str]] = None) -> None:
+    """
+    Shallow clone the repo at url into repo_dir, replacing whatever is
+    there only once the clone succeeded. Given sparse_patterns, make it
+    a partial clone of which only the files matching sparse_patterns
+    are checked out.
+    """
+    parent_dir = os.path.dirname(os.path.abspath(repo_dir))
+    clone_dir = tempfile.mkdtemp(
+        dir=parent_dir, prefix=".{}.".format(os.path.basename(repo_dir))
+    )
+    try:
+        if sparse_patterns:
+            # --sparse checks out only the top level files at first.
+            _git(
+                "clone",
+                "--depth=1",
+                "--filter=blob:none",
+                "--sparse",
+                "--",
+                url,
+                clone_dir,
+            )
+            _git("sparse-checkout", "set", "--no-cone", *sparse_patterns, cwd=clone_dir)
+        else:
+            _git("clone", "--depth=1", "--", url, clone_dir)
+        if os.path.exists(repo_dir):
+            shutil.rmtree(repo_dir)
+        os.replace(clone_dir, repo_dir)
+    finally:
+        shutil.rmtree(clone_dir, ignore_errors=True)
+
+
+def _is_partial_clone(repo_dir: str) -> bool:
+    """Return True if the repo at repo_dir is a partial clone."""
+    try:
+        return _git("config", "--get", "remote.origin.promisor", cwd=repo_dir) == "true"
+    except subprocess.CalledProcessError:
+        return False
+
+
+def _fetch_and_reset(url: str, repo_dir: str, commit: str) -> None:
+    """
+    Shallow fetch the remote HEAD from url into the repo at repo_dir
+    and make the working copy match it exactly.
+    """
+    # A partial clone fetches file contents it lacks from origin, make
+    # sure that is url.
+    _git("remote", "set-url", "origin", url, cwd=repo_dir)
+    filter_args = ["--filter=blob:none"] if _is_partial_clone(repo_dir) else []
+    _git(
+        "fetch", "--depth=1", "--no-tags", *filter_args, "origin", "HEAD", cwd=repo_dir
+    )
+    fetched = _git("rev-parse", "--verify", "FETCH_HEAD", cwd=repo_dir)
+    if fetched != commit:
+        # The remote moved on in between, fine, we have its latest.
+        logger.debug("Remote HEAD of %s moved to %s while fetching", url, fetched)
+    _git("reset", "--hard", "FETCH_HEAD", cwd=repo_dir)
+    _git("clean", "-ffdx", cwd=repo_dir)
+    # Let the superseded commits go rather than accumulate them.
+    _git("reflog", "expire", "--expire=now", "--all", cwd=repo_dir)
+    _git("gc", "--prune=now", "--quiet", cwd=repo_dir)
+
+
+@icontract.require(lambda repo_dir, sparse_patterns: repo_dir and sparse_patterns)
+def include_in_sparse_checkout(repo_dir: str, sparse_patterns: list[str]) -> bool:
+    """
+    Make sure that the files matching sparse_patterns are checked out
+    in the repo at repo_dir, widening its sparse checkout if need be,
+    and return True if it had to be widened. A repo that isn't sparse
+    yet is made sparse.
+    """
+    try:
+        current_patterns: Optional[list[str]] = _git(
+            "sparse-checkout", "list", cwd=repo_dir
+        ).splitlines()
+    except subprocess.CalledProcessError:
+        # Not a sparse checkout.
+        current_patterns = None
+    if current_patterns is None:
+        _git("sparse-checkout", "set", "--no-cone", *sparse_patterns, cwd=repo_dir)
+        return True
+    missing_patterns = [
+        pattern for pattern in sparse_patterns if pattern not in current_patterns
+    ]
+    if not missing_patterns:
+        return False
+    logger.debug("Adding %s to sparse checkout of %s", missing_patterns, repo_dir)
+    _git("sparse-checkout", "add", *missing_patterns, cwd=repo_dir)
+    return True
+
+
+@icontract.require(lambda url, repo_dir: url and repo_dir)
+def refresh_repo(
+    url: str, repo_dir: str, sparse_patterns: Optional[list[str]] = None
+) -> str:
+    """
+    Bring the shallow clone of the repo at url in repo_dir up to date
+    with the remote HEAD, cloning it if there is no usable clone yet.
+    Return UNCHANGED if it already was, UPDATED if it was fetched,
+    CLONED if it was cloned, or STALE if the remote could not be
+    reached and the existing clone was kept as is.
+
+    Given sparse_patterns, a new clone is a partial clone with only
+    the files matching sparse_patterns checked out and an existing
+    clone is widened to them if need be, see
+    include_in_sparse_checkout.
+
+    Unless it raises, the modification time of repo_dir is updated so
+    that file_utils.asset_needs_revalidation considers it fresh for
+    another settings.ASSET_REVALIDATION_PERIOD, even if STALE so that
+    an unreachable remote isn't asked again on every request.
+
+    Callers must not refresh the same repo_dir concurrently,
+    ResourceProvisioner makes sure of that with file_utils.file_lock.
+    """
+    commit = local_head(repo_dir)
+    if commit is None:
+        logger.info("Cloning %s into %s", url, repo_dir)
+        clone(url, repo_dir, sparse_patterns)
+        outcome = CLONED
+    else:
+        try:
+            latest_commit = remote_head(url)
+        except subprocess.SubprocessError:
+            logger.exception("Could not reach %s, keeping %s as is.", url, repo_dir)
+            os.utime(repo_dir)
+            return STALE
+        try:
+            if latest_commit == commit:
+                outcome = UNCHANGED
+            else:
+                logger.info("Fetching %s into %s", url, repo_dir)
+                _fetch_and_reset(url, repo_dir, latest_commit)
+                outcome = UPDATED
+            if sparse_patterns:
+                include_in_sparse_checkout(repo_dir, sparse_patterns)
+        except subprocess.SubprocessError:
+            logger.exception("Refreshing %s failed, cloning it again.", repo_dir)
+            clone(url, repo_dir, sparse_patterns)
+            outcome = CLONED
+    os.utime(repo_dir)
+    logger.debug("%s is %s", repo_dir, outcome)
+    return outcome
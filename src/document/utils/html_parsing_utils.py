@@ -1,9 +1,11 @@
 """
 This module provides utilities for use with the BeautifulSoup HTML
-scraping library.
+scraping library and for splitting USFM-Tools' HTML into chapters and
+verses in a single pass, without it.
 """
 
-from typing import Any
+import html.parser
+from typing import Any, Callable, Iterator, NamedTuple, Optional, Union
 
 import bs4
 
@@ -45,3 +47,617 @@ def tag_elements_between(cur: Any, end: Any) -> Any:
     while cur and cur != end:
         yield cur
         cur = cur.next_element
+
+
+# What follows builds the tree BeautifulSoup's html.parser tree builder
+# builds and serializes it as BeautifulSoup does so that
+# USFMHtmlSplitter splits chapters and verses exactly as
+# USFMHtmlInitializer did with BeautifulSoup.
+
+# Tags that are closed as soon as they are opened.
+VOID_TAGS = frozenset(
+    [
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "keygen",
+        "link",
+        "menuitem",
+        "meta",
+        "param",
+        "source",
+        "track",
+        "wbr",
+        "basefont",
+        "bgsound",
+        "command",
+        "frame",
+        "image",
+        "isindex",
+        "nextid",
+        "spacer",
+    ]
+)
+# Tags in which strings of whitespace are kept as they are.
+PRESERVE_WHITESPACE_TAGS = frozenset(["pre", "textarea"])
+# Tags whose strings are serialized without escaping.
+CDATA_CONTAINING_TAGS = frozenset(["script", "style"])
+# Attributes whose values are lists separated by whitespace, by tag
+# name, "*" for every tag.
+LIST_ATTRIBUTES = {
+    "*": frozenset(["class", "accesskey", "dropzone"]),
+    "a": frozenset(["rel", "rev"]),
+    "link": frozenset(["rel", "rev"]),
+    "td": frozenset(["headers"]),
+    "th": frozenset(["headers"]),
+    "form": frozenset(["accept-charset"]),
+    "object": frozenset(["archive"]),
+    "area": frozenset(["rel"]),
+    "icon": frozenset(["sizes"]),
+    "iframe": frozenset(["sandbox"]),
+    "output": frozenset(["for"]),
+}
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+CDATA_PREFIX = "<![CDATA["
+# How the HTML of a verse starts: USFM-Tools' verse number span.
+VERSE_SPAN_START = '<span class="v-num"'
+
+
+def _collapsed(text: str) -> str:
+    """Return text, or a single newline or space if it is all whitespace."""
+    if text.strip(ASCII_SPACES):
+        return text
+    return "\n" if "\n" in text else " "
+
+
+def _escaped(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _quoted(value: str) -> str:
+    """Return the attribute value value escaped and quoted."""
+    value = _escaped(value)
+    if '"' not in value:
+        return '"{}"'.format(value)
+    if "'" not in value:
+        return "'{}'".format(value)
+    return '"{}"'.format(value.replace('"', "&quot;"))
+
+
+class _String:
+    """
+    A string in the tree: text or, if it has a prefix, a comment,
+    doctype, CDATA section, declaration or processing instruction.
+    """
+
+    __slots__ = ("text", "parent", "index", "prefix", "suffix", "follows_text")
+
+    def __init__(
+        self,
+        text: str,
+        parent: "_Tag",
+        index: int,
+        prefix: str,
+        suffix: str,
+        follows_text: bool,
+    ) -> None:
+        self.text = text
+        self.parent = parent
+        # Position in document order.
+        self.index = index
+        self.prefix = prefix
+        self.suffix = suffix
+        # Whether it is text right after text, e.g., where an end tag
+        # without a start tag was. Parsed again the two are one.
+        self.follows_text = follows_text
+
+
+class _Tag:
+    """An element in the tree."""
+
+    __slots__ = ("name", "attrs", "children", "parent", "index", "end", "_html")
+
+    def __init__(
+        self,
+        name: str,
+        attrs: dict[str, Union[str, list[str]]],
+        parent: Optional["_Tag"],
+        index: int,
+    ) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.children: list[Union[_Tag, _String]] = []
+        self.parent = parent
+        # Position in document order and that of the first node after
+        # its descendants.
+        self.index = index
+        self.end = index + 1
+        # HTML as is and with neighbouring text as one, by the latter.
+        self._html: dict[bool, str] = {}
+
+    def has_class(self, class_: str) -> bool:
+        value = self.attrs.get("class", [])
+        return class_ in value if isinstance(value, list) else class_ == value
+
+    def string(self) -> Optional[str]:
+        """Return the tag's only string, as BeautifulSoup's Tag.string does."""
+        if len(self.children) != 1:
+            return None
+        child = self.children[0]
+        return child.text if isinstance(child, _String) else child.string()
+
+    def get_text(self) -> str:
+        """Return the tag's text, as BeautifulSoup's Tag.get_text does."""
+        return "".join(
+            (
+                child.get_text()
+                if isinstance(child, _Tag)
+                else child.text if child.prefix in ("", CDATA_PREFIX) else ""
+            )
+            for child in self.children
+        )
+
+    def preserves_whitespace(self) -> bool:
+        tag: Optional[_Tag] = self
+        while tag is not None:
+            if tag.name in PRESERVE_WHITESPACE_TAGS:
+                return True
+            tag = tag.parent
+        return False
+
+    def html(self, merged: bool = False) -> str:
+        """
+        Return the tag's HTML or, if merged, the HTML of the tag
+        BeautifulSoup parses that HTML into, i.e., with neighbouring
+        text as one.
+        """
+        html_ = self._html.get(merged)
+        if html_ is not None:
+            return html_
+        parts = [
+            "<",
+            self.name,
+            *(
+                " {}={}".format(
+                    key, _quoted(" ".join(value) if isinstance(value, list) else value)
+                )
+                for key, value in sorted(self.attrs.items(), key=lambda item: item[0])
+            ),
+        ]
+        if self.name in VOID_TAGS and not self.children:
+            parts.append("/>")
+        else:
+            parts.append(">")
+            index = 0
+            while index < len(self.children):
+                child = self.children[index]
+                index += 1
+                if isinstance(child, _Tag):
+                    parts.append(child.html(merged))
+                elif child.prefix:
+                    parts.append(child.prefix + child.text + child.suffix)
+                else:
+                    texts = [child.text]
+                    while merged and index < len(self.children):
+                        next_child = self.children[index]
+                        if not isinstance(next_child, _String) or next_child.prefix:
+                            break
+                        texts.append(next_child.text)
+                        index += 1
+                    text = "".join(texts)
+                    if len(texts) > 1 and not self.preserves_whitespace():
+                        text = _collapsed(text)
+                    parts.append(
+                        text if self.name in CDATA_CONTAINING_TAGS else _escaped(text)
+                    )
+            parts.append("</{}>".format(self.name))
+        html_ = "".join(parts)
+        self._html[merged] = html_
+        return html_
+
+
+class USFMHtmlChapter(NamedTuple):
+    """A chapter of USFM-Tools' HTML split into its HTML and verses."""
+
+    chapter_num: int
+    # The HTML of each element and string from the chapter's heading up
+    # to the next chapter's heading, in document order. An element's
+    # descendants follow it.
+    chapter_content: list[str]
+    # The HTML of each verse by verse number or range, e.g., 4-5.
+    chapter_verses: dict[str, str]
+    chapter_footnotes: str
+
+
+# A node of the tree as parsed again from chapter_content: the position
+# of the element of chapter_content it belongs to and its own.
+_Key = tuple[int, int]
+
+
+class USFMHtmlSplitter(html.parser.HTMLParser):
+    """
+    Split USFM-Tools' HTML into chapters and verses in one pass over
+    it, see chapters. The HTML can be fed as it is written.
+
+    The chapters and verses are those USFMHtmlInitializer found with
+    BeautifulSoup, repeatedly looking up chapter headings and verse
+    spans and parsing each chapter's HTML again, i.e., every
+    chapter_content element. Rather than do that, the verses are found
+    from where that parse would put them: each element of
+    chapter_content parses as a copy of the element's subtree, and
+    neighbouring strings as one string.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self._root = _Tag("[document]", {}, None, -1)
+        self._nodes: list[Union[_Tag, _String]] = []
+        self._open_tags = [self._root]
+        self._preserving_whitespace = 0
+        self._data: list[str] = []
+        # Void tags closed when opened whose end tag may follow.
+        self._closed_void_tags: list[str] = []
+
+    def _end_data(self, prefix: str = "", suffix: str = "") -> None:
+        if not self._data:
+            return
+        text = "".join(self._data)
+        self._data = []
+        if not self._preserving_whitespace:
+            text = _collapsed(text)
+        parent = self._open_tags[-1]
+        follows_text = (
+            not prefix
+            and bool(parent.children)
+            and isinstance(parent.children[-1], _String)
+            and not parent.children[-1].prefix
+        )
+        string = _String(text, parent, len(self._nodes), prefix, suffix, follows_text)
+        parent.children.append(string)
+        self._nodes.append(string)
+
+    def _start(self, name: str, attrs: list[tuple[str, Optional[str]]]) -> _Tag:
+        self._end_data()
+        list_attributes = LIST_ATTRIBUTES["*"] | LIST_ATTRIBUTES.get(name, frozenset())
+        values: dict[str, Union[str, list[str]]] = {}
+        for key, value in attrs:
+            values[key] = "" if value is None else value
+        for key, value in values.items():
+            if key in list_attributes and isinstance(value, str):
+                values[key] = value.split()
+        parent = self._open_tags[-1]
+        tag = _Tag(name, values, parent, len(self._nodes))
+        parent.children.append(tag)
+        self._nodes.append(tag)
+        self._open_tags.append(tag)
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self._preserving_whitespace += 1
+        return tag
+
+    def _end(self, name: str) -> None:
+        self._end_data()
+        if not any(tag.name == name for tag in self._open_tags[1:]):
+            # An end tag without a start tag is ignored.
+            return
+        while True:
+            tag = self._open_tags.pop()
+            tag.end = len(self._nodes)
+            if tag.name in PRESERVE_WHITESPACE_TAGS:
+                self._preserving_whitespace -= 1
+            if tag.name == name:
+                return
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        self._start(tag, attrs)
+        if tag in VOID_TAGS:
+            self._end(tag)
+            self._closed_void_tags.append(tag)
+
+    def handle_startendtag(
+        self, tag: str, attrs: list[tuple[str, Optional[str]]]
+    ) -> None:
+        self._start(tag, attrs)
+        self._end(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._closed_void_tags:
+            self._closed_void_tags.remove(tag)
+        else:
+            self._end(tag)
+
+    def handle_data(self, data: str) -> None:
+        self._data.append(data)
+
+    def _handle_string(self, data: str, prefix: str, suffix: str) -> None:
+        self._end_data()
+        self._data.append(data)
+        self._end_data(prefix, suffix)
+
+    def handle_comment(self, data: str) -> None:
+        self._handle_string(data, "<!--", "-->")
+
+    def handle_decl(self, decl: str) -> None:
+        self._handle_string(decl[len("DOCTYPE ") :], "<!DOCTYPE ", ">\n")
+
+    def unknown_decl(self, data: str) -> None:
+        if data.upper().startswith("CDATA["):
+            self._handle_string(data[len("CDATA[") :], CDATA_PREFIX, "]]>")
+        else:
+            self._handle_string(data, "<?", "?>")
+
+    def handle_pi(self, data: str) -> None:
+        self._handle_string(data, "<?", ">")
+
+    def close(self) -> None:
+        """Finish parsing the HTML fed so far, closing any open tags."""
+        super().close()
+        self._end_data()
+        while len(self._open_tags) > 1:
+            self._open_tags.pop().end = len(self._nodes)
+        self._preserving_whitespace = 0
+
+    def chapters(self, book_number: str) -> list[USFMHtmlChapter]:
+        """
+        Return the chapters of the HTML fed, once closed, in order.
+        Verse spans' ids are expected to contain book_number, e.g.,
+        019-ch-001-v-001 for Psalms.
+        """
+        headings = [
+            node for node in self._nodes if isinstance(node, _Tag) and node.name == "h2"
+        ]
+        chapter_breaks = [heading for heading in headings if heading.has_class("c-num")]
+        localized_chapter_heading = chapter_breaks[0].get_text().split()[0]
+        # The first heading with each text.
+        headings_by_text: dict[str, _Tag] = {}
+        for heading in headings:
+            text = heading.string()
+            if text is not None:
+                headings_by_text.setdefault(text, heading)
+        chapters = []
+        for chapter_break in chapter_breaks:
+            chapter_num = int(chapter_break.get_text().split()[1])
+            chapters.append(
+                self._chapter(
+                    chapter_num,
+                    headings_by_text.get(
+                        "{} {}".format(localized_chapter_heading, chapter_num)
+                    ),
+                    headings_by_text.get(
+                        "{} {}".format(localized_chapter_heading, chapter_num + 1)
+                    ),
+                    book_number,
+                )
+            )
+        return chapters
+
+    def _chapter(
+        self,
+        chapter_num: int,
+        heading: Optional[_Tag],
+        next_heading: Optional[_Tag],
+        book_number: str,
+    ) -> USFMHtmlChapter:
+        if heading is None:
+            return USFMHtmlChapter(chapter_num, [], {}, "")
+        start = heading.index
+        # The chapter runs up to the first tag equal to next_heading, as
+        # BeautifulSoup compares them, rather than to next_heading
+        # itself.
+        end = len(self._nodes)
+        if next_heading is not None:
+            next_heading_html = next_heading.html()
+            for node in self._nodes[start:]:
+                if (
+                    isinstance(node, _Tag)
+                    and node.name == next_heading.name
+                    and node.html() == next_heading_html
+                ):
+                    end = node.index
+                    break
+        chapter_content = [
+            node.html() if isinstance(node, _Tag) else node.text
+            for node in self._nodes[start:end]
+        ]
+        # The verse spans and footnotes of the tree chapter_content
+        # parses into, in document order, each with its HTML.
+        found: list[tuple[_Key, _Tag, str]] = []
+        parsed_again: Callable[[_Key], Iterator[tuple[bool, str]]]
+        if any(
+            isinstance(node, _String)
+            and not node.prefix
+            and ("<" in node.text or "&" in node.text)
+            for node in self._nodes[start:end]
+        ):
+            # Text that reads as markup or a character reference once
+            # parsed again, e.g., from &lt;, makes for a different tree.
+            splitter = USFMHtmlSplitter()
+            splitter.feed("".join(chapter_content))
+            splitter.close()
+            for node in splitter._nodes:
+                if isinstance(node, _Tag) and _is_verse_span_or_footnotes(node):
+                    found.append(((0, node.index), node, node.html()))
+            parsed_again = lambda key: splitter._html_from(key[1])
+        else:
+            # Where each node is found in the tree chapter_content
+            # parses into: in the copy of its outermost ancestor in
+            # chapter_content, which may end past the chapter.
+            copies_end = max(
+                [end]
+                + [
+                    node.end
+                    for node in self._nodes[start:end]
+                    if isinstance(node, _Tag)
+                ]
+            )
+            for node in self._nodes[start:copies_end]:
+                if isinstance(node, _Tag) and _is_verse_span_or_footnotes(node):
+                    copied: Optional[_Tag] = None
+                    ancestor: Optional[_Tag] = node
+                    while ancestor is not None and ancestor.index >= start:
+                        if ancestor.index < end:
+                            copied = ancestor
+                        ancestor = ancestor.parent
+                    if copied is not None:
+                        found.append(
+                            (
+                                (copied.index, node.index),
+                                node,
+                                node.html(merged=True),
+                            )
+                        )
+            found.sort(key=lambda item: item[0])
+            parsed_again = lambda key: self._parsed_again(key, start, end)
+        chapter_footnotes = ""
+        verse_span_htmls = []
+        # The first verse span with each id and its HTML.
+        verse_spans: dict[str, tuple[_Key, str]] = {}
+        for key, node, html_ in found:
+            if node.name == "div":
+                chapter_footnotes = chapter_footnotes or html_
+                continue
+            verse_span_htmls.append(html_)
+            id_ = node.attrs.get("id")
+            if isinstance(id_, str):
+                verse_spans.setdefault(id_, (key, html_))
+        chapter_verses: dict[str, str] = {}
+        for verse_span_html in verse_span_htmls:
+            verse_num, verse_html = _verse(
+                chapter_num, verse_span_html, verse_spans, parsed_again, book_number
+            )
+            chapter_verses[verse_num] = verse_html
+        return USFMHtmlChapter(
+            chapter_num, chapter_content, chapter_verses, chapter_footnotes
+        )
+
+    def _html_from(self, index: int) -> Iterator[tuple[bool, str]]:
+        """
+        Yield whether each node from that at index on is a tag and its
+        HTML.
+        """
+        for node in self._nodes[index:]:
+            if isinstance(node, _Tag):
+                yield True, node.html()
+            else:
+                yield False, node.text
+
+    def _parsed_again(
+        self, key: _Key, start: int, end: int
+    ) -> Iterator[tuple[bool, str]]:
+        """
+        Yield whether each node, from that at key on, of the tree
+        chapter_content, i.e., the nodes from start to end, parses into
+        is a tag and its HTML.
+        """
+        copied = self._nodes[key[0]]
+        assert isinstance(copied, _Tag)
+        yield from self._copy(copied, key[1])
+        index = copied.index + 1
+        while index < end:
+            node = self._nodes[index]
+            if isinstance(node, _Tag):
+                yield from self._copy(node, index)
+                index += 1
+                continue
+            texts = [node.text]
+            index += 1
+            while index < end:
+                next_node = self._nodes[index]
+                if not isinstance(next_node, _String):
+                    break
+                texts.append(next_node.text)
+                index += 1
+            yield False, _collapsed("".join(texts))
+
+    def _copy(self, copied: _Tag, index: int) -> Iterator[tuple[bool, str]]:
+        """
+        Yield whether each node of copied's copy from index on is a tag
+        and its HTML.
+        """
+        while index < copied.end:
+            node = self._nodes[index]
+            index += 1
+            if isinstance(node, _Tag):
+                yield True, node.html(merged=True)
+            elif not node.follows_text:
+                texts = [node.text]
+                while index < copied.end:
+                    next_node = self._nodes[index]
+                    if not isinstance(next_node, _String) or not next_node.follows_text:
+                        break
+                    texts.append(next_node.text)
+                    index += 1
+                text = "".join(texts)
+                if len(texts) > 1 and not node.parent.preserves_whitespace():
+                    text = _collapsed(text)
+                yield False, text
+
+
+def _is_verse_span_or_footnotes(tag: _Tag) -> bool:
+    return (tag.name == "span" and tag.has_class("v-num")) or (
+        tag.name == "div" and tag.has_class("footnotes")
+    )
+
+
+def _verse(
+    chapter_num: int,
+    verse_span_html: str,
+    verse_spans: dict[str, tuple[_Key, str]],
+    parsed_again: Callable[[_Key], Iterator[tuple[bool, str]]],
+    book_number: str,
+) -> tuple[str, str]:
+    """
+    Return the verse number, or range, of the verse span whose HTML is
+    verse_span_html and the HTML of its verse: from the verse span up
+    to the first tag equal to the next verse's span, as BeautifulSoup
+    compares them.
+    """
+    # Rather than a single verse num, it may be a verse range, e.g.,
+    # 4-5.
+    verse_num = verse_span_html.split("-v-")[1].split('"')[0]
+    verse_num_components = verse_num.split("-")
+    if len(verse_num_components) > 1:
+        upper_bound_value = int(verse_num_components[1]) + 1
+        # Get rid of leading zeroes.
+        verse_num = "{}-{}".format(
+            int(verse_num_components[0]), int(verse_num_components[1])
+        )
+    else:
+        upper_bound_value = int(verse_num) + 1
+        verse_num = str(int(verse_num))
+    lower_id = "{}-ch-{}-v-{}".format(
+        book_number.zfill(3), str(chapter_num).zfill(3), verse_num.zfill(3)
+    )
+    upper_id = "{}-ch-{}-v-{}".format(
+        book_number.zfill(3),
+        str(chapter_num).zfill(3),
+        str(upper_bound_value).zfill(3),
+    )
+    lower = verse_spans.get(lower_id)
+    upper = verse_spans.get(upper_id)
+    verse_html = ""
+    verse_span_starts = 0
+    if lower is not None:
+        for position, (is_tag, html_) in enumerate(parsed_again(lower[0])):
+            if (is_tag and upper and html_ == upper[1]) or verse_span_starts > 1:
+                break
+            # The verse number inside the span is skipped.
+            if 1 <= position <= 3:
+                continue
+            searched = max(len(verse_html) - len(VERSE_SPAN_START) + 1, 0)
+            verse_html += html_
+            verse_span_starts += verse_html.count(VERSE_SPAN_START, searched)
+    # The verse runs up to the next verse span's start, if any.
+    return verse_num, VERSE_SPAN_START + verse_html.split(VERSE_SPAN_START)[1]
+
+
+def split_usfm_html(html_: str, book_number: str) -> list[USFMHtmlChapter]:
+    """Split USFM-Tools' HTML html_ into chapters, see USFMHtmlSplitter."""
+    splitter = USFMHtmlSplitter()
+    splitter.feed(html_)
+    splitter.close()
+    return splitter.chapters(book_number)
@@ -3,15 +3,25 @@ Useful functions that are not class or instance specific for TW
 resources that we use in multiple places.
 """
 
+import html
 import os
-import pathlib
-from glob import glob
-from typing import Optional
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, NamedTuple, Optional
 
 import icontract
 
 from document.config import settings
 from document.domain import model
+from document.utils import (
+    aho_corasick,
+    asset_fs,
+    asset_index,
+    file_utils,
+    git_utils,
+)
 
 logger = settings.logger(__name__)
 
@@ -25,9 +35,12 @@ def translation_word_filepaths(resource_dir: str) -> list[str]:
     Get the file paths to the translation word files for the
     TWResource instance.
     """
-    filepaths = glob("{}/bible/kt/*.md".format(resource_dir))
-    filepaths.extend(glob("{}/bible/names/*.md".format(resource_dir)))
-    filepaths.extend(glob("{}/bible/other/*.md".format(resource_dir)))
+    index = asset_index.loaded(resource_dir)
+    if index is not None:
+        return index.translation_word_files()
+    filepaths = asset_fs.glob("{}/bible/kt/*.md".format(resource_dir))
+    filepaths.extend(asset_fs.glob("{}/bible/names/*.md".format(resource_dir)))
+    filepaths.extend(asset_fs.glob("{}/bible/other/*.md".format(resource_dir)))
     return filepaths
 
 
@@ -57,6 +70,11 @@ def localized_translation_word(
     return model.LocalizedWord(localized_translation_word)
 
 
+# The TW resource asset directories found so far, see tw_resource_dir,
+# keyed by working_dir and lang_code.
+_tw_resource_dirs: dict[tuple[str, str], str] = {}
+
+
 @icontract.require(lambda lang_code: lang_code)
 def tw_resource_dir(lang_code: str) -> Optional[str]:
     """
@@ -73,38 +91,280 @@ def tw_resource_dir(lang_code: str) -> Optional[str]:
     # other Resource subclass instances. They'd be coupled if we had
     # to pass the value of TWResource's resource_dir to Resource
     # subclasses otherwise. It is a design tradeoff.
-    tw_resource_dir_candidates = glob(
-        "{}/{}_{}*/{}_{}*".format(settings.working_dir(), lang_code, TW, lang_code, TW)
-    )
+    # Every TN, TQ and TA resource asks, only look again if the
+    # directory found before is gone, e.g., evicted.
+    key = (settings.working_dir(), lang_code)
+    resource_dir = _tw_resource_dirs.get(key)
+    if resource_dir is not None and asset_fs.isdir(resource_dir):
+        return resource_dir
+    # The zip asset, and its metadata, also match the pattern.
+    tw_resource_dir_candidates = [
+        candidate
+        for candidate in asset_fs.glob(
+            "{}/{}_{}*/{}_{}*".format(
+                settings.working_dir(), lang_code, TW, lang_code, TW
+            )
+        )
+        if asset_fs.isdir(candidate)
+    ]
     # If tw_resource_dir_candidates is empty it is because the user
     # did not request a TW resource as part of their document request
     # which is a valid state of affairs of course. We return the empty
     # string in such cases.
-    return tw_resource_dir_candidates[0] if tw_resource_dir_candidates else None
-
-
-# Some document requests don't include a resource request for
-# translation words. In such cases there wouldn't be a tw_resource_dir
-# associated with the request (though there could be the actual TW
-# resource asset files on disk from a previous document request - we
-# wouldn't make the assumption that such files were there however)
-# therefore we can't require tw_resource_dir as a precondition.
-# @icontract.require(lambda tw_resource_dir: tw_resource_dir)
-# @icontract.ensure(lambda result: result)
-def translation_words_dict(tw_resource_dir: Optional[str]) -> dict[str, str]:
-    """
-    Given the path to the TW resource asset files, return a dictionary
-    of translation word to translation word filepath mappings,
-    otherwise return an empty dictionary.
-    """
-    translation_words_dict: dict[str, str] = {}
-    if tw_resource_dir is not None:
-        filepaths = translation_word_filepaths(tw_resource_dir)
-        translation_words_dict = {
-            pathlib.Path(os.path.basename(word_filepath)).stem: word_filepath
-            for word_filepath in filepaths
-        }
-    return translation_words_dict
+    if not tw_resource_dir_candidates:
+        return None
+    _tw_resource_dirs[key] = tw_resource_dir_candidates[0]
+    return tw_resource_dir_candidates[0]
+
+
+@icontract.require(lambda lang_code: lang_code)
+def tw_asset_version(lang_code: str) -> Optional[str]:
+    """
+    Return the version, see asset_version, of the TW resource asset
+    that tw_resource_dir finds for lang_code. Return None if there is
+    no TW resource asset or its version is unknown.
+    """
+    resource_dir = tw_resource_dir(lang_code)
+    if resource_dir is None:
+        return None
+    return asset_version(resource_dir)
+
+
+@icontract.require(lambda resource_dir: resource_dir)
+def asset_version(resource_dir: str) -> Optional[str]:
+    """
+    Return the version of the TW resource asset at resource_dir: the
+    commit checked out if it is a git repo, otherwise the sha256
+    checksum recorded when the zip asset it comes from was downloaded.
+    Return None if it is unknown.
+    """
+    version = git_utils.local_head(resource_dir)
+    if version is None:
+        # The provisioner loads the index of the zip asset that it
+        # extracts, or mounts, at resource_dir, see asset_index.load,
+        # which names the zip asset.
+        path = asset_index.asset_path(resource_dir)
+        if path is not None:
+            version = file_utils.read_sidecar_metadata(path).get(file_utils.SHA256_KEY)
+    return version
+
+
+class TranslationWord(NamedTuple):
+    """A translation word of a TW resource asset."""
+
+    localized_word: model.LocalizedWord
+    # The word's Markdown file and its content.
+    filepath: str
+    content: model.MarkdownContent
+
+
+class TranslationWordStore:
+    """
+    The translation words of a TW resource asset, read once, and their
+    content converted to HTML, converted once per link context, i.e.,
+    per set of resource requests that the links in the content are
+    converted for, see LinkTransformerPreprocessor.
+    """
+
+    @icontract.require(lambda resource_dir, max_link_contexts: max_link_contexts > 0)
+    def __init__(
+        self, resource_dir: str, version: Optional[str], max_link_contexts: int
+    ) -> None:
+        self._resource_dir = resource_dir
+        self._version = version
+        self._max_link_contexts = max_link_contexts
+        # Reentrant as converting content to HTML looks up words.
+        self._lock = threading.RLock()
+        self._words: Optional[dict[str, TranslationWord]] = None
+        self._name_content_pairs: OrderedDict[
+            tuple[str, ...], list[model.TWNameContentPair]
+        ] = OrderedDict()
+
+    @property
+    def resource_dir(self) -> str:
+        """Provide public interface for other modules."""
+        return self._resource_dir
+
+    @property
+    def version(self) -> Optional[str]:
+        """Provide public interface for other modules."""
+        return self._version
+
+    def words(self) -> dict[str, TranslationWord]:
+        """
+        Return the translation words keyed by their file name sans
+        suffix, e.g., abomination.
+        """
+        with self._lock:
+            if self._words is None:
+                logger.info("Reading translation words in %s", self._resource_dir)
+                words: dict[str, TranslationWord] = {}
+                for filepath in translation_word_filepaths(self._resource_dir):
+                    content = model.MarkdownContent(asset_fs.read_file(filepath))
+                    words[os.path.splitext(os.path.basename(filepath))[0]] = (
+                        TranslationWord(
+                            localized_translation_word(content), filepath, content
+                        )
+                    )
+                self._words = words
+            return self._words
+
+    def name_content_pairs(
+        self,
+        link_context: tuple[str, ...],
+        convert: Callable[[model.MarkdownContent], model.HtmlContent],
+    ) -> list[model.TWNameContentPair]:
+        """
+        Return the translation words and their content converted to
+        HTML with convert, sorted by localized word. Content is only
+        converted the first time for link_context. The pairs returned
+        are the caller's to modify.
+        """
+        with self._lock:
+            name_content_pairs = self._name_content_pairs.get(link_context)
+            if name_content_pairs is None:
+                name_content_pairs = sorted(
+                    (
+                        model.TWNameContentPair(
+                            localized_word=word.localized_word,
+                            content=convert(word.content),
+                        )
+                        for word in self.words().values()
+                    ),
+                    key=lambda name_content_pair: name_content_pair.localized_word,
+                )
+                self._name_content_pairs[link_context] = name_content_pairs
+                while len(self._name_content_pairs) > self._max_link_contexts:
+                    self._name_content_pairs.popitem(last=False)
+            self._name_content_pairs.move_to_end(link_context)
+            return [
+                name_content_pair.copy() for name_content_pair in name_content_pairs
+            ]
+
+
+class TranslationWordStores:
+    """
+    A bounded, least recently used, thread safe cache of the
+    TranslationWordStore of each TW resource asset, shared by all the
+    resources that use the asset. A store is replaced as soon as the
+    version of its asset changes.
+    """
+
+    @icontract.require(
+        lambda maxsize, max_link_contexts: maxsize > 0 and max_link_contexts > 0
+    )
+    def __init__(self, maxsize: int, max_link_contexts: int) -> None:
+        self._maxsize = maxsize
+        self._max_link_contexts = max_link_contexts
+        self._lock = threading.Lock()
+        self._stores: OrderedDict[str, TranslationWordStore] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @icontract.require(lambda resource_dir: resource_dir)
+    def get(self, resource_dir: str) -> TranslationWordStore:
+        """
+        Return the store of the TW resource asset at resource_dir. If
+        the asset's version is unknown the store isn't shared.
+        """
+        version = asset_version(resource_dir)
+        if version is None:
+            return TranslationWordStore(resource_dir, version, self._max_link_contexts)
+        with self._lock:
+            store = self._stores.get(resource_dir)
+            if store is not None and store.version == version:
+                self._stores.move_to_end(resource_dir)
+                self._hits += 1
+                return store
+            if store is not None:
+                self._invalidations += 1
+            self._misses += 1
+            store = TranslationWordStore(resource_dir, version, self._max_link_contexts)
+            self._stores[resource_dir] = store
+            while len(self._stores) > self._maxsize:
+                self._stores.popitem(last=False)
+            return store
+
+    def clear(self) -> None:
+        """Empty the cache and reset its counters."""
+        with self._lock:
+            self._stores.clear()
+            self._hits = self._misses = self._invalidations = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters suitable for exposing to monitoring."""
+        with self._lock:
+            return {
+                "size": len(self._stores),
+                "maxsize": self._maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+            }
+
+
+# The translation words shared by the requests a worker handles.
+translation_word_stores = TranslationWordStores(
+    settings.TRANSLATION_WORD_STORE_SIZE,
+    settings.TRANSLATION_WORD_STORE_LINK_CONTEXTS,
+)
+
+
+# An HTML tag, attributes included.
+HTML_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def _is_word_boundary(text: str, index: int) -> bool:
+    """
+    Return True if there is a word boundary, as \\b in a regex
+    matches, at index in text.
+    """
+    # re's word characters in str patterns.
+    before = index > 0 and (text[index - 1].isalnum() or text[index - 1] == "_")
+    after = index < len(text) and (text[index].isalnum() or text[index] == "_")
+    return before != after
+
+
+class TranslationWordMatcher:
+    """
+    Find which translation words occur as whole words, i.e., as
+    r"\\b{}\\b".format(re.escape(word)) matches, in the text of a
+    verse's HTML content. All the words are looked for in one pass over
+    the text.
+    """
+
+    def __init__(self, localized_words: tuple[model.LocalizedWord, ...]) -> None:
+        self._automaton = aho_corasick.Automaton(dict.fromkeys(localized_words))
+
+    def matches(self, verse: model.HtmlContent) -> set[model.LocalizedWord]:
+        """Return the translation words that occur in verse."""
+        # Tags are replaced by a space rather than removed so that
+        # word boundaries are where they are in the HTML content, e.g.,
+        # between a verse number and the first word of the verse.
+        text = html.unescape(HTML_TAG_RE.sub(" ", verse))
+        patterns = self._automaton.patterns
+        matched: set[model.LocalizedWord] = set()
+        for start, pattern_index in self._automaton.finditer(text):
+            localized_word = model.LocalizedWord(patterns[pattern_index])
+            if (
+                localized_word not in matched
+                and _is_word_boundary(text, start)
+                and _is_word_boundary(text, start + len(localized_word))
+            ):
+                matched.add(localized_word)
+        return matched
+
+
+@lru_cache(maxsize=settings.TRANSLATION_WORD_STORE_SIZE)
+def translation_word_matcher(
+    localized_words: tuple[model.LocalizedWord, ...],
+) -> TranslationWordMatcher:
+    """
+    Return the matcher of localized_words, built once for all the
+    resources of a language.
+    """
+    return TranslationWordMatcher(localized_words)
 
 
 # NOTE There is nothing about this function that is specific to
@@ -1,11 +1,23 @@
-import shutil
-from contextlib import closing
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import closing, suppress
+from typing import Any, Callable, Iterable, NamedTuple, Optional, TypeVar
 from urllib.request import urlopen
 
+import icontract
+import requests
+import requests.adapters
+
 from document.config import settings
+from document.utils import file_utils
 
 logger = settings.logger(__name__)
 
+T = TypeVar("T")
+
 
 # FIXME Improve this legacy code
 def url(url: str, catch_exception: bool = False) -> str:
@@ -29,12 +41,363 @@ def url(url: str, catch_exception: bool = False) -> str:
     return response
 
 
+class ConditionalDownloadResult(NamedTuple):
+    """
+    The outcome of conditional_download_file: whether the remote file
+    was modified (and so downloaded) and the validators to send next
+    time.
+    """
+
+    modified: bool
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+# Responses worth retrying as the problem is likely temporary.
+RETRYABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """
+    Return the process wide HTTP session. Sharing it lets downloads
+    reuse keep-alive connections from its connection pool rather than
+    open a new connection per file.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=settings.HTTP_POOL_MAXSIZE,
+                pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _timeout() -> tuple[float, float]:
+    return settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT
+
+
+class IncompleteDownloadError(requests.exceptions.ConnectionError):
+    """The connection closed before the whole response body arrived."""
+
+
+def _write_atomically(
+    chunks: Iterable[bytes], outfile: str, expected_size: Optional[int] = None
+) -> int:
+    """
+    Write chunks into a temporary file next to outfile and then
+    rename it over outfile so that readers never see a partially
+    written file. Return the number of bytes written. Raise
+    IncompleteDownloadError, and leave outfile untouched, if
+    expected_size is given and fewer or more bytes were written.
+    """
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(outfile)),
+        prefix=".{}.".format(os.path.basename(outfile)),
+        suffix=".part",
+    )
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            for chunk in chunks:
+                fp.write(chunk)
+                size += len(chunk)
+        if expected_size is not None and size != expected_size:
+            raise IncompleteDownloadError(
+                "Received {} of {} bytes for {}".format(size, expected_size, outfile)
+            )
+        os.replace(temp_path, outfile)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return size
+
+
+def _stream_to_file(response: requests.Response, outfile: str) -> None:
+    """
+    Stream the body of response into outfile atomically. Raise
+    IncompleteDownloadError, and leave outfile untouched, if the
+    connection closed before the whole body arrived.
+    """
+    content_length = response.headers.get("Content-Length")
+    # With a Content-Encoding the decoded size differs from
+    # Content-Length.
+    expected_size = (
+        int(content_length)
+        if content_length is not None and "Content-Encoding" not in response.headers
+        else None
+    )
+    _write_atomically(
+        response.iter_content(chunk_size=settings.HTTP_CHUNK_SIZE),
+        outfile,
+        expected_size,
+    )
+
+
+def _with_retries(url: str, attempt: Callable[[], T]) -> T:
+    """
+    Call attempt, retrying with exponential backoff when it fails due to
+    a connection problem, a timeout or a retryable response status.
+    """
+    retries = 0
+    while True:
+        try:
+            return attempt()
+        except requests.exceptions.RequestException as err:
+            retryable = isinstance(
+                err,
+                (
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError,
+                ),
+            ) or (
+                err.response is not None
+                and err.response.status_code in RETRYABLE_STATUS_CODES
+            )
+            if not retryable or retries >= settings.HTTP_MAX_RETRIES:
+                logger.debug("ERROR retrieving %s: %s", url, err)
+                raise
+            delay = settings.HTTP_BACKOFF_FACTOR * 2**retries
+            retries += 1
+            logger.debug(
+                "Retry %s of %s for %s in %ss after: %s",
+                retries,
+                settings.HTTP_MAX_RETRIES,
+                url,
+                delay,
+                err,
+            )
+            time.sleep(delay)
+
+
+# Suffix of the file a download is streamed into until it completes.
+PART_SUFFIX = ".part"
+# Key of the url a file was downloaded from in its sidecar metadata.
+URL_KEY = "url"
+# Key, in the sidecar metadata of a partial download, of the validator
+# that makes sure a resumed download continues the same content.
+_VALIDATOR_KEY = "validator"
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+
+
+def _resume_validator(response: requests.Response) -> Optional[str]:
+    """
+    Return the strong ETag, or failing that the Last-Modified date, of
+    response with which we can ask the server, via If-Range, to resume
+    the same content, or None if there is none.
+    """
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+class _NotModified(Exception):
+    """The server says the content did not change since we got it."""
+
+
+def _download_part(
+    url: str, part_file: str, metadata: Optional[dict[str, Any]] = None
+) -> Optional[int]:
+    """
+    Download url into part_file, resuming from the end of part_file
+    with a Range request if it already holds part of the same content.
+    Return the total size of the content if the server told us, None
+    otherwise.
+
+    Given metadata, the sidecar metadata of a previous download of url,
+    make the request conditional on its validators and raise
+    _NotModified if the server says the content did not change.
+    """
+    offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+    part_metadata = file_utils.read_sidecar_metadata(part_file)
+    validator = part_metadata.get(_VALIDATOR_KEY)
+    # Byte offsets are only meaningful in the unencoded content.
+    headers = {"Accept-Encoding": "identity"}
+    if offset and validator:
+        logger.debug("Resuming download of %s at byte %s", url, offset)
+        headers["Range"] = "bytes={}-".format(offset)
+        headers["If-Range"] = validator
+    elif metadata:
+        if metadata.get(file_utils.ETAG_KEY):
+            headers["If-None-Match"] = metadata[file_utils.ETAG_KEY]
+        if metadata.get(file_utils.LAST_MODIFIED_KEY):
+            headers["If-Modified-Since"] = metadata[file_utils.LAST_MODIFIED_KEY]
+    with http_session().get(
+        url, headers=headers, stream=True, timeout=_timeout()
+    ) as response:
+        if response.status_code == 304:
+            raise _NotModified(url)
+        if response.status_code == 416:
+            # Whatever we have doesn't fit the content, start over
+            # from byte 0, without the validator of what we had.
+            for path in [part_file, file_utils.sidecar_metadata_path(part_file)]:
+                with suppress(FileNotFoundError):
+                    os.unlink(path)
+            raise IncompleteDownloadError(
+                "Range not satisfiable for {}".format(url), response=response
+            )
+        response.raise_for_status()
+        total_size: Optional[int] = None
+        match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+        if response.status_code == 206 and match and int(match.group(1)) == offset:
+            mode = "ab"
+            if match.group(2) != "*":
+                total_size = int(match.group(2))
+        else:
+            # The server sent the whole content, e.g., because it
+            # changed since the partial download.
+            mode = "wb"
+            offset = 0
+            content_length = response.headers.get("Content-Length")
+            if (
+                content_length is not None
+                and "Content-Encoding" not in response.headers
+            ):
+                total_size = int(content_length)
+        if mode == "wb":
+            part_metadata = {
+                _VALIDATOR_KEY: _resume_validator(response),
+                file_utils.ETAG_KEY: response.headers.get("ETag"),
+                file_utils.LAST_MODIFIED_KEY: response.headers.get("Last-Modified"),
+            }
+            file_utils.write_sidecar_metadata(part_file, part_metadata)
+        with open(part_file, mode) as fp:
+            for chunk in response.iter_content(chunk_size=settings.HTTP_CHUNK_SIZE):
+                fp.write(chunk)
+    size = os.path.getsize(part_file)
+    if total_size is not None and size != total_size:
+        raise IncompleteDownloadError(
+            "Received {} of {} bytes from {}".format(size, total_size, url)
+        )
+    return total_size
+
+
+@icontract.require(lambda url, outfile: url and outfile)
 def download_file(url: str, outfile: str) -> None:
-    """Downloads a file and saves it."""
+    """
+    Download url into outfile over a pooled connection, retrying
+    temporary failures.
+
+    The content is streamed into outfile + PART_SUFFIX which is only
+    renamed to outfile once complete. A retry, or a later call after a
+    failure, resumes from where the partial download stopped. The size
+    and sha256 checksum of the completed file are recorded in its
+    sidecar metadata file, see file_utils.file_is_intact. On failure
+    raise, leaving outfile as it was, rather than leave behind an
+    empty or truncated file that would later be taken for a fresh
+    asset.
+
+    Callers must not download the same outfile concurrently,
+    ResourceProvisioner makes sure of that with file_utils.file_lock.
+    """
+    _download(url, outfile)
+
+
+def _download(
+    url: str, outfile: str, metadata: Optional[dict[str, Any]] = None
+) -> None:
+    """
+    See download_file. Given metadata, see _download_part, raise
+    _NotModified instead if the content did not change.
+    """
+    part_file = "{}{}".format(outfile, PART_SUFFIX)
+    _with_retries(url, lambda: _download_part(url, part_file, metadata))
+    size = os.path.getsize(part_file)
+    sha256 = file_utils.file_sha256(part_file)
+    part_metadata = file_utils.read_sidecar_metadata(part_file)
+    os.replace(part_file, outfile)
+    os.unlink(file_utils.sidecar_metadata_path(part_file))
+    file_utils.write_sidecar_metadata(
+        outfile,
+        {
+            URL_KEY: url,
+            file_utils.SIZE_KEY: size,
+            file_utils.SHA256_KEY: sha256,
+            file_utils.ETAG_KEY: part_metadata.get(file_utils.ETAG_KEY),
+            file_utils.LAST_MODIFIED_KEY: part_metadata.get(
+                file_utils.LAST_MODIFIED_KEY
+            ),
+        },
+    )
+
+
+@icontract.require(lambda url, outfile: url and outfile)
+def refresh_file(url: str, outfile: str) -> bool:
+    """
+    Bring outfile, previously downloaded from url by download_file, up
+    to date and return True if it had to be downloaded again.
+
+    Rather than download it again regardless, ask the server, with the
+    ETag and Last-Modified validators recorded in outfile's sidecar
+    metadata, whether the content changed. If it did not, only reset
+    outfile's modification time so that
+    file_utils.asset_needs_revalidation considers it fresh again.
+    Without validators to ask with, e.g., because the server sent none,
+    download it again. Callers must not refresh the same outfile
+    concurrently.
+    """
+    metadata = file_utils.read_sidecar_metadata(outfile)
+    if (
+        not os.path.exists(outfile)
+        or metadata.get(URL_KEY) != url
+        or not (
+            metadata.get(file_utils.ETAG_KEY)
+            or metadata.get(file_utils.LAST_MODIFIED_KEY)
+        )
+    ):
+        download_file(url, outfile)
+        return True
     try:
-        with closing(urlopen(url)) as request:
-            with open(outfile, "wb") as fp:
-                shutil.copyfileobj(request, fp)
-    except IOError as err:
-        logger.debug("ERROR retrieving %s", url)
-        logger.debug(err)
+        _download(url, outfile, metadata)
+    except _NotModified:
+        logger.debug("%s not modified", url)
+        os.utime(outfile)
+        return False
+    return True
+
+
+def conditional_download_file(
+    url: str,
+    outfile: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> ConditionalDownloadResult:
+    """
+    Download url into outfile unless the server says, given the etag
+    and last_modified validators from a previous download, that it has
+    not been modified since. Raise on any other failure and leave
+    outfile untouched.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    def attempt() -> ConditionalDownloadResult:
+        with http_session().get(
+            url, headers=headers, stream=True, timeout=_timeout()
+        ) as response:
+            if response.status_code == 304:
+                logger.debug("%s not modified", url)
+                return ConditionalDownloadResult(
+                    modified=False, etag=etag, last_modified=last_modified
+                )
+            response.raise_for_status()
+            _stream_to_file(response, outfile)
+            return ConditionalDownloadResult(
+                modified=True,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+
+    return _with_retries(url, attempt)
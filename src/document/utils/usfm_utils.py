@@ -0,0 +1,57 @@
+"""
+This module provides utilities for converting USFM with USFM-Tools
+without going through an HTML file.
+"""
+
+from usfm_tools.support import books, singlehtmlRenderer
+
+from document.utils import asset_fs, html_parsing_utils
+
+
+class _SplittingHTMLRenderer(singlehtmlRenderer.SingleHTMLRenderer):  # type: ignore
+    """
+    Render USFM to HTML as USFM-Tools' single HTML renderer does but
+    split the HTML into chapters and verses with a USFMHtmlSplitter as
+    it is rendered rather than write it to a file.
+    """
+
+    def __init__(self, usfm_file: str) -> None:
+        # No output file, see render.
+        super().__init__(usfm_file, None)
+        self.splitter = html_parsing_utils.USFMHtmlSplitter()
+
+    def loadUSFM(self, usfm_file: str) -> None:
+        """
+        Load the book in usfm_file, which may be in a mounted zip
+        asset, as USFM-Tools loads each book in a directory.
+        """
+        usfm = asset_fs.read_file(usfm_file, "utf-8-sig").lstrip()
+        self.booksUsfm = {books.bookID(usfm): usfm}
+
+    def render(self) -> None:
+        """Render as SingleHTMLRenderer.render does, minus the output file."""
+        self.loadUSFM(self.inputDir)
+        self.writeHeader()
+        self.run()
+        self.write(self.stopIndent())
+        self.write(self.stopLI())
+        self.write(self.stopP())
+        self.writeFootnotes()
+        self.writeClosing()
+        self.splitter.close()
+
+    def write(self, unicodeString: str) -> None:
+        self.splitter.feed(unicodeString.replace("~", " "))
+
+
+def usfm_chapters(
+    usfm_file: str, book_number: str
+) -> list[html_parsing_utils.USFMHtmlChapter]:
+    """
+    Convert the book in usfm_file to HTML and return its chapters, see
+    html_parsing_utils.USFMHtmlSplitter, in a single pass with no
+    intermediate HTML. USFM-Tools can raise MalformedUsfmError.
+    """
+    renderer = _SplittingHTMLRenderer(usfm_file)
+    renderer.render()
+    return renderer.splitter.chapters(book_number)
@@ -0,0 +1,120 @@
+"""
+Compare the cost of answering the resource lookup questions with
+catalog.CatalogIndex against ResourceJsonLookup._lookup's jsonpath
+matching on a synthetic catalog the size of translations.json.
+"""
+
+import time
+import types
+
+import pytest
+
+from document.config import settings
+from document.domain import bible_books, catalog, resource_lookup
+
+NUMBER_OF_LANGUAGES = 300
+RESOURCE_TYPES = ["ulb", "tn", "tq", "tw"]
+
+
+def synthetic_catalog() -> list[dict]:
+    """Build a catalog with the same shape as translations.json."""
+    json_data: list[dict] = []
+    for lang_num in range(NUMBER_OF_LANGUAGES):
+        lang_code = "l{}".format(lang_num)
+        contents = []
+        for resource_type in RESOURCE_TYPES:
+            contents.append(
+                {
+                    "name": resource_type.upper(),
+                    "code": resource_type,
+                    "links": [
+                        {
+                            "url": "https://example.com/{}_{}.zip".format(
+                                lang_code, resource_type
+                            ),
+                            "format": "zip",
+                        }
+                    ],
+                    "subcontents": [
+                        {
+                            "name": book_name,
+                            "code": book_code,
+                            "links": [
+                                {
+                                    "url": "https://example.com/{}_{}_{}.usfm".format(
+                                        lang_code, resource_type, book_code
+                                    ),
+                                    "format": "usfm",
+                                }
+                            ],
+                        }
+                        for book_code, book_name in bible_books.BOOK_NAMES.items()
+                    ],
+                }
+            )
+        json_data.append(
+            {"name": lang_code.upper(), "code": lang_code, "contents": contents}
+        )
+    return json_data
+
+
+@pytest.mark.slow
+def test_catalog_index_is_faster_than_jsonpath() -> None:
+    json_data = synthetic_catalog()
+    # ResourceJsonLookup._lookup only needs json_data from self.
+    jsonpath_lookup = types.SimpleNamespace(json_data=json_data)
+    queries = [
+        ("l{}".format(lang_num), "ulb", "gen")
+        for lang_num in range(0, NUMBER_OF_LANGUAGES, NUMBER_OF_LANGUAGES // 10)
+    ]
+
+    start = time.perf_counter()
+    jsonpath_results = []
+    for lang_code, resource_type, resource_code in queries:
+        jsonpath_results.append(
+            (
+                resource_lookup.ResourceJsonLookup._lookup(
+                    jsonpath_lookup,  # type: ignore
+                    settings.INDIVIDUAL_USFM_URL_JSONPATH.format(
+                        lang_code, resource_type, resource_code
+                    ),
+                ),
+                resource_lookup.ResourceJsonLookup._lookup(
+                    jsonpath_lookup,  # type: ignore
+                    settings.RESOURCE_LANG_NAME_JSONPATH.format(lang_code),
+                ),
+                resource_lookup.ResourceJsonLookup._lookup(
+                    jsonpath_lookup,  # type: ignore
+                    settings.RESOURCE_TYPE_NAME_JSONPATH.format(
+                        lang_code, resource_type
+                    ),
+                ),
+            )
+        )
+    jsonpath_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    catalog_index = catalog.CatalogIndex(json_data)
+    build_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index_results = []
+    for lang_code, resource_type, resource_code in queries:
+        index_results.append(
+            (
+                catalog_index.subcontents_urls(
+                    lang_code, resource_type, resource_code, catalog.USFM_FORMAT
+                ),
+                catalog_index.lang_names(lang_code),
+                catalog_index.resource_type_names(lang_code, resource_type),
+            )
+        )
+    index_elapsed = time.perf_counter() - start
+
+    print(
+        "\n{} lookups: jsonpath {:.4f}s, index build {:.4f}s, index lookups {:.6f}s".format(
+            len(queries), jsonpath_elapsed, build_elapsed, index_elapsed
+        )
+    )
+    assert index_results == jsonpath_results
+    assert index_elapsed < jsonpath_elapsed
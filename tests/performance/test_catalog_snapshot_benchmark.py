@@ -0,0 +1,83 @@
+"""
+Measure the per-worker cold-start time and peak RSS of loading the
+catalog by parsing translations.json into memory, as workers used to,
+against memory-mapping the compiled snapshot file, as they do now.
+Each measurement runs in a fresh interpreter, i.e., a cold worker.
+"""
+
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+from document.domain import catalog
+from tests.performance.test_catalog_index_benchmark import synthetic_catalog
+
+MEASURE = """
+import json, os, sys, time
+from document.domain import catalog
+
+def rss_kb():
+    with open("/proc/self/statm") as fp:
+        return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+baseline = rss_kb()
+start = time.perf_counter()
+if sys.argv[1] == "in_memory":
+    with open(sys.argv[2], "rb") as fp:
+        index = catalog.CatalogIndex(json.loads(fp.read()))
+else:
+    index = catalog.MappedCatalogIndex(sys.argv[3])
+# A typical request touches one language.
+assert index.subcontents_urls("l7", "ulb", "gen", catalog.USFM_FORMAT)
+elapsed = time.perf_counter() - start
+rss = rss_kb()
+print(json.dumps({"seconds": elapsed, "rss_kb": rss, "rss_growth_kb": rss - baseline}))
+"""
+
+
+def measure(mode: str, json_file: pathlib.Path, snapshot_file: pathlib.Path) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, mode, str(json_file), str(snapshot_file)],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    measurement: dict = json.loads(output.splitlines()[-1])
+    return measurement
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(
+    not os.path.exists("/proc/self/statm"), reason="Measures RSS through /proc"
+)
+def test_mapped_snapshot_is_cheaper_than_parsing(tmp_path: pathlib.Path) -> None:
+    json_data = synthetic_catalog()
+    json_file = tmp_path / "translations.json"
+    json_file.write_text(json.dumps(json_data))
+    snapshot_file = tmp_path / "translations.json.snapshot"
+    catalog.write_snapshot_file(json_data, "benchmark", str(snapshot_file))
+
+    in_memory = measure("in_memory", json_file, snapshot_file)
+    mapped = measure("mapped", json_file, snapshot_file)
+    print(
+        "\ntranslations.json {:.1f}MB, snapshot {:.1f}MB".format(
+            json_file.stat().st_size / 2**20, snapshot_file.stat().st_size / 2**20
+        )
+    )
+    for mode, measurement in [("in memory", in_memory), ("mapped", mapped)]:
+        print(
+            "{}: cold start {:.4f}s, RSS {}KB (+{}KB)".format(
+                mode,
+                measurement["seconds"],
+                measurement["rss_kb"],
+                measurement["rss_growth_kb"],
+            )
+        )
+    assert mapped["seconds"] < in_memory["seconds"]
+    assert mapped["rss_growth_kb"] < in_memory["rss_growth_kb"]
@@ -0,0 +1,88 @@
+"""
+Compare downloading many assets with url_utils' pooled, keep-alive
+session against opening a new urlopen connection per file, as
+url_utils used to, from a local stand-in HTTP server.
+
+Loopback connections cost next to nothing to set up, unlike real ones
+which take a TCP and a TLS handshake, i.e., several round trips, so
+the stand-in server can delay each new connection to simulate that.
+"""
+
+import pathlib
+import shutil
+import threading
+import time
+from contextlib import closing
+from urllib.request import urlopen
+
+import pytest
+
+from document.utils import url_utils
+from tests.unit.test_url_utils import CONTENT, StandInHandler, StandInServer
+
+NUMBER_OF_FILES = 200
+# Simulated cost, in seconds, of setting up a connection.
+CONNECTION_SETUP_DELAYS = [0, 0.02]
+
+
+class SlowHandshakeHandler(StandInHandler):
+    connection_setup_delay = 0.0
+
+    def setup(self) -> None:
+        time.sleep(self.connection_setup_delay)
+        super().setup()
+
+
+def urlopen_download_file(url: str, outfile: str) -> None:
+    """The previous implementation of url_utils.download_file."""
+    with closing(urlopen(url)) as request:
+        with open(outfile, "wb") as fp:
+            shutil.copyfileobj(request, fp)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("connection_setup_delay", CONNECTION_SETUP_DELAYS)
+def test_pooled_download_throughput(
+    tmp_path: pathlib.Path, connection_setup_delay: float
+) -> None:
+    handler = type(
+        "Handler",
+        (SlowHandshakeHandler,),
+        {"connection_setup_delay": connection_setup_delay},
+    )
+    server = StandInServer(("127.0.0.1", 0), handler)
+    server.connections = set()
+    server.failures_left = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = "http://127.0.0.1:{}".format(server.server_address[1])
+    try:
+        elapsed = {}
+        for name, download_file in [
+            ("urlopen per file", urlopen_download_file),
+            ("pooled session", url_utils.download_file),
+        ]:
+            server.connections = set()
+            start = time.perf_counter()
+            for i in range(NUMBER_OF_FILES):
+                download_file(
+                    "{}/asset{}.zip".format(base_url, i), str(tmp_path / "asset.zip")
+                )
+            elapsed[name] = time.perf_counter() - start
+            print(
+                "\n{}s connection setup, {}: {} files of {}KiB in {:.3f}s "
+                "({:.1f}MiB/s) over {} connections".format(
+                    connection_setup_delay,
+                    name,
+                    NUMBER_OF_FILES,
+                    len(CONTENT) // 1024,
+                    elapsed[name],
+                    NUMBER_OF_FILES * len(CONTENT) / 2**20 / elapsed[name],
+                    len(server.connections),
+                )
+            )
+        assert len(server.connections) == 1
+        if connection_setup_delay:
+            assert elapsed["pooled session"] < elapsed["urlopen per file"]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,81 @@
+"""
+Compare finding which translation words occur in each verse of a long
+book with tw_utils.TranslationWordMatcher against the regex search per
+word TWResource.translation_word_links used to make.
+"""
+
+import random
+import re
+import string
+import time
+
+import pytest
+
+from document.domain import model
+from document.utils import tw_utils
+
+# Psalms has 2461 verses, an English TW resource about 1000 words.
+NUMBER_OF_VERSES = 2461
+NUMBER_OF_WORDS = 1000
+WORDS_PER_VERSE = 25
+# Searching every verse word by word takes minutes, time a sample.
+NUMBER_OF_SAMPLED_VERSES = 100
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+
+def book() -> tuple[list[model.LocalizedWord], list[model.HtmlContent]]:
+    """Build translation words and verses with some of them in it."""
+    rng = random.Random(0)
+    vocabulary = [random_word(rng) for _ in range(3 * NUMBER_OF_WORDS)]
+    words = sorted(
+        {
+            model.LocalizedWord(word.capitalize() if index % 3 == 0 else word)
+            for index, word in enumerate(vocabulary[:NUMBER_OF_WORDS])
+        }
+    )
+    verses = [
+        model.HtmlContent(
+            '<span id="en-019-ch-001-v-{0:03d}" class="v-num"><sup><b>{0}</b>'
+            "</sup></span> {1}.".format(
+                verse % 200,
+                " ".join(rng.choice(vocabulary) for _ in range(WORDS_PER_VERSE)),
+            )
+        )
+        for verse in range(NUMBER_OF_VERSES)
+    ]
+    return words, verses
+
+
+def regex_matches(
+    words: list[model.LocalizedWord], verse: model.HtmlContent
+) -> set[model.LocalizedWord]:
+    return {
+        word for word in words if re.search(r"\b{}\b".format(re.escape(word)), verse)
+    }
+
+
+@pytest.mark.slow
+def test_translation_word_matcher_is_faster_than_regex_per_word() -> None:
+    words, verses = book()
+    start = time.perf_counter()
+    matcher = tw_utils.TranslationWordMatcher(tuple(words))
+    matches = [matcher.matches(verse) for verse in verses]
+    matcher_seconds = time.perf_counter() - start
+
+    sampled_verses = verses[:NUMBER_OF_SAMPLED_VERSES]
+    start = time.perf_counter()
+    sampled_regex_matches = [regex_matches(words, verse) for verse in sampled_verses]
+    regex_seconds = (
+        (time.perf_counter() - start) * NUMBER_OF_VERSES / NUMBER_OF_SAMPLED_VERSES
+    )
+    print(
+        "\nmatcher: {:.3f}s, regex per word: {:.3f}s (estimated)".format(
+            matcher_seconds, regex_seconds
+        )
+    )
+    assert matches[:NUMBER_OF_SAMPLED_VERSES] == sampled_regex_matches
+    assert any(matches)
+    assert matcher_seconds < regex_seconds / 20
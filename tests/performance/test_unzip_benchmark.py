@@ -0,0 +1,107 @@
+"""
+Compare extracting a whole-language TN zip asset with extracting only
+the members one book needs, as ResourceProvisioner does, and with
+reading the members in place, see asset_fs.
+"""
+
+import pathlib
+import time
+import zipfile
+
+import pytest
+
+from document.utils import asset_fs, file_utils
+
+NUMBER_OF_BOOKS = 66
+CHAPTERS_PER_BOOK = 20
+VERSES_PER_CHAPTER = 15
+
+
+def tn_zip(zip_path: pathlib.Path) -> None:
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("en_tn/manifest.yaml", "dublin_core: {}")
+        for book in range(1, NUMBER_OF_BOOKS + 1):
+            book_dir = "en_tn/{:02d}-b{:02d}".format(book, book)
+            zf.writestr("{}/front/intro.md".format(book_dir), "# Introduction")
+            for chapter in range(1, CHAPTERS_PER_BOOK + 1):
+                for verse in range(1, VERSES_PER_CHAPTER + 1):
+                    zf.writestr(
+                        "{}/{:02d}/{:02d}.md".format(book_dir, chapter, verse),
+                        "# Note\n\nSome translation note text.\n",
+                    )
+
+
+@pytest.mark.slow
+def test_selective_unzip(tmp_path: pathlib.Path) -> None:
+    zip_path = tmp_path / "en_tn.zip"
+    tn_zip(zip_path)
+    elapsed = {}
+    for name, member_filter in [
+        ("whole zip", None),
+        ("one book", lambda member: "-b43/" in member or member.count("/") == 1),
+    ]:
+        destination_dir = tmp_path / name.replace(" ", "_")
+        start = time.perf_counter()
+        file_utils.unzip(str(zip_path), str(destination_dir), member_filter)
+        elapsed[name] = time.perf_counter() - start
+        number_of_files = sum(1 for path in destination_dir.rglob("*"))
+        print(
+            "\n{}: {} files and directories in {:.3f}s".format(
+                name, number_of_files, elapsed[name]
+            )
+        )
+    assert elapsed["one book"] < elapsed["whole zip"] / 4
+
+
+BOOKS_READ = ["b43", "b44", "b45"]
+
+
+def read_book(resource_dir: str, book: str) -> int:
+    """Find and read a book's notes the way TNHtmlInitializer does."""
+    number_of_notes = 0
+    for chapter_dir in sorted(
+        asset_fs.glob("{}/*{}/*[0-9]*".format(resource_dir, book))
+    ):
+        for verse_path in sorted(asset_fs.glob("{}/*[0-9]*.md".format(chapter_dir))):
+            asset_fs.read_file(verse_path)
+            number_of_notes += 1
+    return number_of_notes
+
+
+@pytest.mark.slow
+def test_read_in_place(tmp_path: pathlib.Path) -> None:
+    zip_path = tmp_path / "en_tn.zip"
+    tn_zip(zip_path)
+    elapsed: dict[str, list[float]] = {}
+    try:
+        for name in ["extract book then read", "read in place"]:
+            destination_dir = tmp_path / name.replace(" ", "_")
+            elapsed[name] = []
+            # Successive requests for different books of the same
+            # language.
+            for book in BOOKS_READ:
+                start = time.perf_counter()
+                if name == "read in place":
+                    asset_fs.mount(str(zip_path), str(destination_dir))
+                else:
+                    file_utils.unzip(
+                        str(zip_path),
+                        str(destination_dir),
+                        lambda member: "-{}/".format(book) in member,
+                    )
+                number_of_notes = read_book(str(destination_dir / "en_tn"), book)
+                elapsed[name].append(time.perf_counter() - start)
+                assert number_of_notes == CHAPTERS_PER_BOOK * VERSES_PER_CHAPTER
+            print(
+                "\n{}: {} notes per book in {}s".format(
+                    name,
+                    number_of_notes,
+                    ", ".join("{:.3f}".format(seconds) for seconds in elapsed[name]),
+                )
+            )
+    finally:
+        asset_fs.unmount_all()
+    # Mounting is a one-off per zip asset version, reading in place is
+    # then much cheaper.
+    assert sum(elapsed["read in place"]) < sum(elapsed["extract book then read"])
+    assert elapsed["read in place"][-1] < elapsed["extract book then read"][-1] / 4
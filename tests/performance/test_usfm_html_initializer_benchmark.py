@@ -0,0 +1,116 @@
+"""
+Compare splitting a long book's USFM-Tools HTML into chapters and
+verses with USFMHtmlInitializer against the BeautifulSoup parses and
+finds it used to make.
+"""
+
+import time
+import types
+
+import bs4
+import pytest
+
+from document.domain import resource
+from document.utils import html_parsing_utils
+
+# Psalms has 150 chapters.
+NUMBER_OF_CHAPTERS = 150
+VERSES_PER_CHAPTER = 16
+
+
+def book_html() -> str:
+    """Build HTML shaped like USFM-Tools' output for a book of poetry."""
+    html = ['<html><body><div id="bible-book-019" class="bible-book-text">']
+    for chapter in range(1, NUMBER_OF_CHAPTERS + 1):
+        html.append(
+            '\n\n<h2 id="019-ch-{:03d}" class="c-num">Chapter {}</h2>'.format(
+                chapter, chapter
+            )
+        )
+        for verse in range(1, VERSES_PER_CHAPTER + 1):
+            html.append(
+                '<p class="indent-1">\n&nbsp;&nbsp;&nbsp;&nbsp; <span '
+                'id="019-ch-{:03d}-v-{:03d}" class="v-num"><sup><b>{}</b></sup>'
+                "</span> Blessed is the one who does not walk \n</p>\n\n"
+                '<p class="indent-2">\n&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;'
+                "&nbsp;&nbsp; in the counsel of the wicked, \n</p>\n".format(
+                    chapter, verse, verse
+                )
+            )
+    html.append("</div></body></html>")
+    return "".join(html)
+
+
+def beautifulsoup_split(html: str) -> int:
+    """
+    Split html the way USFMHtmlInitializer did before it split it in
+    one pass, returning the number of verses found.
+    """
+    number_of_verses = 0
+    parser = bs4.BeautifulSoup(html, "html.parser")
+    chapter_breaks = parser.find_all("h2", attrs={"class": "c-num"})
+    for chapter_num in range(1, len(chapter_breaks) + 1):
+        chapter_content = [
+            str(tag)
+            for tag in html_parsing_utils.tag_elements_between(
+                parser.find("h2", string="Chapter {}".format(chapter_num)),
+                parser.find("h2", string="Chapter {}".format(chapter_num + 1)),
+            )
+        ]
+        chapter_parser = bs4.BeautifulSoup("".join(chapter_content), "html.parser")
+        # The chapter content repeats nested tags so verses are found
+        # more than once.
+        chapter_verses: dict[int, str] = {}
+        for verse in chapter_parser.find_all("span", attrs={"class": "v-num"}):
+            verse_num = int(verse["id"].split("-v-")[1])
+            verse_content = [
+                str(tag)
+                for tag in html_parsing_utils.tag_elements_between(
+                    verse,
+                    chapter_parser.find(
+                        "span",
+                        attrs={
+                            "class": "v-num",
+                            "id": "019-ch-{:03d}-v-{:03d}".format(
+                                chapter_num, verse_num + 1
+                            ),
+                        },
+                    ),
+                )
+            ]
+            del verse_content[1:4]
+            chapter_verses[verse_num] = "".join(verse_content)
+        number_of_verses += len(chapter_verses)
+    return number_of_verses
+
+
+@pytest.mark.slow
+def test_initializer_is_faster_than_beautifulsoup() -> None:
+    html = book_html()
+
+    start = time.perf_counter()
+    beautifulsoup_verses = beautifulsoup_split(html)
+    beautifulsoup_elapsed = time.perf_counter() - start
+
+    usfm_resource = types.SimpleNamespace(
+        _content=html, _chapter_content={}, lang_code="en", _book_number="19"
+    )
+    start = time.perf_counter()
+    resource.USFMHtmlInitializer(usfm_resource)._initialize_verses_html()  # type: ignore
+    initializer_elapsed = time.perf_counter() - start
+
+    print(
+        "\nBeautifulSoup: {:.3f}s, USFMHtmlInitializer: {:.3f}s".format(
+            beautifulsoup_elapsed, initializer_elapsed
+        )
+    )
+    assert len(usfm_resource._chapter_content) == NUMBER_OF_CHAPTERS
+    assert (
+        sum(
+            len(chapter.chapter_verses)
+            for chapter in usfm_resource._chapter_content.values()
+        )
+        == beautifulsoup_verses
+        == NUMBER_OF_CHAPTERS * VERSES_PER_CHAPTER
+    )
+    assert initializer_elapsed < beautifulsoup_elapsed
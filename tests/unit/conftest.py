@@ -0,0 +1,85 @@
+"""This module provides fixtures for unit tests."""
+
+import io
+import os
+import pathlib
+import shutil
+import zipfile
+from typing import Iterator
+
+import pytest
+
+from document.config import settings
+from document.domain import resource_lookup
+from document.utils import asset_fs, file_utils, url_utils
+
+TRANSLATIONS_JSON = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "test_data",
+    "translations.json",
+)
+TRANSLATIONS_JSON_URL = "http://example.com/data/translations.json"
+
+
+@pytest.fixture()
+def test_translations_json(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> pathlib.Path:
+    """
+    Point settings at a working dir that already has a fresh copy of
+    the test translations.json so that lookups use it and nothing is
+    downloaded. Return the path of the copy.
+    """
+    # Don't let lookup results cached by other tests leak in.
+    resource_lookup.resource_lookup_dto_cache.clear()
+    json_file = tmp_path / "translations.json"
+    shutil.copy(TRANSLATIONS_JSON, json_file)
+    monkeypatch.setattr(type(settings), "working_dir", lambda self: str(tmp_path))
+    monkeypatch.setattr(settings, "TRANSLATIONS_JSON_LOCATION", TRANSLATIONS_JSON_URL)
+    return json_file
+
+
+def zip_bytes(members: dict[str, str]) -> bytes:
+    """Return a zip file holding members, content keyed by name."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+@pytest.fixture()
+def zip_assets() -> dict[str, dict[str, str]]:
+    """
+    The members of the zip assets that downloads serves, keyed by the
+    file name in their url. Test modules override it.
+    """
+    return {}
+
+
+@pytest.fixture()
+def downloads(
+    zip_assets: dict[str, dict[str, str]], monkeypatch: pytest.MonkeyPatch
+) -> Iterator[list[str]]:
+    """
+    Stand in for url_utils.download_file, serving the zip asset, see
+    zip_assets, named by the url, with its size and checksum in its
+    sidecar metadata, and recording what it downloads. Unmount the zip
+    assets read in place afterward.
+    """
+    downloaded: list[str] = []
+
+    def download_file(url: str, outfile: str) -> None:
+        downloaded.append(url)
+        pathlib.Path(outfile).write_bytes(zip_bytes(zip_assets[url.rpartition("/")[2]]))
+        file_utils.write_sidecar_metadata(
+            outfile,
+            {
+                file_utils.SIZE_KEY: os.path.getsize(outfile),
+                file_utils.SHA256_KEY: file_utils.file_sha256(outfile),
+            },
+        )
+
+    monkeypatch.setattr(url_utils, "download_file", download_file)
+    yield downloaded
+    asset_fs.unmount_all()
@@ -0,0 +1,134 @@
+import os
+import pathlib
+import zipfile
+from glob import glob
+from typing import Iterator
+
+import pytest
+
+from document.utils import asset_fs
+
+MEMBERS = {
+    "en_tn/manifest.yaml": "dublin_core: {}",
+    "en_tn/front/intro.md": "# Introduction",
+    "en_tn/01-gen/front/intro.md": "# Introduction to Genesis",
+    "en_tn/01-gen/01/intro.md": "# Genesis 1",
+    "en_tn/01-gen/01/01.md": "# Genesis 1:1",
+    "en_tn/01-gen/10/02.md": "# Genesis 10:2",
+    "en_tn/02-exo/01/01.txt": "# Exodus 1:1",
+    "en_tn/.git/config": "[core]",
+    "en_tn/bible/kt/god.md": "# God",
+}
+PATTERNS = [
+    "{}/**/*gen/*[0-9]*",
+    "{}/*/*gen/*[0-9]*",
+    "{}/*/*gen/front/intro.md",
+    "{}/*/*exo/front/intro.txt",
+    "{}/en_tn/01-gen/01/*intro.md",
+    "{}/en_tn/01-gen/01/*[0-9]*.md",
+    "{}/en_tn/02-exo/01/*[0-9]*.txt",
+    "{}/*/bible/kt/*.md",
+    "{}/*",
+    "{}/*/*",
+    "{}/*/.*",
+    "{}/en_tn/[!0]*",
+    "{}/en_tn/0?-*",
+]
+
+
+@pytest.fixture()
+def zip_asset(tmp_path: pathlib.Path) -> Iterator[pathlib.Path]:
+    zip_path = tmp_path / "en_tn.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for name, content in MEMBERS.items():
+            zf.writestr(name, content)
+    yield zip_path
+    asset_fs.unmount_all()
+
+
+@pytest.mark.parametrize("absolute", [True, False])
+def test_mounted_zip_globs_like_extracted_zip(
+    zip_asset: pathlib.Path,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+    absolute: bool,
+) -> None:
+    if not absolute:
+        monkeypatch.chdir(tmp_path)
+    base = str(tmp_path) if absolute else "."
+    extracted, mounted = os.path.join(base, "extracted"), os.path.join(base, "mounted")
+    with zipfile.ZipFile(zip_asset) as zf:
+        zf.extractall(extracted)
+    asset_fs.mount(str(zip_asset), mounted)
+    for pattern in PATTERNS:
+        assert sorted(asset_fs.glob(pattern.format(mounted))) == sorted(
+            path.replace(extracted, mounted, 1)
+            for path in glob(pattern.format(extracted))
+        ), pattern
+
+
+def test_mounted_zip_is_read_in_memory(
+    zip_asset: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    root = tmp_path / "en_tn"
+    asset_fs.mount(str(zip_asset), str(root))
+    for name, content in MEMBERS.items():
+        assert asset_fs.read_file(str(root / name)) == content
+    assert asset_fs.isdir(str(root / "en_tn/01-gen/01"))
+    assert not asset_fs.isdir(str(root / "en_tn/01-gen/01/01.md"))
+    # Nothing was extracted.
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["en_tn.zip"]
+
+
+def test_paths_outside_mounted_zips_are_on_disk(
+    zip_asset: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    asset_fs.mount(str(zip_asset), str(tmp_path / "en_tn"))
+    (tmp_path / "en_tw").mkdir()
+    (tmp_path / "en_tw" / "god.md").write_text("# God")
+    assert asset_fs.read_file(str(tmp_path / "en_tw" / "god.md")) == "# God"
+    # Patterns spanning disk and mounted zips find both.
+    assert sorted(asset_fs.glob("{}/en_t*".format(tmp_path))) == [
+        str(tmp_path / "en_tn"),
+        str(tmp_path / "en_tn.zip"),
+        str(tmp_path / "en_tw"),
+    ]
+
+
+def test_changed_zip_is_mounted_anew(
+    zip_asset: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    root = str(tmp_path / "en_tn")
+    asset_file_system = asset_fs.mount(str(zip_asset), root)
+    assert asset_fs.mount(str(zip_asset), root) is asset_file_system
+    assert asset_fs.mounted(str(zip_asset), root) is asset_file_system
+    new_zip_path = tmp_path / "new.zip"
+    with zipfile.ZipFile(new_zip_path, "w") as zf:
+        zf.writestr("en_tn/01-gen/01/01.md", "# Revised Genesis 1:1")
+    os.replace(new_zip_path, zip_asset)
+    assert asset_fs.mounted(str(zip_asset), root) is None
+    asset_fs.mount(str(zip_asset), root)
+    assert (
+        asset_fs.read_file("{}/en_tn/01-gen/01/01.md".format(root))
+        == "# Revised Genesis 1:1"
+    )
+
+
+def test_evicted_or_replaced_zip_is_unmounted(
+    zip_asset: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    root = tmp_path / "en_tn"
+    asset_fs.mount(str(zip_asset), str(root))
+    new_zip_path = tmp_path / "new.zip"
+    with zipfile.ZipFile(new_zip_path, "w") as zf:
+        zf.writestr("en_tn/01-gen/01/01.md", "# Revised Genesis 1:1")
+    os.replace(new_zip_path, zip_asset)
+    # Paths under root are no longer served from the zip that was
+    # mounted.
+    assert asset_fs.glob(str(root / "en_tn/*")) == []
+    assert not asset_fs.isdir(str(root / "en_tn/01-gen"))
+    assert asset_fs.mounted(str(zip_asset), str(root)) is None
+    asset_fs.mount(str(zip_asset), str(root))
+    zip_asset.unlink()
+    assert asset_fs.glob("{}/*/en_tn/01-gen".format(tmp_path)) == []
+    assert asset_fs.listdir(str(root / "en_tn")) == ([], [])
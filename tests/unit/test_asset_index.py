@@ -0,0 +1,166 @@
+import os
+import pathlib
+from typing import Iterator
+
+import pytest
+
+from document.domain import model, resource
+from document.utils import asset_fs, asset_index, disk_cache, tw_utils
+from tests.unit.conftest import zip_bytes
+
+TN_FILES = {
+    "en_tn/manifest.yaml": "dublin_core: {}",
+    "en_tn/01-gen/front/intro.md": "# Introduction to Genesis",
+    "en_tn/01-gen/01/intro.md": "# Genesis 1",
+    "en_tn/01-gen/01/01.md": "# Genesis 1:1",
+    "en_tn/01-gen/01/02.md": "# Genesis 1:2",
+    # Some languages' TN assets are stored in .txt files.
+    "en_tn/01-gen/02/01.txt": "# Genesis 2:1",
+    "en_tn/01-gen/.hidden/01.md": "# Hidden",
+    "en_tn/02-exo/01/01.md": "# Exodus 1:1",
+}
+
+
+def write_tree(root: pathlib.Path, files: dict[str, str]) -> None:
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+@pytest.fixture()
+def zip_assets() -> dict[str, dict[str, str]]:
+    return {"en_tn.zip": TN_FILES}
+
+
+@pytest.fixture()
+def indexes() -> Iterator[None]:
+    yield
+    asset_index._indexes.clear()
+    asset_fs.unmount_all()
+
+
+def test_book_files_are_found(tmp_path: pathlib.Path, indexes: None) -> None:
+    write_tree(tmp_path, TN_FILES)
+    root = str(tmp_path / "en_tn")
+    book = asset_index.AssetIndex.build(root).book("gen")
+    assert book.intro_paths == [os.path.join(root, "01-gen/front/intro.md")]
+    assert [chapter.path for chapter in book.chapters] == [
+        os.path.join(root, "01-gen/01"),
+        os.path.join(root, "01-gen/02"),
+    ]
+    assert book.chapters[0].intro_paths == [os.path.join(root, "01-gen/01/intro.md")]
+    assert book.chapters[0].verse_paths == [
+        os.path.join(root, "01-gen/01/01.md"),
+        os.path.join(root, "01-gen/01/02.md"),
+    ]
+    assert book.chapters[1].verse_paths == [os.path.join(root, "01-gen/02/01.txt")]
+    assert asset_index.AssetIndex.build(root).book("lev") == ([], [])
+
+
+def test_usfm_and_translation_word_files_are_found(
+    tmp_path: pathlib.Path, indexes: None
+) -> None:
+    write_tree(
+        tmp_path,
+        {
+            "en_ulb/01-GEN.usfm": "\\id GEN",
+            "en_ulb/02-EXO.usfm": "\\id EXO",
+            "en_ulb/README.txt": "",
+            "en_tw/bible/kt/god.md": "# God",
+            "en_tw/bible/names/abraham.md": "# Abraham",
+            "en_tw/bible/other/bread.md": "# bread",
+            "en_tw/bible/other/bread.txt": "",
+        },
+    )
+    ulb = asset_index.AssetIndex.build(str(tmp_path / "en_ulb"))
+    assert ulb.usfm_files("gen") == [str(tmp_path / "en_ulb/01-GEN.usfm")]
+    tw = asset_index.AssetIndex.build(str(tmp_path / "en_tw"))
+    assert tw.translation_word_files() == [
+        str(tmp_path / "en_tw/bible/kt/god.md"),
+        str(tmp_path / "en_tw/bible/names/abraham.md"),
+        str(tmp_path / "en_tw/bible/other/bread.md"),
+    ]
+
+
+def test_index_is_persisted_until_invalidated(
+    tmp_path: pathlib.Path, indexes: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    write_tree(tmp_path, TN_FILES)
+    asset_path = str(tmp_path / "en_tn.zip")
+    root = str(tmp_path / "en_tn")
+    index = asset_index.load(asset_path, root)
+    assert os.path.exists(asset_index.index_path(asset_path))
+    assert asset_index.load(asset_path, root) is index
+    assert asset_index.loaded(root) is index
+
+    def not_built(root: str) -> asset_index.AssetIndex:
+        raise AssertionError("{} was indexed".format(root))
+
+    # Another worker loads the persisted index rather than index again.
+    asset_index._indexes.clear()
+    monkeypatch.setattr(asset_index.AssetIndex, "build", not_built)
+    assert asset_index.load(asset_path, root).tree == index.tree
+    monkeypatch.undo()
+
+    write_tree(tmp_path, {"en_tn/01-gen/03/01.md": "# Genesis 3:1"})
+    asset_index.invalidate(asset_path)
+    assert asset_index.loaded(root) is None
+    assert len(asset_index.load(asset_path, root).book("gen").chapters) == 3
+
+
+def test_mounted_zip_asset_is_indexed(tmp_path: pathlib.Path, indexes: None) -> None:
+    zip_path = tmp_path / "en_tn.zip"
+    zip_path.write_bytes(zip_bytes(TN_FILES))
+    asset_fs.mount(str(zip_path), str(tmp_path))
+    root = str(tmp_path / "en_tn")
+    index = asset_index.AssetIndex.build(root)
+    assert index.tree == asset_index.AssetIndex.build(root).tree
+    assert [chapter.path for chapter in index.book("exo").chapters] == [
+        os.path.join(root, "02-exo/01")
+    ]
+    assert not (tmp_path / "en_tn").exists()
+
+
+def test_provisioned_resources_share_the_index(
+    test_translations_json: pathlib.Path,
+    indexes: None,
+    downloads: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    working_dir = test_translations_json.parent
+    builds: list[str] = []
+    build = asset_index.AssetIndex.build.__func__  # type: ignore
+
+    def counted_build(cls: type, root: str) -> asset_index.AssetIndex:
+        builds.append(root)
+        return build(cls, root)
+
+    monkeypatch.setattr(asset_index.AssetIndex, "build", classmethod(counted_build))
+    for resource_code in ["gen", "exo"]:
+        resource_request = model.ResourceRequest(
+            lang_code="en", resource_type="tn", resource_code=resource_code
+        )
+        tn = resource.resource_factory(
+            str(working_dir), str(working_dir), resource_request, [resource_request]
+        )
+        tn.set_location(
+            model.ResourceLookupDto(
+                url="https://example.com/en_tn.zip",
+                source=model.AssetSourceEnum.ZIP,
+                jsonpath=None,
+                lang_name="English",
+                resource_type_name="Translation Notes",
+            )
+        )
+        tn.provision_asset_files()
+        tn.update_resource_with_asset_content()
+    assert builds == [str(working_dir / "en_tn" / "en_tn")]
+    # The persisted index is part of the asset's item, evicted with it.
+    assert disk_cache.item_path(
+        asset_index.index_path(str(working_dir / "en_tn" / "en_tn.zip"))
+    ) == str(working_dir / "en_tn")
+    assert (working_dir / "en_tn" / ".en_tn.zip.index.json").exists()
+    assert tn.book_payload.chapters[1].verses_html == {"1": "<h1>Exodus 1:1</h1>"}
+    # Not a TW resource asset.
+    assert tw_utils.translation_word_filepaths(tn.resource_dir) == []
@@ -0,0 +1,104 @@
+import os
+import pathlib
+import shutil
+import threading
+
+import pytest
+
+from document.domain import catalog, resource_lookup
+
+TRANSLATIONS_JSON = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "test_data",
+    "translations.json",
+)
+TRANSLATIONS_JSON_URL = "http://example.com/data/translations.json"
+
+
+@pytest.fixture()
+def working_dir(tmp_path: pathlib.Path) -> str:
+    """
+    Provide a working dir that already has a fresh translations.json
+    so that nothing is downloaded.
+    """
+    shutil.copy(TRANSLATIONS_JSON, tmp_path / "translations.json")
+    return str(tmp_path)
+
+
+def test_catalog_is_parsed_once_across_fetchers(working_dir: str) -> None:
+    shared_catalog = catalog.shared_catalog(working_dir, TRANSLATIONS_JSON_URL)
+    for _ in range(5):
+        source_data_fetcher = resource_lookup.SourceDataFetcher(
+            working_dir, TRANSLATIONS_JSON_URL
+        )
+        source_data_fetcher()
+        assert source_data_fetcher.json_data
+        assert source_data_fetcher.catalog_index.lang_name("sw") == "Kiswahili"
+    assert shared_catalog.parse_count == 1
+    assert shared_catalog.stats()["parse_count"] == 1
+
+
+def test_catalog_is_parsed_once_across_threads(working_dir: str) -> None:
+    shared_catalog = catalog.shared_catalog(working_dir, TRANSLATIONS_JSON_URL)
+    versions: list[str] = []
+
+    def snapshot_version() -> None:
+        versions.append(shared_catalog.snapshot().version)
+
+    threads = [threading.Thread(target=snapshot_version) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert shared_catalog.parse_count == 1
+    assert len(set(versions)) == 1
+
+
+def test_catalog_swaps_in_new_version_when_file_changes(working_dir: str) -> None:
+    shared_catalog = catalog.shared_catalog(working_dir, TRANSLATIONS_JSON_URL)
+    old_snapshot = shared_catalog.snapshot()
+    json_file = pathlib.Path(working_dir, "translations.json")
+    json_file.write_text('[{"name": "Tiny", "code": "tiny", "contents": []}]')
+    new_snapshot = shared_catalog.snapshot()
+    assert shared_catalog.parse_count == 2
+    assert new_snapshot.version != old_snapshot.version
+    assert "tiny" in new_snapshot.catalog_index
+    # The old snapshot is unaffected for readers still holding it.
+    assert "tiny" not in old_snapshot.catalog_index
+
+
+def test_catalog_maps_snapshot_compiled_by_another_worker(working_dir: str) -> None:
+    first_catalog = catalog.Catalog(working_dir, TRANSLATIONS_JSON_URL)
+    version = first_catalog.snapshot().version
+    assert first_catalog.parse_count == 1
+    assert first_catalog.snapshot_file.exists()
+    # A second worker finds the compiled snapshot and skips parsing.
+    second_catalog = catalog.Catalog(working_dir, TRANSLATIONS_JSON_URL)
+    snapshot = second_catalog.snapshot()
+    assert second_catalog.parse_count == 0
+    assert snapshot.version == version
+    assert isinstance(snapshot.catalog_index, catalog.MappedCatalogIndex)
+    assert snapshot.catalog_index.lang_name("sw") == "Kiswahili"
+
+
+def test_catalog_unmaps_snapshot_of_another_version(
+    working_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    catalog.Catalog(working_dir, TRANSLATIONS_JSON_URL).snapshot()
+    pathlib.Path(working_dir, "translations.json").write_text(
+        '[{"name": "Tiny", "code": "tiny", "contents": []}]'
+    )
+    closed: list[str] = []
+    close = catalog.MappedCatalogIndex.close
+
+    def recorded_close(self: catalog.MappedCatalogIndex) -> None:
+        closed.append(self.version)
+        close(self)
+
+    monkeypatch.setattr(catalog.MappedCatalogIndex, "close", recorded_close)
+    second_catalog = catalog.Catalog(working_dir, TRANSLATIONS_JSON_URL)
+    snapshot = second_catalog.snapshot()
+    assert second_catalog.parse_count == 1
+    # The stale snapshot file was unmapped before being replaced.
+    assert len(closed) == 1 and closed[0] != snapshot.version
+    assert "tiny" in snapshot.catalog_index
@@ -0,0 +1,160 @@
+import os
+import pathlib
+
+import jsonpath_rw_ext as jp
+import pytest
+
+from document.config import settings
+from document.domain import catalog
+from document.utils import file_utils
+
+TRANSLATIONS_JSON = pathlib.Path(
+    os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        "test_data",
+        "translations.json",
+    )
+)
+
+LANG_CODES = ["kbt", "ar", "as", "sw", "grc", "avd", "zz"]
+RESOURCE_TYPES = ["reg", "nav", "ulb", "udb", "tn", "tq", "tw", "zz"]
+RESOURCE_CODES = ["2co", "gen", "exo", "mat", "mrk", "zz"]
+
+
+@pytest.fixture(scope="module")
+def json_data() -> list:
+    return file_utils.load_json_object(TRANSLATIONS_JSON)
+
+
+@pytest.fixture(scope="module", params=["in_memory", "mapped"])
+def catalog_index(
+    request: pytest.FixtureRequest,
+    json_data: list,
+    tmp_path_factory: pytest.TempPathFactory,
+) -> catalog.CatalogIndex:
+    """
+    Exercise both the in-memory index and the index over a compiled,
+    memory-mapped snapshot file.
+    """
+    if request.param == "in_memory":
+        return catalog.CatalogIndex(json_data)
+    snapshot_file = str(tmp_path_factory.mktemp("snapshot") / "translations.snapshot")
+    catalog.write_snapshot_file(json_data, "test", snapshot_file)
+    return catalog.MappedCatalogIndex(snapshot_file)
+
+
+def jsonpath_values(json_path: str, json_data: list) -> set[str]:
+    """Mirror ResourceJsonLookup._lookup."""
+    return set(jp.match(json_path, json_data))
+
+
+@pytest.mark.parametrize("lang_code", LANG_CODES)
+def test_lang_names_match_jsonpath(
+    lang_code: str, json_data: list, catalog_index: catalog.CatalogIndex
+) -> None:
+    expected = jsonpath_values(
+        settings.RESOURCE_LANG_NAME_JSONPATH.format(lang_code), json_data
+    )
+    assert set(catalog_index.lang_names(lang_code)) == expected
+
+
+@pytest.mark.parametrize("lang_code", LANG_CODES)
+@pytest.mark.parametrize("resource_type", RESOURCE_TYPES)
+def test_lang_and_resource_type_lookups_match_jsonpath(
+    lang_code: str,
+    resource_type: str,
+    json_data: list,
+    catalog_index: catalog.CatalogIndex,
+) -> None:
+    assert set(
+        catalog_index.resource_type_names(lang_code, resource_type)
+    ) == jsonpath_values(
+        settings.RESOURCE_TYPE_NAME_JSONPATH.format(lang_code, resource_type),
+        json_data,
+    )
+    assert set(catalog_index.contents_urls(lang_code, resource_type)) == (
+        jsonpath_values(
+            settings.RESOURCE_URL_LEVEL1_JSONPATH.format(lang_code, resource_type),
+            json_data,
+        )
+    )
+    assert set(catalog_index.any_subcontents_urls(lang_code, resource_type)) == (
+        jsonpath_values(
+            settings.RESOURCE_URL_LEVEL2_JSONPATH.format(lang_code, resource_type),
+            json_data,
+        )
+    )
+
+
+@pytest.mark.parametrize("lang_code", LANG_CODES)
+@pytest.mark.parametrize("resource_type", RESOURCE_TYPES)
+@pytest.mark.parametrize("resource_code", RESOURCE_CODES)
+def test_resource_code_lookups_match_jsonpath(
+    lang_code: str,
+    resource_type: str,
+    resource_code: str,
+    json_data: list,
+    catalog_index: catalog.CatalogIndex,
+) -> None:
+    assert set(
+        catalog_index.subcontents_urls(
+            lang_code, resource_type, resource_code, catalog.USFM_FORMAT
+        )
+    ) == jsonpath_values(
+        settings.INDIVIDUAL_USFM_URL_JSONPATH.format(
+            lang_code, resource_type, resource_code
+        ),
+        json_data,
+    )
+    assert set(
+        catalog_index.subcontents_urls(
+            lang_code, resource_type, resource_code, catalog.DOWNLOAD_FORMAT
+        )
+    ) == jsonpath_values(
+        settings.RESOURCE_DOWNLOAD_FORMAT_JSONPATH.format(
+            lang_code, resource_type, resource_code
+        ),
+        json_data,
+    )
+
+
+def test_missing_values_are_empty(catalog_index: catalog.CatalogIndex) -> None:
+    assert catalog_index.lang_name("zz") == ""
+    assert catalog_index.resource_type_name("sw", "zz") == ""
+    assert catalog_index.contents_urls("zz", "tn") == []
+    assert "zz" not in catalog_index
+    assert "sw" in catalog_index
+
+
+def test_summaries_match_json_data(
+    json_data: list, catalog_index: catalog.CatalogIndex
+) -> None:
+    summaries = catalog_index.summaries()
+    assert [(lang.code, lang.name) for lang in summaries] == [
+        (lang["code"], lang["name"]) for lang in json_data
+    ]
+    assert [lang.contents for lang in summaries] == [
+        [
+            (
+                contents.get("code"),
+                [subcontents["code"] for subcontents in contents["subcontents"]],
+            )
+            for contents in lang["contents"]
+        ]
+        for lang in json_data
+    ]
+    assert catalog_index.json_data() == json_data
+
+
+def test_mapped_index_decodes_languages_on_demand(
+    json_data: list, tmp_path: pathlib.Path
+) -> None:
+    snapshot_file = str(tmp_path / "translations.snapshot")
+    catalog.write_snapshot_file(json_data, "test", snapshot_file)
+    mapped_index = catalog.MappedCatalogIndex(snapshot_file)
+    assert mapped_index.version == "test"
+    assert len(mapped_index.summaries()) == len(json_data)
+    assert mapped_index.decoded_languages == 0
+    assert mapped_index.lang_name("sw") == "Kiswahili"
+    assert mapped_index.contents_urls("zz", "tn") == []
+    assert mapped_index.decoded_languages == 1
@@ -0,0 +1,118 @@
+import hashlib
+import http.server
+import os
+import pathlib
+import threading
+from typing import Iterator
+
+import pytest
+
+from document.config import settings
+from document.domain import catalog
+from document.utils import file_utils
+
+TRANSLATIONS_JSON = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "test_data",
+    "translations.json",
+)
+
+
+class CatalogServer(http.server.ThreadingHTTPServer):
+    """Serve a translations.json honoring If-None-Match."""
+
+    content: bytes = b""
+    requests: list[int] = []
+
+
+class CatalogHandler(http.server.BaseHTTPRequestHandler):
+    server: CatalogServer
+
+    def do_GET(self) -> None:
+        etag = '"{}"'.format(hashlib.sha256(self.server.content).hexdigest())
+        if self.headers.get("If-None-Match") == etag:
+            self.server.requests.append(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.server.requests.append(200)
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(self.server.content)))
+        self.end_headers()
+        self.wfile.write(self.server.content)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture()
+def server() -> Iterator[CatalogServer]:
+    server = CatalogServer(("127.0.0.1", 0), CatalogHandler)
+    server.content = pathlib.Path(TRANSLATIONS_JSON).read_bytes()
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def catalog_url(server: CatalogServer) -> str:
+    return "http://127.0.0.1:{}/translations.json".format(server.server_address[1])
+
+
+def test_fetch_revalidates_with_etag(
+    server: CatalogServer, tmp_path: pathlib.Path
+) -> None:
+    a_catalog = catalog.Catalog(str(tmp_path), catalog_url(server))
+    assert a_catalog.fetch()
+    assert file_utils.read_sidecar_metadata(a_catalog.json_file)[catalog.ETAG_KEY]
+    version = a_catalog.snapshot().version
+    # Unchanged content costs a 304 and no re-parse.
+    assert not a_catalog.fetch()
+    assert server.requests == [200, 304]
+    assert a_catalog.parse_count == 1
+    assert a_catalog.snapshot().version == version
+    # Changed content is downloaded and swapped in.
+    server.content = server.content.replace(b"Kiswahili", b"Swahili")
+    assert a_catalog.fetch()
+    assert server.requests == [200, 304, 200]
+    assert a_catalog.parse_count == 2
+    assert a_catalog.snapshot().catalog_index.lang_name("sw") == "Swahili"
+
+
+def test_fetch_failure_keeps_current_snapshot(
+    server: CatalogServer, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "HTTP_BACKOFF_FACTOR", 0)
+    a_catalog = catalog.Catalog(str(tmp_path), catalog_url(server))
+    assert a_catalog.fetch()
+    snapshot = a_catalog.snapshot()
+    server.shutdown()
+    server.server_close()
+    assert not a_catalog.fetch()
+    assert a_catalog.snapshot() is snapshot
+    assert a_catalog.stats()["fetch_error_count"] == 1
+
+
+def test_refresher_refreshes_in_background(
+    server: CatalogServer, tmp_path: pathlib.Path
+) -> None:
+    a_catalog = catalog.Catalog(str(tmp_path), catalog_url(server))
+    refresher = catalog.CatalogRefresher(a_catalog, interval=0.05)
+    refresher.start()
+    try:
+        # start fetches synchronously.
+        assert a_catalog.json_file.exists()
+        assert a_catalog.refreshed_in_background
+        server.content = server.content.replace(b"Kiswahili", b"Swahili")
+        for _ in range(100):
+            if a_catalog.snapshot().catalog_index.lang_name("sw") == "Swahili":
+                break
+            threading.Event().wait(0.05)
+        assert a_catalog.snapshot().catalog_index.lang_name("sw") == "Swahili"
+    finally:
+        refresher.stop()
+    assert not a_catalog.refreshed_in_background
@@ -0,0 +1,130 @@
+import gzip
+import json
+import os
+import pathlib
+import subprocess
+import sys
+from typing import Any
+
+import pytest
+
+from document.config import settings
+from document.domain import catalog_responses, resource_lookup
+
+
+@pytest.fixture()
+def responses(
+    test_translations_json: pathlib.Path,
+) -> catalog_responses.CatalogResponses:
+    return catalog_responses.CatalogResponses()
+
+
+def lang_codes(lookup_svc: resource_lookup.BIELHelperResourceJsonLookup) -> Any:
+    return lookup_svc.lang_codes()
+
+
+def test_response_is_built_once_per_catalog_version(
+    responses: catalog_responses.CatalogResponses,
+    test_translations_json: pathlib.Path,
+) -> None:
+    first = responses.response("language_codes", lang_codes)
+    assert responses.response("language_codes", lang_codes) is first
+    assert json.loads(first.body)[:2] == ["kbt", "ar"]
+    assert gzip.decompress(first.gzipped_body) == first.body
+    assert responses.stats()["build_count"] == 1
+    test_translations_json.write_text(
+        '[{"name": "Tiny", "code": "tiny", "contents": []}]'
+    )
+    second = responses.response("language_codes", lang_codes)
+    assert json.loads(second.body) == ["tiny"]
+    assert second.etag != first.etag
+    assert responses.stats()["build_count"] == 2
+
+
+def test_triplets_serialize_like_pydantic(
+    responses: catalog_responses.CatalogResponses,
+) -> None:
+    precomputed_response = responses.response(
+        "language_codes_names_and_resource_types",
+        lambda lookup_svc: lookup_svc.lang_codes_names_and_resource_types(),
+    )
+    assert json.loads(precomputed_response.body)[0] == {
+        "lang_code": "kbt",
+        "lang_name": "Abadi",
+        "resource_types": ["reg"],
+    }
+
+
+# Build the responses of the endpoints listing resource types and codes
+# in a fresh process.
+ETAGS_SCRIPT = """
+import sys
+from document.config import settings
+from document.domain import catalog_responses
+type(settings).working_dir = lambda self: sys.argv[1]
+settings.TRANSLATIONS_JSON_LOCATION = sys.argv[2]
+responses = catalog_responses.CatalogResponses()
+for name in ["resource_types", "resource_codes"]:
+    etag = responses.response(name, lambda svc: getattr(svc, name)()).etag
+    print("ETag:", etag)
+"""
+
+
+def test_etags_are_the_same_across_workers(
+    test_translations_json: pathlib.Path,
+) -> None:
+    """
+    Workers hash strings differently, the responses, and so their
+    ETags, must not depend on it.
+    """
+    etags = [
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                ETAGS_SCRIPT,
+                str(test_translations_json.parent),
+                settings.TRANSLATIONS_JSON_LOCATION,
+            ],
+            env=dict(
+                os.environ, PYTHONHASHSEED=seed, PYTHONPATH=os.pathsep.join(sys.path)
+            ),
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.splitlines()
+        for seed in ["1", "2"]
+    ]
+    etags = [[line for line in lines if line.startswith("ETag:")] for lines in etags]
+    assert etags[0] == etags[1]
+    assert len(etags[0]) == 2
+
+
+def test_render_honors_etag_and_accept_encoding() -> None:
+    precomputed_response = catalog_responses.PrecomputedResponse(["kbt", "ar"])
+    rendered = precomputed_response.render(None, None)
+    assert rendered.status_code == 200
+    assert rendered.body == b'["kbt","ar"]'
+    assert rendered.headers["ETag"] == precomputed_response.etag
+    assert rendered.headers["Cache-Control"].startswith("public, max-age=")
+    assert "Content-Encoding" not in rendered.headers
+
+    rendered = precomputed_response.render(None, "gzip, deflate, br")
+    assert rendered.headers["Content-Encoding"] == "gzip"
+    assert rendered.headers["ETag"] == precomputed_response.gzip_etag
+    assert gzip.decompress(rendered.body) == precomputed_response.body
+
+    assert (
+        "Content-Encoding" not in precomputed_response.render(None, "gzip;q=0").headers
+    )
+
+    for if_none_match in [
+        precomputed_response.etag,
+        precomputed_response.gzip_etag,
+        'W/"other", {}'.format(precomputed_response.etag),
+        "*",
+    ]:
+        rendered = precomputed_response.render(if_none_match, "gzip")
+        assert rendered.status_code == 304
+        assert rendered.body == b""
+    assert precomputed_response.render('"other"', None).status_code == 200
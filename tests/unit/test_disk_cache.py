@@ -0,0 +1,196 @@
+import os
+import pathlib
+from typing import Optional
+
+import pytest
+
+from document.config import settings
+from document.domain import parsed_resource_cache
+from document.utils import disk_cache, file_utils
+
+
+@pytest.fixture()
+def dirs(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> tuple[pathlib.Path, pathlib.Path]:
+    working_dir, output_dir = tmp_path / "temp", tmp_path / "output"
+    working_dir.mkdir()
+    output_dir.mkdir()
+    monkeypatch.setattr(type(settings), "working_dir", lambda self: str(working_dir))
+    monkeypatch.setattr(type(settings), "output_dir", lambda self: str(output_dir))
+    return working_dir, output_dir
+
+
+def add_asset(working_dir: pathlib.Path, name: str, accessed: float) -> None:
+    asset_dir = working_dir / name / name
+    asset_dir.mkdir(parents=True)
+    for book in ["gen", "exo"]:
+        (asset_dir / "{}.md".format(book)).write_bytes(b"x" * 10000)
+    set_accessed(str(working_dir / name), accessed)
+
+
+def add_document(output_dir: pathlib.Path, key: str, accessed: float) -> None:
+    for suffix in ["html", "pdf"]:
+        (output_dir / "{}.{}".format(key, suffix)).write_bytes(b"x" * 10000)
+    set_accessed(str(output_dir / key), accessed)
+
+
+def set_accessed(path: str, accessed: float) -> None:
+    disk_cache.record_access(path)
+    lock_path = file_utils.lock_file_path("in-use:{}".format(os.path.abspath(path)))
+    os.utime(lock_path, (accessed, accessed))
+
+
+def items(working_dir: pathlib.Path, output_dir: pathlib.Path) -> list[str]:
+    return sorted(
+        [path.name for path in working_dir.iterdir() if not path.name.startswith(".")]
+        + [path.name for path in output_dir.iterdir()]
+    )
+
+
+def quota_for(
+    number_of_items: int, dirs: tuple[pathlib.Path, pathlib.Path]
+) -> tuple[int, int]:
+    """Return bytes and inodes quotas that number_of_items items just fit."""
+    sizes = disk_cache.DiskCache(1, 1, 1).items()
+    item_size = max(item.size for item in sizes)
+    item_inodes = max(item.inodes for item in sizes)
+    return item_size * number_of_items, item_inodes * number_of_items
+
+
+def test_item_path(dirs: tuple[pathlib.Path, pathlib.Path]) -> None:
+    working_dir, output_dir = dirs
+    assert disk_cache.item_path(str(working_dir / "en_tn/en_tn/01-gen/01.md")) == str(
+        working_dir / "en_tn"
+    )
+    assert disk_cache.item_path(str(working_dir / "en_tn")) == str(
+        working_dir / "en_tn"
+    )
+    assert disk_cache.item_path(str(output_dir / "en-ulb-gen_book.pdf")) == str(
+        output_dir / "en-ulb-gen_book"
+    )
+    assert disk_cache.item_path(str(working_dir / ".locks/x.lock")) is None
+    assert disk_cache.item_path(str(working_dir)) is None
+    assert disk_cache.item_path(str(working_dir / "parsed/ab/ab12.pickle")) == str(
+        working_dir / "parsed/ab/ab12.pickle"
+    )
+    assert disk_cache.item_path(str(working_dir / "parsed/ab/.tmp.x")) is None
+    assert disk_cache.item_path(str(working_dir / "parsed")) is None
+
+
+def test_least_recently_used_items_are_evicted(
+    dirs: tuple[pathlib.Path, pathlib.Path]
+) -> None:
+    working_dir, output_dir = dirs
+    add_asset(working_dir, "en_tn", accessed=400)
+    add_asset(working_dir, "en_tw", accessed=100)
+    add_document(output_dir, "en-tn-gen_book", accessed=300)
+    add_document(output_dir, "en-tn-exo_book", accessed=200)
+    (working_dir / "translations.json").write_text("[]")
+    max_bytes, max_inodes = quota_for(2, dirs)
+    cache = disk_cache.DiskCache(max_bytes * 100, max_inodes, 0.9)
+    # Over the inodes quota, evict down to 90% of it.
+    assert cache.enforce() == 2
+    assert items(working_dir, output_dir) == [
+        "en-tn-gen_book.html",
+        "en-tn-gen_book.pdf",
+        "en_tn",
+        "translations.json",
+    ]
+    stats = cache.stats()
+    assert stats["evictions"] == 2
+    assert stats["items"] == 2
+    assert stats["inodes"] <= max_inodes
+    # Within quota, nothing to do.
+    assert cache.enforce() == 0
+
+
+def test_parsed_content_is_evicted_entry_by_entry(
+    dirs: tuple[pathlib.Path, pathlib.Path]
+) -> None:
+    working_dir, output_dir = dirs
+    assert parsed_resource_cache.PARSED_DIR in disk_cache.ENTRY_DIRS
+    parsed_dir = working_dir / parsed_resource_cache.PARSED_DIR
+    for key, accessed in [("ab01", 100), ("ab02", 300), ("cd01", 200)]:
+        entry_path = parsed_dir / key[:2] / "{}.pickle".format(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        entry_path.write_bytes(b"x" * 10000)
+        set_accessed(str(entry_path), accessed)
+    (parsed_dir / "ab" / ".tmp.ab03").write_bytes(b"x" * 10000)
+    cache = disk_cache.DiskCache(10 ** 9, 1, 1)
+    assert sorted(item.path for item in cache.items()) == [
+        str(parsed_dir / "ab/ab01.pickle"),
+        str(parsed_dir / "ab/ab02.pickle"),
+        str(parsed_dir / "cd/cd01.pickle"),
+    ]
+    max_bytes, max_inodes = quota_for(1, dirs)
+    cache = disk_cache.DiskCache(max_bytes, max_inodes * 100, 1)
+    # Requests using one entry keep only that entry from being evicted.
+    with disk_cache.in_use([str(parsed_dir / "ab/ab02.pickle")]):
+        assert cache.enforce() == 2
+    assert sorted(
+        str(path.relative_to(parsed_dir)) for path in parsed_dir.rglob("*.pickle")
+    ) == ["ab/ab02.pickle"]
+
+
+def test_items_never_used_are_evicted(dirs: tuple[pathlib.Path, pathlib.Path]) -> None:
+    working_dir, output_dir = dirs
+    add_asset(working_dir, "en_tn", accessed=100)
+    # Acquired by something other than a document request.
+    (working_dir / "en_tw").mkdir()
+    cache = disk_cache.DiskCache(1, 1, 1)
+    assert cache.enforce() == 2
+    assert items(working_dir, output_dir) == []
+    # Their lock files go with them.
+    for name in ["en_tn", "en_tw"]:
+        assert not os.path.exists(
+            file_utils.lock_file_path("in-use:{}".format(working_dir / name))
+        )
+
+
+def test_items_in_use_are_never_evicted(
+    dirs: tuple[pathlib.Path, pathlib.Path]
+) -> None:
+    working_dir, output_dir = dirs
+    add_asset(working_dir, "en_tn", accessed=100)
+    add_asset(working_dir, "en_tw", accessed=200)
+    add_asset(working_dir, "en_tq", accessed=300)
+    max_bytes, max_inodes = quota_for(2, dirs)
+    cache = disk_cache.DiskCache(max_bytes, max_inodes * 100, 1)
+    with disk_cache.in_use(
+        [str(working_dir / "en_tn" / "en_tn"), str(output_dir / "en-tn-gen.pdf")]
+    ):
+        # A long running request, others used en_tw since.
+        set_accessed(str(working_dir / "en_tn"), 100)
+        assert cache.enforce() == 1
+    assert items(working_dir, output_dir) == ["en_tn", "en_tq"]
+    assert cache.stats()["skipped_in_use"] == 1
+    # Now that it is no longer in use, it goes first.
+    add_asset(working_dir, "en_tw", accessed=200)
+    assert cache.enforce() == 1
+    assert items(working_dir, output_dir) == ["en_tq", "en_tw"]
+
+
+def test_interrupted_eviction_is_finished(
+    dirs: tuple[pathlib.Path, pathlib.Path]
+) -> None:
+    working_dir, output_dir = dirs
+    add_asset(working_dir, "en_tn", accessed=100)
+    os.replace(working_dir / "en_tn", working_dir / ".evicting.en_tn")
+    cache = disk_cache.DiskCache(10 ** 9, 10 ** 6, 1)
+    assert cache.enforce() == 0
+    assert not (working_dir / ".evicting.en_tn").exists()
+
+
+def test_only_one_process_evicts_at_a_time(
+    dirs: tuple[pathlib.Path, pathlib.Path]
+) -> None:
+    working_dir, output_dir = dirs
+    add_asset(working_dir, "en_tn", accessed=100)
+    cache = disk_cache.DiskCache(1, 1, 1)
+    last_enforced: Optional[float] = None
+    with file_utils.file_lock(disk_cache.EVICTION_LOCK_KEY):
+        assert cache.enforce() == 0
+        last_enforced = cache.stats()["last_enforced"]
+    assert last_enforced is None
+    assert items(working_dir, output_dir) == ["en_tn"]
@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+import pathlib
+import threading
+import time
+
+from document.utils import file_utils
+
+
+def acquire_once(asset: pathlib.Path, lock_dir: pathlib.Path) -> None:
+    """Acquire asset, appending to it, unless another holder already did."""
+    with file_utils.file_lock(str(asset), str(lock_dir)):
+        if not asset.exists():
+            time.sleep(0.2)
+            with asset.open("a") as fp:
+                fp.write("acquired\n")
+
+
+def test_file_lock_is_single_flight_across_threads(tmp_path: pathlib.Path) -> None:
+    asset = tmp_path / "sw_tn.zip"
+    stats_before = file_utils.lock_stats()
+    threads = [
+        threading.Thread(target=acquire_once, args=(asset, tmp_path / "locks"))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert asset.read_text() == "acquired\n"
+    stats = file_utils.lock_stats()
+    assert stats["acquisitions"] - stats_before["acquisitions"] == 4
+    assert stats["contended_acquisitions"] > stats_before["contended_acquisitions"]
+    assert stats["max_wait_seconds"] > 0
+
+
+def test_file_lock_is_single_flight_across_processes(tmp_path: pathlib.Path) -> None:
+    asset = tmp_path / "sw_tq.zip"
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=acquire_once, args=(asset, tmp_path / "locks"))
+        for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0, 0, 0]
+    assert asset.read_text() == "acquired\n"
+
+
+def test_lock_files_live_in_working_dir() -> None:
+    path = file_utils.lock_file_path("working/temp/sw_tn/sw_tn.zip")
+    assert os.path.dirname(path).endswith(file_utils.LOCKS_DIR)
+    assert path != file_utils.lock_file_path("working/temp/sw_tq/sw_tq.zip")
+
+
+def test_shared_holders_exclude_only_exclusive_ones(tmp_path: pathlib.Path) -> None:
+    key, lock_dir = str(tmp_path / "sw_tn"), str(tmp_path / "locks")
+    with file_utils.file_lock(key, lock_dir, shared=True):
+        with file_utils.file_lock(key, lock_dir, shared=True):
+            with file_utils.try_file_lock(key, lock_dir) as acquired:
+                assert not acquired
+    with file_utils.try_file_lock(key, lock_dir) as acquired:
+        assert acquired
+
+
+def test_lock_file_removed_while_waiting_on_it(tmp_path: pathlib.Path) -> None:
+    key, lock_dir = str(tmp_path / "sw_tn"), str(tmp_path / "locks")
+    acquired, release = threading.Event(), threading.Event()
+
+    def hold_lock() -> None:
+        with file_utils.file_lock(key, lock_dir, shared=True):
+            acquired.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold_lock)
+    with file_utils.file_lock(key, lock_dir):
+        thread.start()
+        time.sleep(0.2)
+        file_utils.remove_lock_file(key, lock_dir)
+    assert acquired.wait(5)
+    # The waiter holds the lock file that is there now.
+    with file_utils.try_file_lock(key, lock_dir) as acquired_too:
+        assert not acquired_too
+    release.set()
+    thread.join()
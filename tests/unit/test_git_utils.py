@@ -0,0 +1,235 @@
+import os
+import pathlib
+import subprocess
+from typing import Optional
+
+import pytest
+
+from document.utils import git_utils
+
+GIT_IDENTITY = ["-c", "user.name=Test", "-c", "user.email=test@example.com"]
+
+
+def git(*args: str, cwd: pathlib.Path) -> str:
+    return subprocess.run(
+        ["git", *GIT_IDENTITY, *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def commit(work_dir: pathlib.Path, files: dict[str, Optional[str]]) -> str:
+    """Commit files, None content meaning delete, and push the commit."""
+    for name, content in files.items():
+        path = work_dir / name
+        if content is None:
+            path.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+    git("add", "-A", cwd=work_dir)
+    git("commit", "-q", "-m", "Update", cwd=work_dir)
+    git("push", "-q", "origin", "HEAD", cwd=work_dir)
+    return git("rev-parse", "HEAD", cwd=work_dir)
+
+
+@pytest.fixture()
+def remote(tmp_path: pathlib.Path) -> tuple[str, pathlib.Path]:
+    """
+    A local bare repo standing in for a remote resource repo, and a
+    working copy from which to push to it.
+    """
+    bare_dir = tmp_path / "en_tn.git"
+    git("init", "-q", "--bare", "--initial-branch=master", str(bare_dir), cwd=tmp_path)
+    # Serve partial clones over file URLs, as git hosts do.
+    git("config", "uploadpack.allowFilter", "true", cwd=bare_dir)
+    work_dir = tmp_path / "work"
+    git("clone", "-q", str(bare_dir), str(work_dir), cwd=tmp_path)
+    commit(work_dir, {"01-gen/01/01.md": "# Genesis 1:1", "manifest.yaml": "v1"})
+    # A file URL, git ignores --depth for plain local paths.
+    return "file://{}".format(bare_dir), work_dir
+
+
+@pytest.fixture()
+def git_calls(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Record the git subcommands that git_utils runs."""
+    calls: list[str] = []
+    _git = git_utils._git
+
+    def recording_git(*args: str, cwd: Optional[str] = None) -> str:
+        calls.append(args[0])
+        return _git(*args, cwd=cwd)
+
+    monkeypatch.setattr(git_utils, "_git", recording_git)
+    return calls
+
+
+def test_refresh_is_a_no_op_when_remote_is_unchanged(
+    remote: tuple[str, pathlib.Path], tmp_path: pathlib.Path, git_calls: list[str]
+) -> None:
+    url, _ = remote
+    repo_dir = tmp_path / "en_tn"
+    assert git_utils.refresh_repo(url, str(repo_dir)) == git_utils.CLONED
+    assert (repo_dir / "01-gen/01/01.md").read_text() == "# Genesis 1:1"
+    os.utime(repo_dir, (0, 0))
+    git_calls.clear()
+    assert git_utils.refresh_repo(url, str(repo_dir)) == git_utils.UNCHANGED
+    assert git_calls == ["rev-parse", "ls-remote"]
+    # It is fresh again.
+    assert repo_dir.stat().st_mtime > 0
+
+
+def test_refresh_fetches_and_resets_to_remote_head(
+    remote: tuple[str, pathlib.Path], tmp_path: pathlib.Path, git_calls: list[str]
+) -> None:
+    url, work_dir = remote
+    repo_dir = tmp_path / "en_tn"
+    git_utils.refresh_repo(url, str(repo_dir))
+    (repo_dir / "scratch.txt").write_text("left behind")
+    (repo_dir / "manifest.yaml").write_text("locally modified")
+    head = commit(
+        work_dir, {"01-gen/01/01.md": None, "01-gen/01/02.md": "# Genesis 1:2"}
+    )
+    git_calls.clear()
+    assert git_utils.refresh_repo(url, str(repo_dir)) == git_utils.UPDATED
+    assert "clone" not in git_calls
+    assert git_utils.local_head(str(repo_dir)) == head
+    assert sorted(
+        str(path.relative_to(repo_dir))
+        for path in repo_dir.rglob("*")
+        if path.is_file() and ".git" not in path.parts
+    ) == ["01-gen/01/02.md", "manifest.yaml"]
+    assert (repo_dir / "manifest.yaml").read_text() == "v1"
+    # The clone stays shallow.
+    assert git("rev-list", "--count", "HEAD", cwd=repo_dir) == "1"
+
+
+def test_corrupt_repo_is_cloned_again(
+    remote: tuple[str, pathlib.Path], tmp_path: pathlib.Path
+) -> None:
+    url, work_dir = remote
+    repo_dir = tmp_path / "en_tn"
+    git_utils.refresh_repo(url, str(repo_dir))
+    head = commit(work_dir, {"manifest.yaml": "v2"})
+    for path in (repo_dir / ".git" / "objects").rglob("*"):
+        if path.is_file():
+            path.chmod(0o644)
+            path.unlink()
+    assert git_utils.refresh_repo(url, str(repo_dir)) == git_utils.CLONED
+    assert git_utils.local_head(str(repo_dir)) == head
+    assert (repo_dir / "manifest.yaml").read_text() == "v2"
+
+
+def test_unreachable_remote_keeps_existing_clone(
+    remote: tuple[str, pathlib.Path], tmp_path: pathlib.Path
+) -> None:
+    url, _ = remote
+    repo_dir = tmp_path / "en_tn"
+    git_utils.refresh_repo(url, str(repo_dir))
+    os.utime(repo_dir, (0, 0))
+    assert (
+        git_utils.refresh_repo("file://{}/missing.git".format(tmp_path), str(repo_dir))
+        == git_utils.STALE
+    )
+    assert (repo_dir / "manifest.yaml").read_text() == "v1"
+    # It is fresh again, so that requests don't each try again until
+    # it is due for revalidation.
+    assert repo_dir.stat().st_mtime > 0
+
+
+def test_failed_clone_leaves_nothing_behind(tmp_path: pathlib.Path) -> None:
+    repo_dir = tmp_path / "en_tn"
+    with pytest.raises(subprocess.CalledProcessError):
+        git_utils.refresh_repo("file://{}/missing.git".format(tmp_path), str(repo_dir))
+    assert list(tmp_path.iterdir()) == []
+
+
+GENESIS_PATTERNS = ["/*", "!/*/", "/front/", "*[gG][eE][nN]/"]
+EXODUS_PATTERNS = ["/*", "!/*/", "/front/", "*[eE][xX][oO]/"]
+
+
+def checked_out_files(repo_dir: pathlib.Path) -> list[str]:
+    return sorted(
+        str(path.relative_to(repo_dir))
+        for path in repo_dir.rglob("*")
+        if path.is_file() and ".git" not in path.parts
+    )
+
+
+@pytest.fixture()
+def books(remote: tuple[str, pathlib.Path]) -> tuple[str, pathlib.Path]:
+    url, work_dir = remote
+    commit(
+        work_dir,
+        {
+            "front/intro.md": "# Introduction",
+            "02-exo/01/01.md": "# Exodus 1:1",
+            "03-lev/01/01.md": "# Leviticus 1:1",
+        },
+    )
+    return url, work_dir
+
+
+def test_sparse_clone_checks_out_only_the_requested_book(
+    books: tuple[str, pathlib.Path], tmp_path: pathlib.Path
+) -> None:
+    url, _ = books
+    repo_dir = tmp_path / "en_tn"
+    assert (
+        git_utils.refresh_repo(url, str(repo_dir), GENESIS_PATTERNS) == git_utils.CLONED
+    )
+    assert checked_out_files(repo_dir) == [
+        "01-gen/01/01.md",
+        "front/intro.md",
+        "manifest.yaml",
+    ]
+    # The contents of the other books' files were not even fetched.
+    assert (
+        git("rev-list", "--objects", "--missing=print", "HEAD", cwd=repo_dir).count("?")
+        == 2
+    )
+
+
+def test_sparse_checkout_is_widened_to_more_books(
+    books: tuple[str, pathlib.Path], tmp_path: pathlib.Path, git_calls: list[str]
+) -> None:
+    url, _ = books
+    repo_dir = tmp_path / "en_tn"
+    git_utils.refresh_repo(url, str(repo_dir), GENESIS_PATTERNS)
+    git_calls.clear()
+    assert git_utils.include_in_sparse_checkout(str(repo_dir), EXODUS_PATTERNS)
+    assert "clone" not in git_calls and "fetch" not in git_calls
+    assert checked_out_files(repo_dir) == [
+        "01-gen/01/01.md",
+        "02-exo/01/01.md",
+        "front/intro.md",
+        "manifest.yaml",
+    ]
+    assert not git_utils.include_in_sparse_checkout(str(repo_dir), GENESIS_PATTERNS)
+
+
+def test_refreshed_sparse_clone_stays_sparse(
+    books: tuple[str, pathlib.Path], tmp_path: pathlib.Path, git_calls: list[str]
+) -> None:
+    url, work_dir = books
+    repo_dir = tmp_path / "en_tn"
+    git_utils.refresh_repo(url, str(repo_dir), GENESIS_PATTERNS)
+    head = commit(
+        work_dir,
+        {"01-gen/01/01.md": "# Revised Genesis 1:1", "03-lev/01/02.md": "# Lev 1:2"},
+    )
+    git_calls.clear()
+    assert (
+        git_utils.refresh_repo(url, str(repo_dir), EXODUS_PATTERNS) == git_utils.UPDATED
+    )
+    assert "clone" not in git_calls
+    assert git_utils.local_head(str(repo_dir)) == head
+    assert checked_out_files(repo_dir) == [
+        "01-gen/01/01.md",
+        "02-exo/01/01.md",
+        "front/intro.md",
+        "manifest.yaml",
+    ]
+    assert (repo_dir / "01-gen/01/01.md").read_text() == "# Revised Genesis 1:1"
@@ -0,0 +1,48 @@
+from document.utils import html_parsing_utils
+
+# Verse 1's text reads as markup once its chapter's HTML is parsed
+# again.
+HTML = (
+    '<div class="bible-book-text"><h2 id="019-ch-001" class="c-num">Chapter 1</h2>'
+    '<p><span id="019-ch-001-v-001" class="v-num"><sup><b>1</b></sup></span>'
+    " Selah &lt;i&gt;</p>"
+    '<p><span id="019-ch-001-v-002" class="v-num"><sup><b>2</b></sup></span>'
+    " Amen</p>"
+    '<h2 id="019-ch-002" class="c-num">Chapter 2</h2>'
+    '<p><span id="019-ch-002-v-001" class="v-num"><sup><b>1</b></sup></span>'
+    " Praise</p></div>"
+)
+
+
+def test_split_usfm_html_parses_text_again() -> None:
+    chapters = html_parsing_utils.split_usfm_html(HTML, "19")
+    assert [chapter.chapter_num for chapter in chapters] == [1, 2]
+    assert chapters[0].chapter_content == [
+        '<h2 class="c-num" id="019-ch-001">Chapter 1</h2>',
+        "Chapter 1",
+        '<p><span class="v-num" id="019-ch-001-v-001"><sup><b>1</b></sup></span>'
+        " Selah &lt;i&gt;</p>",
+        '<span class="v-num" id="019-ch-001-v-001"><sup><b>1</b></sup></span>',
+        "<sup><b>1</b></sup>",
+        "<b>1</b>",
+        "1",
+        " Selah <i>",
+        '<p><span class="v-num" id="019-ch-001-v-002"><sup><b>2</b></sup></span>'
+        " Amen</p>",
+        '<span class="v-num" id="019-ch-001-v-002"><sup><b>2</b></sup></span>',
+        "<sup><b>2</b></sup>",
+        "<b>2</b>",
+        "2",
+        " Amen",
+    ]
+    assert chapters[0].chapter_verses == {
+        "1": '<span class="v-num" id="019-ch-001-v-001"><sup><b>1</b></sup></span>'
+        " Selah <i>",
+        "2": '<span class="v-num" id="019-ch-001-v-002"><sup><b>2</b></sup></span>'
+        " Amen",
+    }
+    assert chapters[1].chapter_verses == {
+        "1": '<span class="v-num" id="019-ch-002-v-001"><sup><b>1</b></sup></span>'
+        " Praise"
+    }
+    assert chapters[0].chapter_footnotes == chapters[1].chapter_footnotes == ""
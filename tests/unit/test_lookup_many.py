@@ -0,0 +1,68 @@
+import pathlib
+
+import pytest
+
+from document.domain import model, resource_lookup
+
+RESOURCE_REQUESTS = [
+    model.ResourceRequest(lang_code="ar", resource_type="nav", resource_code="gen"),
+    model.ResourceRequest(lang_code="ar", resource_type="nav", resource_code="exo"),
+    model.ResourceRequest(lang_code="kbt", resource_type="reg", resource_code="2co"),
+    model.ResourceRequest(lang_code="sw", resource_type="ulb", resource_code="mat"),
+    model.ResourceRequest(lang_code="sw", resource_type="tn", resource_code="mat"),
+    model.ResourceRequest(lang_code="sw", resource_type="tn", resource_code="mrk"),
+    model.ResourceRequest(lang_code="as", resource_type="tn", resource_code="gen"),
+    model.ResourceRequest(lang_code="en", resource_type="ulb-wa", resource_code="gen"),
+    model.ResourceRequest(lang_code="zz", resource_type="tq", resource_code="gen"),
+]
+
+
+def lookup_one(resource_request: model.ResourceRequest) -> model.ResourceLookupDto:
+    """Look up resource_request the way Resource.find_location does."""
+    finder: resource_lookup.ResourceLookup
+    if resource_request.resource_type in ["tn", "tq", "tw"]:
+        finder = resource_lookup.TResourceJsonLookup()
+    else:
+        finder = resource_lookup.USFMResourceJsonLookup()
+    return finder.lookup(
+        resource_request.lang_code,
+        resource_request.resource_type,
+        resource_request.resource_code,
+    )
+
+
+def test_lookup_many_matches_lookup(test_translations_json: pathlib.Path) -> None:
+    resource_lookup_dtos = resource_lookup.lookup_many(RESOURCE_REQUESTS)
+    assert list(resource_lookup_dtos) == RESOURCE_REQUESTS
+    for resource_request in RESOURCE_REQUESTS:
+        assert resource_lookup_dtos[resource_request] == lookup_one(resource_request)
+    assert resource_lookup_dtos[RESOURCE_REQUESTS[4]].url
+    assert resource_lookup_dtos[RESOURCE_REQUESTS[4]].lang_name == "Kiswahili"
+    assert resource_lookup_dtos[RESOURCE_REQUESTS[-1]].url is None
+
+
+def test_lookup_many_resolves_shared_fields_once(
+    test_translations_json: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    lang_name_calls: list[str] = []
+    lang_name = resource_lookup.catalog.CatalogIndex.lang_name
+
+    def counting_lang_name(self, lang_code: str) -> str:  # type: ignore
+        lang_name_calls.append(lang_code)
+        return lang_name(self, lang_code)
+
+    monkeypatch.setattr(
+        resource_lookup.catalog.CatalogIndex, "lang_name", counting_lang_name
+    )
+    resource_requests = [
+        model.ResourceRequest(
+            lang_code="sw", resource_type=resource_type, resource_code=resource_code
+        )
+        for resource_type in ["tn", "tq"]
+        for resource_code in ["mat", "mrk", "luk"]
+    ]
+    resource_lookup_dtos = resource_lookup.lookup_many(resource_requests)
+    assert lang_name_calls == ["sw"]
+    # The location of TN does not depend on the book so all of the TN
+    # requests share it.
+    assert len({id(resource_lookup_dtos[rr]) for rr in resource_requests[:3]}) == 1
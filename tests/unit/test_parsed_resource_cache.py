@@ -0,0 +1,156 @@
+import pathlib
+
+import pytest
+
+from document.domain import model, parsed_resource_cache, resource
+
+TN_MEMBERS = {
+    "en_tn/manifest.yaml": "dublin_core: {}",
+    "en_tn/01-gen/front/intro.md": "# Introduction to Genesis",
+    "en_tn/01-gen/01/01.md": "# Genesis 1:1",
+    "en_tn/01-gen/01/02.md": "# Genesis 1:2",
+}
+
+
+@pytest.fixture()
+def zip_assets() -> dict[str, dict[str, str]]:
+    return {"en_tn.zip": TN_MEMBERS}
+
+
+def provisioned_resource(working_dir: pathlib.Path) -> resource.Resource:
+    resource_request = model.ResourceRequest(
+        lang_code="en", resource_type="tn", resource_code="gen"
+    )
+    provisioned = resource.resource_factory(
+        str(working_dir), str(working_dir), resource_request, [resource_request]
+    )
+    provisioned.set_location(
+        model.ResourceLookupDto(
+            url="https://example.com/en_tn.zip",
+            source=model.AssetSourceEnum.ZIP,
+            jsonpath=None,
+            lang_name="English",
+            resource_type_name="Translation Notes",
+        )
+    )
+    provisioned.provision_asset_files()
+    return provisioned
+
+
+def not_parsed(self: resource.Resource) -> None:
+    raise AssertionError("{} was parsed".format(self))
+
+
+def test_cached_content_is_reused(
+    test_translations_json: pathlib.Path,
+    downloads: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    working_dir = test_translations_json.parent
+    cache = parsed_resource_cache.ParsedResourceCache(max_memory_bytes=0)
+    parsed = provisioned_resource(working_dir)
+    assert parsed.asset_version
+    assert not cache.update_resource_with_asset_content(parsed).cached
+
+    monkeypatch.setattr(
+        resource.TNResource, "update_resource_with_asset_content", not_parsed
+    )
+    loaded = provisioned_resource(working_dir)
+    outcome = cache.update_resource_with_asset_content(loaded)
+    assert outcome.cached
+    assert outcome.parse_seconds > 0
+    assert loaded.payload == parsed.payload
+    assert loaded.payload is not parsed.payload
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_content_is_parsed_again_when_the_asset_changes(
+    test_translations_json: pathlib.Path, downloads: list[str]
+) -> None:
+    working_dir = test_translations_json.parent
+    cache = parsed_resource_cache.ParsedResourceCache(max_memory_bytes=0)
+    cache.update_resource_with_asset_content(provisioned_resource(working_dir))
+    changed = provisioned_resource(working_dir)
+    changed.asset_version = "a newer version"
+    assert not cache.update_resource_with_asset_content(changed).cached
+    # Nothing is cached when the asset's version is unknown.
+    unknown = provisioned_resource(working_dir)
+    unknown.asset_version = None
+    assert not cache.update_resource_with_asset_content(unknown).cached
+    unknown = provisioned_resource(working_dir)
+    unknown.asset_version = None
+    assert not cache.update_resource_with_asset_content(unknown).cached
+    assert cache.stats()["uncacheable"] == 2
+
+
+def test_unreadable_content_is_parsed_again(
+    test_translations_json: pathlib.Path, downloads: list[str]
+) -> None:
+    working_dir = test_translations_json.parent
+    cache = parsed_resource_cache.ParsedResourceCache(max_memory_bytes=0)
+    parsed = provisioned_resource(working_dir)
+    cache.update_resource_with_asset_content(parsed)
+    [entry] = (working_dir / parsed_resource_cache.PARSED_DIR).rglob("*.pickle")
+    entry.write_bytes(entry.read_bytes()[:10])
+    reparsed = provisioned_resource(working_dir)
+    assert not cache.update_resource_with_asset_content(reparsed).cached
+    assert reparsed.payload == parsed.payload
+    assert cache.stats()["errors"] == 1
+    assert cache.update_resource_with_asset_content(
+        provisioned_resource(working_dir)
+    ).cached
+
+
+def test_recently_used_content_is_kept_in_memory(
+    test_translations_json: pathlib.Path,
+    downloads: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    working_dir = test_translations_json.parent
+    cache = parsed_resource_cache.ParsedResourceCache(max_memory_bytes=1024**2)
+    parsed = provisioned_resource(working_dir)
+    cache.update_resource_with_asset_content(parsed)
+    # Neither parsed again nor read from disk.
+    monkeypatch.setattr(
+        resource.TNResource, "update_resource_with_asset_content", not_parsed
+    )
+    for entry in (working_dir / parsed_resource_cache.PARSED_DIR).rglob("*.pickle"):
+        entry.unlink()
+    loaded = provisioned_resource(working_dir)
+    assert cache.update_resource_with_asset_content(loaded).cached
+    assert loaded.payload == parsed.payload
+    stats = cache.stats()
+    assert (stats["hits"], stats["memory_hits"]) == (1, 1)
+    assert stats["memory"]["size"] == 1
+    assert 0 < stats["memory"]["bytes"] <= 1024**2
+
+
+def test_memory_is_bounded_in_bytes() -> None:
+    lru = parsed_resource_cache.ParsedPayloadLRU(max_bytes=100)
+    lru.put("a", 1.0, "A", 40)
+    lru.put("b", 1.0, "B", 40)
+    assert lru.get("a") == (1.0, "A")
+    # b is the least recently used.
+    lru.put("c", 1.0, "C", 40)
+    assert lru.get("b") is None
+    assert lru.get("a") == (1.0, "A")
+    # Too large to cache at all.
+    lru.put("d", 1.0, "D", 101)
+    assert lru.get("d") is None
+    stats = lru.stats()
+    assert (stats["size"], stats["bytes"], stats["evictions"]) == (2, 80, 1)
+
+
+def test_translation_words_are_copied() -> None:
+    """TWResource modifies its payload after parsing, see _copy."""
+    payload = model.TWLanguagePayload(
+        name_content_pairs=[
+            model.TWNameContentPair(localized_word="God", content="<h3>God</h3>")
+        ]
+    )
+    copy = parsed_resource_cache._copy(payload)
+    copy.name_content_pairs[0].content = "<h3 id='God'>God</h3>"
+    copy.uses["God"] = []
+    assert payload.name_content_pairs[0].content == "<h3>God</h3>"
+    assert payload.uses == {}
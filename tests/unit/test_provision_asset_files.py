@@ -0,0 +1,94 @@
+import threading
+import time
+from typing import Optional
+
+import pytest
+
+from document.config import settings
+from document.domain import resource
+
+
+class FakeResource:
+    """Stand in for a Resource whose asset takes a while to acquire."""
+
+    def __init__(
+        self,
+        resource_dir: str,
+        resource_url: str,
+        acquired: set[tuple[str, str]],
+        error: Optional[Exception] = None,
+    ) -> None:
+        self.resource_dir = resource_dir
+        self.resource_url = resource_url
+        self.provisioned = False
+        self._acquired = acquired
+        self._error = error
+
+    def provision_asset_files(self) -> None:
+        if self._error:
+            raise self._error
+        asset = (self.resource_dir, self.resource_url)
+        if asset not in self._acquired:
+            time.sleep(0.2)
+            self._acquired.add(asset)
+        self.provisioned = True
+
+
+def test_assets_are_provisioned_concurrently_and_once() -> None:
+    acquired: set[tuple[str, str]] = set()
+    resources = [
+        FakeResource("sw_tn", "https://a.example.com/sw_tn.zip", acquired),
+        FakeResource("sw_tn", "https://a.example.com/sw_tn.zip", acquired),
+        FakeResource("sw_tn", "https://a.example.com/sw_tn.zip", acquired),
+        FakeResource("sw_ulb", "https://b.example.com/sw_mat.usfm", acquired),
+        FakeResource("sw_ulb", "https://b.example.com/sw_mrk.usfm", acquired),
+        FakeResource("sw_tq", "https://c.example.com/sw_tq.zip", acquired),
+    ]
+    start = time.perf_counter()
+    failed_resources = resource.provision_asset_files(resources)  # type: ignore
+    elapsed = time.perf_counter() - start
+    assert failed_resources == []
+    assert all(fake_resource.provisioned for fake_resource in resources)
+    assert len(acquired) == 4
+    # Four assets taking 0.2s each were acquired in parallel.
+    assert elapsed < 0.6
+
+
+def test_failures_are_collected() -> None:
+    acquired: set[tuple[str, str]] = set()
+    failing = [
+        FakeResource("zz_tn", "https://d.example.com/zz_tn.zip", acquired, OSError()),
+        FakeResource("zz_tn", "https://d.example.com/zz_tn.zip", acquired, OSError()),
+    ]
+    succeeding = FakeResource("sw_tq", "https://d.example.com/sw_tq.zip", acquired)
+    failed_resources = resource.provision_asset_files(  # type: ignore
+        [failing[0], succeeding, failing[1]]
+    )
+    assert failed_resources == failing
+    assert succeeding.provisioned
+
+
+def test_connections_per_host_are_limited(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "PROVISIONING_MAX_CONNECTIONS_PER_HOST", 1)
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    class CountingResource(FakeResource):
+        def provision_asset_files(self) -> None:
+            nonlocal active, max_active
+            with lock:
+                active += 1
+                max_active = max(max_active, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+    resources = [
+        CountingResource(
+            "l{}_tn".format(i), "https://limited.example.com/{}.zip".format(i), set()
+        )
+        for i in range(4)
+    ]
+    assert resource.provision_asset_files(resources) == []  # type: ignore
+    assert max_active == 1
@@ -0,0 +1,66 @@
+import pathlib
+from typing import Optional
+
+from document.domain import model, resource_lookup
+
+
+def dto(url: Optional[str]) -> model.ResourceLookupDto:
+    return model.ResourceLookupDto(
+        url=url,
+        source=model.AssetSourceEnum.ZIP,
+        jsonpath="$",
+        lang_name="",
+        resource_type_name="",
+    )
+
+
+def test_cache_is_lru_bounded() -> None:
+    cache = resource_lookup.ResourceLookupDtoCache(maxsize=2)
+    for key in ["a", "b", "a", "c"]:
+        cache.get_or_lookup("v1", (key,), lambda: dto("http://example.com/x.zip"))
+    # b was least recently used when c was added.
+    assert cache.get_or_lookup("v1", ("a",), lambda: dto(None)).url
+    assert cache.get_or_lookup("v1", ("b",), lambda: dto(None)).url is None
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 2
+    assert stats["hits"] == 2
+    assert stats["misses"] == 4
+
+
+def test_cache_keeps_negative_results_until_catalog_changes() -> None:
+    cache = resource_lookup.ResourceLookupDtoCache(maxsize=8)
+    lookups: list[str] = []
+
+    def lookup() -> model.ResourceLookupDto:
+        lookups.append("zz")
+        return dto(None)
+
+    for _ in range(3):
+        assert cache.get_or_lookup("v1", ("zz",), lookup).url is None
+    assert lookups == ["zz"]
+    assert cache.stats()["negative_hits"] == 2
+    cache.get_or_lookup("v2", ("zz",), lookup)
+    assert lookups == ["zz", "zz"]
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_lookups_are_cached(test_translations_json: pathlib.Path) -> None:
+    first = resource_lookup.TResourceJsonLookup().lookup("zz", "tn", "gen")
+    second = resource_lookup.TResourceJsonLookup().lookup("zz", "tn", "gen")
+    assert first.url is None
+    assert second is first
+    found = resource_lookup.USFMResourceJsonLookup().lookup("ar", "nav", "gen")
+    assert found.url
+    assert resource_lookup.USFMResourceJsonLookup().lookup("ar", "nav", "gen") is found
+    stats = resource_lookup.resource_lookup_dto_cache.stats()
+    assert stats["hits"] == 2
+    assert stats["negative_hits"] == 1
+    # A new version of the catalog invalidates the cache.
+    test_translations_json.write_text(
+        '[{"name": "Tiny", "code": "tiny", "contents": []}]'
+    )
+    resource_lookup_dto = resource_lookup.USFMResourceJsonLookup().lookup(
+        "ar", "nav", "gen"
+    )
+    assert resource_lookup_dto.url is None
@@ -0,0 +1,162 @@
+import pathlib
+
+import pytest
+
+from document.config import settings
+from document.domain import model, resource
+from document.utils import asset_fs, tw_utils
+from tests.unit.conftest import zip_bytes
+
+TN_MEMBERS = {
+    "en_tn/manifest.yaml": "dublin_core: {}",
+    "en_tn/front/intro.md": "# Introduction",
+    "en_tn/01-gen/front/intro.md": "# Introduction to Genesis",
+    "en_tn/01-gen/01/01.md": "# Genesis 1:1",
+    "en_tn/01-gen/01/02.md": "# Genesis 1:2",
+    "en_tn/02-exo/01/01.md": "# Exodus 1:1",
+}
+TW_MEMBERS = {
+    "en_tw/manifest.yaml": "dublin_core: {}",
+    "en_tw/bible/kt/god.md": "# God",
+    "en_tw/bible/names/abraham.md": "# Abraham",
+    "en_tw/bible/other/bread.md": "# bread",
+}
+
+
+@pytest.fixture()
+def zip_assets() -> dict[str, dict[str, str]]:
+    return {"en_tn.zip": TN_MEMBERS, "en_tw.zip": TW_MEMBERS}
+
+
+@pytest.fixture()
+def extract(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Extract zip assets rather than read them in place."""
+    monkeypatch.setattr(settings, "ASSET_ZIPS_READ_IN_PLACE", False)
+
+
+def located_resource(
+    resource_type: str, resource_code: str, working_dir: pathlib.Path
+) -> resource.Resource:
+    resource_request = model.ResourceRequest(
+        lang_code="en", resource_type=resource_type, resource_code=resource_code
+    )
+    located = resource.resource_factory(
+        str(working_dir), str(working_dir), resource_request, [resource_request]
+    )
+    located.set_location(
+        model.ResourceLookupDto(
+            url="https://example.com/en_{}.zip".format(resource_type),
+            source=model.AssetSourceEnum.ZIP,
+            jsonpath=None,
+            lang_name="English",
+            resource_type_name=resource_type,
+        )
+    )
+    return located
+
+
+def extracted_files(resource_dir: pathlib.Path) -> list[str]:
+    return sorted(
+        str(path.relative_to(resource_dir))
+        for path in resource_dir.rglob("*")
+        if path.is_file() and path.suffix not in [".zip", ".json"]
+    )
+
+
+def test_only_the_requested_book_is_extracted(
+    test_translations_json: pathlib.Path, downloads: list[str], extract: None
+) -> None:
+    working_dir = test_translations_json.parent
+    genesis = located_resource("tn", "gen", working_dir)
+    genesis.provision_asset_files()
+    assert genesis.resource_dir == str(working_dir / "en_tn" / "en_tn")
+    assert extracted_files(working_dir / "en_tn") == [
+        "en_tn/01-gen/01/01.md",
+        "en_tn/01-gen/01/02.md",
+        "en_tn/01-gen/front/intro.md",
+        "en_tn/front/intro.md",
+        "en_tn/manifest.yaml",
+    ]
+
+    # Another book is extracted, when requested, from the zip we
+    # already have.
+    exodus = located_resource("tn", "exo", working_dir)
+    exodus.provision_asset_files()
+    assert downloads == ["https://example.com/en_tn.zip"]
+    assert "en_tn/02-exo/01/01.md" in extracted_files(working_dir / "en_tn")
+
+    # A book is only extracted once.
+    (working_dir / "en_tn/en_tn/02-exo/01/01.md").unlink()
+    located_resource("tn", "exo", working_dir).provision_asset_files()
+    assert "en_tn/02-exo/01/01.md" not in extracted_files(working_dir / "en_tn")
+
+
+def test_the_whole_translation_words_dictionary_is_extracted(
+    test_translations_json: pathlib.Path, downloads: list[str], extract: None
+) -> None:
+    working_dir = test_translations_json.parent
+    located_resource("tw", "gen", working_dir).provision_asset_files()
+    located_resource("tw", "exo", working_dir).provision_asset_files()
+    assert downloads == ["https://example.com/en_tw.zip"]
+    assert extracted_files(working_dir / "en_tw") == sorted(TW_MEMBERS)
+
+
+def test_corrupted_asset_is_downloaded_again_before_unzipping(
+    test_translations_json: pathlib.Path, downloads: list[str], extract: None
+) -> None:
+    working_dir = test_translations_json.parent
+    located_resource("tn", "gen", working_dir).provision_asset_files()
+    asset = working_dir / "en_tn" / "en_tn.zip"
+    asset.write_bytes(asset.read_bytes()[:-10])
+    located_resource("tn", "exo", working_dir).provision_asset_files()
+    assert len(downloads) == 2
+    assert (working_dir / "en_tn/en_tn/02-exo/01/01.md").read_text() == "# Exodus 1:1"
+
+
+def test_zip_assets_are_read_in_place(
+    test_translations_json: pathlib.Path, downloads: list[str]
+) -> None:
+    working_dir = test_translations_json.parent
+    genesis = located_resource("tn", "gen", working_dir)
+    genesis.provision_asset_files()
+    assert genesis.resource_dir == str(working_dir / "en_tn" / "en_tn")
+    assert asset_fs.glob("{}/*gen/01/*[0-9]*.md".format(genesis.resource_dir)) == [
+        str(working_dir / "en_tn/en_tn/01-gen/01/01.md"),
+        str(working_dir / "en_tn/en_tn/01-gen/01/02.md"),
+    ]
+    located_resource("tw", "gen", working_dir).provision_asset_files()
+    assert tw_utils.tw_resource_dir("en") == str(working_dir / "en_tw" / "en_tw")
+    assert sorted(
+        asset_fs.read_file(path)
+        for path in tw_utils.translation_word_filepaths(
+            str(working_dir / "en_tw" / "en_tw")
+        )
+    ) == ["# Abraham", "# God", "# bread"]
+    genesis.update_resource_with_asset_content()
+    assert genesis.book_payload.intro_html == "<h1>Introduction to Genesis</h1>"
+    assert genesis.book_payload.chapters[1].verses_html == {
+        "1": "<h1>Genesis 1:1</h1>",
+        "2": "<h1>Genesis 1:2</h1>",
+    }
+    # Nothing was extracted.
+    assert extracted_files(working_dir / "en_tn") == []
+    assert extracted_files(working_dir / "en_tw") == []
+    assert downloads == [
+        "https://example.com/en_tn.zip",
+        "https://example.com/en_tw.zip",
+    ]
+
+
+def test_corrupted_asset_is_downloaded_again_before_reading_in_place(
+    test_translations_json: pathlib.Path, downloads: list[str]
+) -> None:
+    working_dir = test_translations_json.parent
+    asset = working_dir / "en_tn" / "en_tn.zip"
+    asset.parent.mkdir()
+    asset.write_bytes(zip_bytes(TN_MEMBERS)[:-10])
+    located_resource("tn", "exo", working_dir).provision_asset_files()
+    assert len(downloads) == 1
+    assert (
+        asset_fs.read_file(str(working_dir / "en_tn/en_tn/02-exo/01/01.md"))
+        == "# Exodus 1:1"
+    )
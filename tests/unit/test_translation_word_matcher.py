@@ -0,0 +1,65 @@
+import re
+
+from document.domain import model
+from document.utils import aho_corasick, tw_utils
+
+WORDS = [
+    "God",
+    "Son of God",
+    "Son",
+    "son",
+    "Abraham",
+    "Abram",
+    "bread",
+    "Holy Spirit",
+    "Spirit",
+    "span",
+    "class",
+    "v",
+    "ἀγάπη",
+    "ઈશ્વર",
+]
+
+VERSES = [
+    '<span id="en-040-ch-001-v-001" class="v-num"><sup><b>1</b></sup></span>'
+    "The book of the genealogy of Jesus Christ, son of David, son of Abraham.",
+    "He is the Son of God, and God&#39;s Spirit was on him.",
+    "Abrahamic Abram, Abrams; bread_ and breads, (bread).",
+    "<p>the Holy Spirit</p><p>Son</p>",
+    "ἀγάπη τοῦ θεοῦ, ઈશ્વર",
+    "no words here",
+]
+
+
+def regex_matches(verse: str) -> set[str]:
+    """Match the way TWResource.translation_word_links used to."""
+    return {
+        word for word in WORDS if re.search(r"\b{}\b".format(re.escape(word)), verse)
+    }
+
+
+def test_automaton_finds_overlapping_occurrences() -> None:
+    automaton = aho_corasick.Automaton(["he", "she", "his", "hers"])
+    assert sorted(
+        (start, automaton.patterns[pattern_index])
+        for start, pattern_index in automaton.finditer("ushers")
+    ) == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_matcher_matches_whole_words_in_text() -> None:
+    matcher = tw_utils.TranslationWordMatcher(
+        tuple(model.LocalizedWord(word) for word in WORDS)
+    )
+    for verse in VERSES:
+        # The same words as matching the HTML, except those matched in
+        # tags.
+        assert matcher.matches(model.HtmlContent(verse)) == regex_matches(
+            re.sub(r"<[^>]*>", " ", verse)
+        )
+    assert matcher.matches(model.HtmlContent(VERSES[0])) == {"son", "Abraham"}
+    assert matcher.matches(model.HtmlContent(VERSES[1])) == {
+        "God",
+        "Son",
+        "Son of God",
+        "Spirit",
+    }
@@ -0,0 +1,135 @@
+import pathlib
+
+import pytest
+
+from document.domain import model, resource
+from document.utils import asset_fs, file_utils, tw_utils
+
+TW_MEMBERS = {
+    "en_tw/manifest.yaml": "dublin_core: {}",
+    "en_tw/bible/kt/god.md": "# God\n\nSee [Abraham](../names/abraham.md).",
+    "en_tw/bible/names/abraham.md": "# Abraham, Abram\n\nA man.",
+    "en_tw/bible/other/bread.md": "# bread",
+}
+
+
+@pytest.fixture()
+def zip_assets() -> dict[str, dict[str, str]]:
+    return {"en_tw.zip": TW_MEMBERS}
+
+
+@pytest.fixture()
+def downloads(downloads: list[str]) -> list[str]:
+    tw_utils.translation_word_stores.clear()
+    return downloads
+
+
+def provisioned_resource(
+    resource_code: str, working_dir: pathlib.Path
+) -> resource.Resource:
+    resource_requests = [
+        model.ResourceRequest(lang_code="en", resource_type="tw", resource_code=code)
+        for code in ["gen", "exo"]
+    ]
+    [resource_request] = [
+        resource_request
+        for resource_request in resource_requests
+        if resource_request.resource_code == resource_code
+    ]
+    provisioned = resource.resource_factory(
+        str(working_dir), str(working_dir), resource_request, resource_requests
+    )
+    provisioned.set_location(
+        model.ResourceLookupDto(
+            url="https://example.com/en_tw.zip",
+            source=model.AssetSourceEnum.ZIP,
+            jsonpath=None,
+            lang_name="English",
+            resource_type_name="Translation Words",
+        )
+    )
+    provisioned.provision_asset_files()
+    return provisioned
+
+
+def test_translation_words_are_read_and_converted_once_per_language(
+    test_translations_json: pathlib.Path,
+    downloads: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    working_dir = test_translations_json.parent
+    genesis = provisioned_resource("gen", working_dir)
+    exodus = provisioned_resource("exo", working_dir)
+    read: list[str] = []
+    read_file = asset_fs.read_file
+
+    def counting_read_file(file_path: str) -> str:
+        read.append(file_path)
+        return read_file(file_path)
+
+    monkeypatch.setattr(asset_fs, "read_file", counting_read_file)
+    genesis.update_resource_with_asset_content()
+    exodus.update_resource_with_asset_content()
+    assert len(read) == 3
+    assert [
+        name_content_pair.localized_word
+        for name_content_pair in genesis.payload.name_content_pairs
+    ] == ["Abraham", "God", "bread"]
+    assert 'href="#en-Abraham"' in genesis.payload.name_content_pairs[1].content
+    assert genesis.payload == exodus.payload
+    # Each resource may modify its own payload.
+    assert (
+        genesis.payload.name_content_pairs[0]
+        is not exodus.payload.name_content_pairs[0]
+    )
+    assert tw_utils.translation_word_stores.stats()["misses"] == 1
+
+
+def test_asset_version_is_that_of_the_provisioned_zip(
+    test_translations_json: pathlib.Path, downloads: list[str]
+) -> None:
+    working_dir = test_translations_json.parent
+    genesis = provisioned_resource("gen", working_dir)
+    # Another zip asset, e.g., left behind by an earlier resource URL.
+    stale_zip = pathlib.Path(genesis.resource_dir).parent / "a_tw.zip"
+    stale_zip.write_bytes(b"")
+    file_utils.write_sidecar_metadata(str(stale_zip), {file_utils.SHA256_KEY: "stale"})
+    assert genesis.asset_version
+    assert tw_utils.asset_version(genesis.resource_dir) == genesis.asset_version
+
+
+def test_stores_are_replaced_when_the_asset_changes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    stores = tw_utils.TranslationWordStores(maxsize=2, max_link_contexts=2)
+    monkeypatch.setattr(tw_utils, "asset_version", lambda resource_dir: "v1")
+    store = stores.get("/en_tw")
+    assert stores.get("/en_tw") is store
+    monkeypatch.setattr(tw_utils, "asset_version", lambda resource_dir: "v2")
+    assert stores.get("/en_tw") is not store
+    # Stores for assets of unknown version aren't shared.
+    monkeypatch.setattr(tw_utils, "asset_version", lambda resource_dir: None)
+    assert stores.get("/en_tw") is not stores.get("/en_tw")
+    stats = stores.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+
+
+def test_content_is_converted_once_per_link_context(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    words = {
+        "god": tw_utils.TranslationWord(
+            model.LocalizedWord("God"), "god.md", model.MarkdownContent("# God")
+        )
+    }
+    store = tw_utils.TranslationWordStore("/en_tw", "v1", max_link_contexts=1)
+    monkeypatch.setattr(store, "words", lambda: words)
+    converted: list[str] = []
+
+    def convert(content: model.MarkdownContent) -> model.HtmlContent:
+        converted.append(content)
+        return model.HtmlContent("<h3>{}</h3>".format(len(converted)))
+
+    for link_context in [("True",), ("True",), ("True", "en-tn-gen"), ("True",)]:
+        store.name_content_pairs(link_context, convert)
+    assert converted == ["# God"] * 3
@@ -0,0 +1,349 @@
+import hashlib
+import http.server
+import os
+import pathlib
+import threading
+import time
+from typing import Iterator
+
+import pytest
+import requests
+
+from document.config import settings
+from document.utils import file_utils, url_utils
+
+CONTENT = bytes(range(256)) * 4096  # 1MiB
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    """A stand-in for the servers we download assets from."""
+
+    daemon_threads = True
+    connections: set[int] = set()
+    failures_left: dict[str, int] = {}
+    ranges: list[str] = []
+    bytes_sent = 0
+    version = 1
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandInServer
+
+    def send_content(self, content: bytes, declared_length: int) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(declared_length))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_resumable(self, failing: bool) -> None:
+        """
+        Serve CONTENT, honouring Range requests, and, while failing,
+        drop the connection midway through what remains to be sent.
+        """
+        etag = '"v1"'
+        start = 0
+        range_ = self.headers.get("Range")
+        if range_ is not None:
+            self.server.ranges.append(range_)
+            if self.headers.get("If-Range") == etag:
+                start = int(range_[len("bytes=") : -1])
+        remaining = CONTENT[start:]
+        if start:
+            self.send_response(206)
+            self.send_header(
+                "Content-Range",
+                "bytes {}-{}/{}".format(start, len(CONTENT) - 1, len(CONTENT)),
+            )
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(remaining)))
+        self.end_headers()
+        if failing:
+            remaining = remaining[: len(remaining) // 2]
+            self.close_connection = True
+        self.wfile.write(remaining)
+        self.server.bytes_sent += len(remaining)
+
+    def send_versioned(self) -> None:
+        """
+        Serve the current version of some content, honouring
+        If-None-Match.
+        """
+        etag = '"v{}"'.format(self.server.version)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        content = CONTENT[self.server.version :]
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        self.server.bytes_sent += len(content)
+
+    def do_GET(self) -> None:
+        self.server.connections.add(self.client_address[1])
+        failing = self.server.failures_left.get(self.path, 0) > 0
+        if failing:
+            self.server.failures_left[self.path] -= 1
+        if self.path.startswith("/flaky") and failing:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path.startswith("/truncated") and failing:
+            # Declare the full length, send half and hang up.
+            self.send_content(CONTENT[: len(CONTENT) // 2], len(CONTENT))
+            self.close_connection = True
+        elif self.path.startswith("/unsatisfiable") and "Range" in self.headers:
+            self.server.ranges.append(self.headers["Range"])
+            self.send_response(416)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path.startswith("/resumable"):
+            self.send_resumable(failing)
+        elif self.path.startswith("/versioned"):
+            self.send_versioned()
+        elif self.path.startswith("/slow"):
+            time.sleep(1)
+            self.send_content(CONTENT, len(CONTENT))
+        elif self.path.startswith("/missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self.send_content(CONTENT, len(CONTENT))
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture()
+def server(monkeypatch: pytest.MonkeyPatch) -> Iterator[StandInServer]:
+    monkeypatch.setattr(settings, "HTTP_BACKOFF_FACTOR", 0.01)
+    monkeypatch.setattr(settings, "HTTP_READ_TIMEOUT", 0.3)
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    server.connections = set()
+    server.failures_left = {}
+    server.ranges = []
+    server.bytes_sent = 0
+    server.version = 1
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server: StandInServer, path: str) -> str:
+    return "http://127.0.0.1:{}{}".format(server.server_address[1], path)
+
+
+def test_download_reuses_connections(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    for i in range(5):
+        outfile = tmp_path / "asset{}.zip".format(i)
+        url_utils.download_file(url(server, "/asset{}.zip".format(i)), str(outfile))
+        assert outfile.read_bytes() == CONTENT
+    assert len(server.connections) == 1
+    # Only the downloaded files and their metadata, no temporary
+    # files, are left.
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        name
+        for i in range(5)
+        for name in ("asset{}.zip".format(i), "asset{}.zip.meta.json".format(i))
+    )
+
+
+def test_download_retries_server_errors(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    server.failures_left["/flaky.zip"] = settings.HTTP_MAX_RETRIES
+    outfile = tmp_path / "flaky.zip"
+    url_utils.download_file(url(server, "/flaky.zip"), str(outfile))
+    assert outfile.read_bytes() == CONTENT
+
+
+def test_download_retries_truncated_responses(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    server.failures_left["/truncated.zip"] = 1
+    outfile = tmp_path / "truncated.zip"
+    url_utils.download_file(url(server, "/truncated.zip"), str(outfile))
+    assert outfile.read_bytes() == CONTENT
+
+
+def test_download_gives_up_leaving_no_file(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    server.failures_left["/flaky.zip"] = settings.HTTP_MAX_RETRIES + 1
+    outfile = tmp_path / "flaky.zip"
+    with pytest.raises(requests.HTTPError):
+        url_utils.download_file(url(server, "/flaky.zip"), str(outfile))
+    with pytest.raises(requests.HTTPError):
+        url_utils.download_file(url(server, "/missing.zip"), str(outfile))
+    with pytest.raises(requests.Timeout):
+        url_utils.download_file(url(server, "/slow.zip"), str(outfile))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_download_keeps_previous_file(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    outfile = tmp_path / "asset.zip"
+    outfile.write_bytes(b"previous")
+    server.failures_left["/truncated.zip"] = settings.HTTP_MAX_RETRIES + 1
+    with pytest.raises(requests.RequestException):
+        url_utils.download_file(url(server, "/truncated.zip"), str(outfile))
+    assert outfile.read_bytes() == b"previous"
+    # Only what was downloaded so far is kept, to be resumed later.
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "asset.zip",
+        "asset.zip.part",
+        "asset.zip.part.meta.json",
+    ]
+
+
+def test_download_resumes_where_the_connection_dropped(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    server.failures_left["/resumable.zip"] = 2
+    outfile = tmp_path / "resumable.zip"
+    url_utils.download_file(url(server, "/resumable.zip"), str(outfile))
+    assert outfile.read_bytes() == CONTENT
+    # Each retry asked only for what was still missing ...
+    half = len(CONTENT) // 2
+    assert server.ranges == [
+        "bytes={}-".format(half),
+        "bytes={}-".format(half + half // 2),
+    ]
+    # ... so the content was sent only once.
+    assert server.bytes_sent == len(CONTENT)
+    assert file_utils.read_sidecar_metadata(outfile) == {
+        "url": url(server, "/resumable.zip"),
+        "size": len(CONTENT),
+        "sha256": hashlib.sha256(CONTENT).hexdigest(),
+        "etag": '"v1"',
+        "last_modified": None,
+    }
+    assert file_utils.file_is_intact(outfile)
+    assert not (tmp_path / "resumable.zip.part").exists()
+
+
+def test_download_resumes_after_giving_up(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    server.failures_left["/resumable.zip"] = settings.HTTP_MAX_RETRIES + 1
+    outfile = tmp_path / "resumable.zip"
+    with pytest.raises(requests.RequestException):
+        url_utils.download_file(url(server, "/resumable.zip"), str(outfile))
+    assert not outfile.exists()
+    url_utils.download_file(url(server, "/resumable.zip"), str(outfile))
+    assert outfile.read_bytes() == CONTENT
+    assert server.bytes_sent == len(CONTENT)
+
+
+def test_download_starts_over_when_content_changed(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    outfile = tmp_path / "resumable.zip"
+    part_file = tmp_path / "resumable.zip.part"
+    part_file.write_bytes(b"stale")
+    file_utils.write_sidecar_metadata(part_file, {"validator": '"v0"'})
+    url_utils.download_file(url(server, "/resumable.zip"), str(outfile))
+    assert outfile.read_bytes() == CONTENT
+    assert server.ranges == ["bytes=5-"]
+
+
+def test_download_forgets_unsatisfiable_part(
+    server: StandInServer, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "HTTP_MAX_RETRIES", 0)
+    outfile = tmp_path / "unsatisfiable.zip"
+    part_file = tmp_path / "unsatisfiable.zip.part"
+    part_file.write_bytes(CONTENT + b"extra")
+    file_utils.write_sidecar_metadata(part_file, {"validator": '"v1"'})
+    with pytest.raises(url_utils.IncompleteDownloadError):
+        url_utils.download_file(url(server, "/unsatisfiable.zip"), str(outfile))
+    assert os.listdir(tmp_path) == []
+    url_utils.download_file(url(server, "/unsatisfiable.zip"), str(outfile))
+    assert outfile.read_bytes() == CONTENT
+    assert server.ranges == ["bytes={}-".format(len(CONTENT) + 5)]
+
+
+def test_corrupted_file_is_not_intact(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    outfile = tmp_path / "asset.zip"
+    assert not file_utils.file_is_intact(outfile)
+    url_utils.download_file(url(server, "/asset.zip"), str(outfile))
+    assert file_utils.file_is_intact(outfile)
+    with open(outfile, "r+b") as fp:
+        fp.write(b"corrupt")
+    assert not file_utils.file_is_intact(outfile)
+    outfile.write_bytes(b"short")
+    assert not file_utils.file_is_intact(outfile)
+
+
+def test_refresh_downloads_only_changed_content(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    outfile = tmp_path / "versioned.zip"
+    asset_url = url(server, "/versioned.zip")
+    assert url_utils.refresh_file(asset_url, str(outfile))
+    assert outfile.read_bytes() == CONTENT[1:]
+    bytes_sent = server.bytes_sent
+    os.utime(outfile, (0, 0))
+    # Unchanged upstream, only marked fresh again.
+    assert not url_utils.refresh_file(asset_url, str(outfile))
+    assert server.bytes_sent == bytes_sent
+    assert outfile.stat().st_mtime > 0
+    assert not file_utils.asset_needs_revalidation(outfile)
+    server.version = 2
+    assert url_utils.refresh_file(asset_url, str(outfile))
+    assert outfile.read_bytes() == CONTENT[2:]
+    metadata = file_utils.read_sidecar_metadata(outfile)
+    assert metadata[file_utils.ETAG_KEY] == '"v2"'
+    assert file_utils.file_is_intact(outfile)
+
+
+def test_refresh_without_validators_downloads_again(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    outfile = tmp_path / "asset.zip"
+    assert url_utils.refresh_file(url(server, "/asset.zip"), str(outfile))
+    assert url_utils.refresh_file(url(server, "/asset.zip"), str(outfile))
+    assert outfile.read_bytes() == CONTENT
+
+
+def test_truncated_conditional_download_keeps_previous_file(
+    server: StandInServer, tmp_path: pathlib.Path
+) -> None:
+    outfile = tmp_path / "translations.json"
+    outfile.write_bytes(b"previous")
+    server.failures_left["/truncated.json"] = settings.HTTP_MAX_RETRIES + 1
+    with pytest.raises(requests.RequestException):
+        url_utils.conditional_download_file(
+            url(server, "/truncated.json"), str(outfile)
+        )
+    assert outfile.read_bytes() == b"previous"
+    assert [path.name for path in tmp_path.iterdir()] == ["translations.json"]
+    # Once the server sends the whole body it replaces the file.
+    result = url_utils.conditional_download_file(
+        url(server, "/truncated.json"), str(outfile)
+    )
+    assert result.modified
+    assert outfile.read_bytes() == CONTENT
+
+
+def test_short_body_leaves_previous_file_untouched(tmp_path: pathlib.Path) -> None:
+    outfile = tmp_path / "translations.json"
+    outfile.write_bytes(b"previous")
+    with pytest.raises(url_utils.IncompleteDownloadError):
+        url_utils._write_atomically([CONTENT[:10]], str(outfile), len(CONTENT))
+    assert outfile.read_bytes() == b"previous"
+    assert [path.name for path in tmp_path.iterdir()] == ["translations.json"]
@@ -0,0 +1,33 @@
+import json
+import os
+import types
+
+from document.domain import resource
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_data")
+# USFM-Tools' HTML for two chapters of Psalms with poetry, a footnote,
+# a verse range and words of Jesus that span paragraphs.
+PSA_HTML = os.path.join(TEST_DATA, "psa_usfm_tools.html")
+# The chapters USFMHtmlInitializer produced from PSA_HTML before it
+# looked headings and verse spans up in dicts, one find at a time.
+PSA_CHAPTERS = os.path.join(TEST_DATA, "psa_usfm_tools_chapters.json")
+
+
+def test_verses_html_match_baseline() -> None:
+    with open(PSA_HTML, "r") as fin:
+        html = fin.read()
+    with open(PSA_CHAPTERS, "r") as fin:
+        expected = json.load(fin)
+    usfm_resource = types.SimpleNamespace(
+        _content=html, _chapter_content={}, lang_code="en", _book_number="19"
+    )
+    resource.USFMHtmlInitializer(usfm_resource)._initialize_verses_html()  # type: ignore
+    chapters = {
+        str(chapter_num): {
+            "chapter_content": chapter.chapter_content,
+            "chapter_verses": dict(chapter.chapter_verses),
+            "chapter_footnotes": chapter.chapter_footnotes,
+        }
+        for chapter_num, chapter in usfm_resource._chapter_content.items()
+    }
+    assert chapters == expected
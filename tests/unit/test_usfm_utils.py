@@ -0,0 +1,52 @@
+import json
+import os
+import pathlib
+import types
+
+import pytest
+from usfm_tools.transform import UsfmTransform
+
+from document.domain import resource
+from document.utils import file_utils, html_parsing_utils, usfm_utils
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_data")
+# The USFM of the two chapters of Psalms in psa_usfm_tools.html.
+PSA_USFM = os.path.join(TEST_DATA, "psa.usfm")
+# The chapters USFMHtmlInitializer produced from psa_usfm_tools.html
+# before it split HTML in one pass.
+PSA_CHAPTERS = os.path.join(TEST_DATA, "psa_usfm_tools_chapters.json")
+
+
+def test_usfm_chapters_match_baseline() -> None:
+    with open(PSA_CHAPTERS, "r") as fin:
+        expected = json.load(fin)
+    usfm_resource = types.SimpleNamespace(_chapter_content={}, lang_code="en")
+    resource.USFMHtmlInitializer(usfm_resource)._initialize_chapters(  # type: ignore
+        usfm_utils.usfm_chapters(PSA_USFM, "19")
+    )
+    chapters = {
+        str(chapter_num): {
+            "chapter_content": chapter.chapter_content,
+            "chapter_verses": dict(chapter.chapter_verses),
+            "chapter_footnotes": chapter.chapter_footnotes,
+        }
+        for chapter_num, chapter in usfm_resource._chapter_content.items()
+    }
+    assert chapters == expected
+
+
+@pytest.mark.skipif(
+    not hasattr(UsfmTransform, "buildSingleHtmlFromFile"),
+    reason="UsfmTransform.buildSingleHtmlFromFile is only in the USFM-Tools "
+    "fork the requirements install, not in the PyPI release",
+)
+def test_usfm_chapters_match_html_file(tmp_path: pathlib.Path) -> None:
+    """
+    Converting in memory gives the same chapters as converting to an
+    HTML file and splitting that.
+    """
+    UsfmTransform.buildSingleHtmlFromFile(pathlib.Path(PSA_USFM), str(tmp_path), "psa")
+    html_file = file_utils.read_file(str(tmp_path / "psa.html"))
+    assert usfm_utils.usfm_chapters(
+        PSA_USFM, "19"
+    ) == html_parsing_utils.split_usfm_html(html_file, "19")
@@ -0,0 +1,140 @@
+import json
+import pathlib
+from typing import Sequence
+
+import pytest
+
+from document.config import settings
+from document.domain import bible_books, model, resource_lookup
+from document.domain.parsed_resource_cache import parsed_resource_cache
+from document.domain.resource import provision_asset_files, resource_factory
+from document.entrypoints import warm
+from document.utils import url_utils
+
+TN_MEMBERS = {
+    "en_tn/manifest.yaml": "dublin_core: {}",
+    "en_tn/01-gen/front/intro.md": "# Introduction to Genesis",
+    "en_tn/01-gen/01/01.md": "# Genesis 1:1",
+    "en_tn/02-exo/01/01.md": "# Exodus 1:1",
+}
+
+
+def lookup_many(
+    resource_requests: Sequence[model.ResourceRequest],
+) -> dict[model.ResourceRequest, model.ResourceLookupDto]:
+    """Find en tn for Genesis and Exodus only."""
+    return {
+        resource_request: model.ResourceLookupDto(
+            url=(
+                "https://example.com/en_tn.zip"
+                if resource_request.resource_code in ["gen", "exo"]
+                else None
+            ),
+            source=model.AssetSourceEnum.ZIP,
+            jsonpath=None,
+            lang_name="English",
+            resource_type_name="Translation Notes",
+        )
+        for resource_request in resource_requests
+    }
+
+
+@pytest.fixture()
+def zip_assets() -> dict[str, dict[str, str]]:
+    return {"en_tn.zip": TN_MEMBERS}
+
+
+@pytest.fixture()
+def downloads(
+    downloads: list[str],
+    test_translations_json: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> list[str]:
+    output_dir = str(test_translations_json.parent / "output")
+    monkeypatch.setattr(type(settings), "output_dir", lambda self: output_dir)
+    monkeypatch.setattr(resource_lookup, "lookup_many", lookup_many)
+    return downloads
+
+
+def test_parse_spec(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        resource_lookup.ResourceJsonLookup,
+        "lang_codes_names_and_resource_types",
+        lambda: [
+            model.CodeNameTypeTriplet(
+                lang_code="fr", lang_name="French", resource_types=["ulb", "tn", "x"]
+            )
+        ],
+    )
+    assert warm.parse_spec("en/tn/gen") == [
+        model.ResourceRequest(lang_code="en", resource_type="tn", resource_code="gen")
+    ]
+    assert [
+        resource_request.resource_code for resource_request in warm.parse_spec("en/tn")
+    ] == list(bible_books.BOOK_NAMES)
+    # Resource types unknown to us are skipped.
+    assert len(warm.parse_spec("fr")) == 2 * len(bible_books.BOOK_NAMES)
+    assert warm.parse_spec("de") == []
+    for spec in ["en/tn/gen/1", "en//gen", "en/xyz", "en/tn/xyz"]:
+        with pytest.raises(ValueError):
+            warm.parse_spec(spec)
+
+
+def test_warm_provisions_each_asset_once_and_parses(
+    downloads: list[str],
+) -> None:
+    report = warm.warm(
+        warm.parse_spec("en/tn/gen")
+        + warm.parse_spec("en/tn/exo")
+        + warm.parse_spec("en/tn/lev"),
+        max_workers=2,
+    )
+    assert downloads == ["https://example.com/en_tn.zip"]
+    assert report["not_found"] == ["en/tn/lev"]
+    [asset_report] = report["assets"]
+    assert asset_report["url"] == "https://example.com/en_tn.zip"
+    assert asset_report["error"] is None
+    assert [
+        (resource_report["resource"], resource_report["error"])
+        for resource_report in asset_report["resources"]
+    ] == [("en/tn/gen", None), ("en/tn/exo", None)]
+    assert not warm.failed(report)
+
+
+def test_warmed_content_is_found_by_document_requests(downloads: list[str]) -> None:
+    warm.warm(warm.parse_spec("en/tn/gen") + warm.parse_spec("en/tn/exo"), 2)
+    # Set up a document request for the notes on Genesis as
+    # document_generator.run does.
+    resource_requests = warm.parse_spec("en/tn/gen")
+    [resource] = [
+        resource_factory(
+            settings.working_dir(),
+            settings.output_dir(),
+            resource_request,
+            resource_requests,
+        )
+        for resource_request in resource_requests
+    ]
+    assert resource.set_location(
+        resource_lookup.lookup_many(resource_requests)[resource.resource_request]
+    )
+    assert provision_asset_files([resource]) == []
+    assert parsed_resource_cache.update_resource_with_asset_content(resource).cached
+    assert downloads == ["https://example.com/en_tn.zip"]
+
+
+def test_failures_are_reported(
+    downloads: list[str], monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    def download_file(url: str, outfile: str) -> None:
+        raise url_utils.IncompleteDownloadError("Connection reset")
+
+    monkeypatch.setattr(url_utils, "download_file", download_file)
+    report_file = tmp_path / "report.json"
+    assert warm.main(["en/tn/gen", "--output", str(report_file)]) == 1
+    [asset_report] = json.loads(report_file.read_text())["assets"]
+    assert "Connection reset" in asset_report["error"]
+    # Nothing to parse.
+    assert asset_report["resources"] == [
+        {"resource": "en/tn/gen", "seconds": None, "cached": False, "error": None}
+    ]